@@ -0,0 +1,72 @@
+import struct
+from typing import List
+
+import numpy as np
+
+from audio_framing import PcmFramer
+
+# Codec ids carried in the downlink frame header
+CODECS = {"pcm": 0, "mulaw": 1}
+
+# Frame header: codec id (u8), flags (u8), sequence number (u16), sample rate (u32), little endian
+FRAME_HEADER = struct.Struct("<BBHI")
+FLAG_END_OF_TURN = 0x01
+
+_MULAW_BIAS = 0x84
+_MULAW_CLIP = 8159
+
+
+def encode_mulaw(pcm: bytes) -> bytes:
+    """Encodes 16-bit little-endian PCM as 8-bit G.711 mu-law, vectorized with NumPy."""
+    # Same arithmetic as the G.711 reference encoder, on 14-bit samples
+    samples = np.frombuffer(pcm, dtype="<i2").astype(np.int32) >> 2
+    negative = samples < 0
+    magnitude = np.minimum(np.where(negative, -samples, samples), _MULAW_CLIP) + (_MULAW_BIAS >> 2)
+    # Segment number is the position of the highest set bit above bit 5
+    segment = np.maximum(np.floor(np.log2(magnitude)).astype(np.int32) - 5, 0)
+    code = (segment << 4) | ((magnitude >> (segment + 1)) & 0x0F)
+    # Clipped samples land past the last segment and saturate
+    code = np.where(segment > 7, 0x7F, code)
+    return (code ^ np.where(negative, 0x7F, 0xFF)).astype(np.uint8).tobytes()
+
+
+def decode_mulaw(data: bytes) -> bytes:
+    """Decodes 8-bit G.711 mu-law back to 16-bit little-endian PCM."""
+    codes = ~np.frombuffer(data, dtype=np.uint8).astype(np.int32) & 0xFF
+    exponent = (codes >> 4) & 0x07
+    mantissa = codes & 0x0F
+    magnitude = (((mantissa << 3) + _MULAW_BIAS) << exponent) - _MULAW_BIAS
+    return np.where(codes & 0x80, -magnitude, magnitude).astype("<i2").tobytes()
+
+
+class DownlinkEncoder:
+    """
+    Encodes Gemini's 16-bit PCM output for the client in fixed-duration frames.
+
+    Every frame starts with FRAME_HEADER carrying the codec, a sequence number and
+    the sample rate, so the client can detect gaps and play frames back to back. The
+    last (possibly shorter) frame of a turn has FLAG_END_OF_TURN set.
+    """
+
+    def __init__(self, codec: str, sample_rate: int, frame_ms: int = 40):
+        if codec not in CODECS:
+            raise ValueError(f"Unsupported downlink codec: {codec}")
+        self.codec = codec
+        self.codec_id = CODECS[codec]
+        self.sample_rate = sample_rate
+        self.sequence = 0
+        self._framer = PcmFramer(sample_rate, frame_ms)
+
+    def encode(self, pcm: bytes) -> List[bytes]:
+        """Buffers a chunk of PCM and returns every complete encoded frame."""
+        return [self._packet(frame, 0) for frame in self._framer.feed(pcm)]
+
+    def flush(self) -> List[bytes]:
+        """Returns the final frame of a turn, flagged as the end of the turn."""
+        return [self._packet(self._framer.flush() or b"", FLAG_END_OF_TURN)]
+
+    def _packet(self, pcm: bytes, flags: int) -> bytes:
+        payload = encode_mulaw(pcm) if self.codec == "mulaw" else pcm
+        header = FRAME_HEADER.pack(self.codec_id, flags, self.sequence, self.sample_rate)
+        self.sequence = (self.sequence + 1) & 0xFFFF
+        return header + payload
@@ -0,0 +1,88 @@
+import time
+from typing import Any, Dict, List, Optional
+
+
+class PcmFramer:
+    """
+    Coalesces small PCM chunks from the client into fixed-duration frames.
+
+    Incoming audio is copied into a preallocated bytearray ring buffer, so feeding a
+    chunk does not allocate; a new bytes object is only created per emitted frame.
+    """
+
+    def __init__(self, sample_rate: int, frame_ms: int = 40, sample_width: int = 2, buffered_frames: int = 4):
+        bytes_per_ms = sample_rate * sample_width / 1000
+        self.frame_bytes = max(int(bytes_per_ms * frame_ms) // sample_width * sample_width, sample_width)
+        self._buffer = bytearray(self.frame_bytes * buffered_frames)
+        self._view = memoryview(self._buffer)
+        self._capacity = len(self._buffer)
+        self._start = 0
+        self._size = 0
+
+    def feed(self, data: bytes) -> List[bytes]:
+        """Buffers a chunk and returns every complete frame now available."""
+        frames = []
+        chunk = memoryview(data)
+        while chunk:
+            n = min(len(chunk), self._capacity - self._size)
+            self._write(chunk[:n])
+            chunk = chunk[n:]
+            while self._size >= self.frame_bytes:
+                frames.append(self._read(self.frame_bytes))
+        return frames
+
+    def flush(self) -> Optional[bytes]:
+        """Returns any buffered partial frame, e.g. when the client stops recording."""
+        if not self._size:
+            return None
+        return self._read(self._size)
+
+    def _write(self, chunk: memoryview):
+        end = (self._start + self._size) % self._capacity
+        first = min(len(chunk), self._capacity - end)
+        self._view[end:end + first] = chunk[:first]
+        if first < len(chunk):
+            self._view[:len(chunk) - first] = chunk[first:]
+        self._size += len(chunk)
+
+    def _read(self, n: int) -> bytes:
+        first = min(n, self._capacity - self._start)
+        if first == n:
+            frame = self._view[self._start:self._start + n].tobytes()
+        else:
+            frame = self._view[self._start:].tobytes() + self._view[:n - first].tobytes()
+        self._start = (self._start + n) % self._capacity
+        self._size -= n
+        return frame
+
+
+class UplinkStats:
+    """Counts client chunks and Live API sends to report sends per second and bytes per frame."""
+
+    def __init__(self):
+        self.started = time.monotonic()
+        self.client_chunks = 0
+        self.sends = 0
+        self.bytes_sent = 0
+
+    def record_chunk(self):
+        self.client_chunks += 1
+
+    def record_send(self, num_bytes: int):
+        self.sends += 1
+        self.bytes_sent += num_bytes
+
+    def merge(self, other: "UplinkStats"):
+        self.client_chunks += other.client_chunks
+        self.sends += other.sends
+        self.bytes_sent += other.bytes_sent
+
+    def snapshot(self) -> Dict[str, Any]:
+        elapsed = max(time.monotonic() - self.started, 1e-9)
+        return {
+            "client_chunks": self.client_chunks,
+            "sends": self.sends,
+            "bytes_sent": self.bytes_sent,
+            "sends_per_second": round(self.sends / elapsed, 2),
+            "avg_bytes_per_frame": round(self.bytes_sent / self.sends, 1) if self.sends else 0,
+        }
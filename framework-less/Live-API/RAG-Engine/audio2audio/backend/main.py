@@ -1,85 +1,147 @@
-import asyncio
 import logging
-from fastapi import FastAPI, WebSocket, WebSocketDisconnect
+import os
+import sys
+from contextlib import asynccontextmanager
+from fastapi import FastAPI, WebSocket, status
+from fastapi.responses import JSONResponse, Response
      
 import google.genai as genai
-from google.genai.types import Blob
-import vertexai
-from vertexai import rag
+
+from audio_codecs import CODECS, DownlinkEncoder
+from audio_framing import PcmFramer, UplinkStats
+from pipeline import ConnectionPipeline
+from vad import VoiceActivityDetector
+
+# Startup helpers are shared with the text2text backend
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "..", "common"))
+from live_config import LiveConfigLoader, default_cache_path
+from instrumentation import LiveMetrics
+from fake_live import FakeLiveClient
 
 # --- Configuration & Initialization  ---
 PROJECT_ID = "andrewcooley-genai-tests"
 LOCATION = "us-central1"
 MODEL_ID = "gemini-2.0-flash-live-preview-04-09"
+LIVE_API_BACKEND = os.environ.get("LIVE_API_BACKEND", "vertex") # 'vertex' or 'fake'
 INPUT_SAMPLE_RATE = 16000
+OUTPUT_SAMPLE_RATE = 24000
+DOWNLINK_FRAME_MS = int(os.environ.get("DOWNLINK_FRAME_MS", "40"))
+UPLINK_QUEUE_SIZE = int(os.environ.get("UPLINK_QUEUE_SIZE", "64"))
+DOWNLINK_QUEUE_SIZE = int(os.environ.get("DOWNLINK_QUEUE_SIZE", "64"))
+SLOW_CLIENT_POLICY = os.environ.get("SLOW_CLIENT_POLICY", "pause") # 'pause' or 'drop'
+UPLINK_FRAME_MS = int(os.environ.get("UPLINK_FRAME_MS", "40")) # 0 disables framing
+VAD_ENABLED = os.environ.get("VAD_ENABLED", "false").lower() == "true"
+VAD_ENERGY_THRESHOLD_DB = float(os.environ.get("VAD_ENERGY_THRESHOLD_DB", "-45"))
+VAD_PRE_ROLL_MS = int(os.environ.get("VAD_PRE_ROLL_MS", "200"))
+VAD_HANGOVER_MS = int(os.environ.get("VAD_HANGOVER_MS", "300"))
+VAD_END_OF_TURN_SILENCE_MS = int(os.environ.get("VAD_END_OF_TURN_SILENCE_MS", "0")) # 0 waits for STOP_RECORDING
+LIVE_CONFIG_CACHE_PATH = os.environ.get("LIVE_CONFIG_CACHE_PATH", default_cache_path("audio2audio"))
 
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
-app = FastAPI()
-
-try:
-    vertexai.init(project=PROJECT_ID, location=LOCATION)
-    rag_corpora = list(vertexai.rag.list_corpora())
-    if not rag_corpora:
-        raise RuntimeError("No RAG corpora found. Please create one.")
-    rag_corpus = rag_corpora[-1]
-    logger.info(f"Using RAG Corpus: {rag_corpus.name}")
-    TOOLS = [{"retrieval": {"vertex_rag_store": {"rag_resources": [{"rag_corpus": rag_corpus.name}]}}}]
-    GEMINI_CONFIG = {
-        "response_modalities": ["AUDIO"], "tools": TOOLS,
+
+# The RAG corpus is resolved in the background on startup; until then /readyz reports 503
+live_config = LiveConfigLoader(
+    project=PROJECT_ID,
+    location=LOCATION,
+    base_config={
+        "response_modalities": ["AUDIO"],
         "system_instruction": "You are a helpful assistant..."
-    }
+    },
+    cache_path=LIVE_CONFIG_CACHE_PATH,
+)
+if LIVE_API_BACKEND == "fake":
+    # A local stand-in for the Live API, for load testing without Vertex AI (see ../../loadtest)
+    gemini_client = FakeLiveClient.from_env()
+else:
     gemini_client = genai.Client(vertexai=True, project=PROJECT_ID, location=LOCATION)
-except Exception as e:
-    logger.error(f"Failed to initialize Vertex AI or RAG: {e}")
-    exit(1)
+
+# Latency, chunk and session metrics, served at /metrics
+live_metrics = LiveMetrics("rag-engine-audio2audio")
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    if LIVE_API_BACKEND == "fake":
+        logger.info("Using the fake Live API. Skipping the RAG corpus lookup.")
+        live_config.use_corpus(None)
+    else:
+        await live_config.start()
+    yield
+    await live_config.stop()
+
+app = FastAPI(lifespan=lifespan)
+
+# Uplink counters aggregated over all closed connections
+uplink_stats = UplinkStats()
+
+# --- Health Endpoints ---
+@app.get("/healthz")
+async def healthz():
+    return {"status": "ok"}
+
+@app.get("/readyz")
+async def readyz():
+    status_code = 200 if live_config.ready.is_set() else 503
+    return JSONResponse(status_code=status_code, content=live_config.status())
+
+@app.get("/metrics")
+async def get_metrics():
+    body, content_type = live_metrics.exposition()
+    return Response(content=body, media_type=content_type)
+
+@app.get("/uplink/stats")
+async def get_uplink_stats():
+    return uplink_stats.snapshot()
 
 # --- WebSocket Endpoint ---
 @app.websocket("/ws")
 async def websocket_endpoint(websocket: WebSocket):
     await websocket.accept()
+    if not live_config.ready.is_set():
+        logger.warning("Rejecting WebSocket connection: Live API config is not ready yet.")
+        await websocket.close(code=status.WS_1013_TRY_AGAIN_LATER)
+        return
+
+    # Clients may negotiate an encoded downlink with ?codec=pcm|mulaw; without it raw PCM chunks are sent
+    codec = websocket.query_params.get("codec")
+    if codec is not None and codec not in CODECS:
+        logger.warning(f"Rejecting WebSocket connection: unsupported codec '{codec}'.")
+        await websocket.close(code=status.WS_1003_UNSUPPORTED_DATA, reason=f"Unsupported codec: {codec}")
+        return
     logger.info("WebSocket connection accepted.")
 
     try:
-        async with gemini_client.aio.live.connect(model=MODEL_ID, config=GEMINI_CONFIG) as session:
+        async with live_metrics.session(gemini_client.aio.live.connect(model=MODEL_ID, config=live_config.config)) as session:
             logger.info("Gemini Live session started.")
+            if codec:
+                await websocket.send_text(f"CODEC:{codec}")
 
-            async def gemini_receiver():
-                try:
-                    async for message in session.receive():
-                        if (message.server_content.model_turn and 
-                            message.server_content.model_turn.parts):
-                            for part in message.server_content.model_turn.parts:
-                                if part.inline_data and part.inline_data.data:
-                                    await websocket.send_bytes(part.inline_data.data)
-                        if message.server_content.turn_complete:
-                            await websocket.send_text("TURN_COMPLETE")
-                            break
-                except Exception as e:
-                    logger.error(f"Error in Gemini receiver task: {e}")
-
-            # Main loop to forward messages from the client to Gemini
+            # One reader, one writer and one task per direction, cancelled together on disconnect
+            pipeline = ConnectionPipeline(
+                websocket,
+                session,
+                input_sample_rate=INPUT_SAMPLE_RATE,
+                uplink_queue_size=UPLINK_QUEUE_SIZE,
+                downlink_queue_size=DOWNLINK_QUEUE_SIZE,
+                slow_client_policy=SLOW_CLIENT_POLICY,
+                framer=PcmFramer(INPUT_SAMPLE_RATE, UPLINK_FRAME_MS) if UPLINK_FRAME_MS > 0 else None,
+                vad=VoiceActivityDetector(
+                    INPUT_SAMPLE_RATE,
+                    energy_threshold_db=VAD_ENERGY_THRESHOLD_DB,
+                    pre_roll_ms=VAD_PRE_ROLL_MS,
+                    hangover_ms=VAD_HANGOVER_MS,
+                    end_of_turn_silence_ms=VAD_END_OF_TURN_SILENCE_MS,
+                ) if VAD_ENABLED else None,
+                encoder=DownlinkEncoder(codec, OUTPUT_SAMPLE_RATE, DOWNLINK_FRAME_MS) if codec else None,
+                metrics=live_metrics,
+            )
             try:
-                while True:
-                    message = await websocket.receive()
-                    
-                    if "text" in message:
-                        # This is the signal to end the audio stream
-                        if message["text"] == "STOP_RECORDING":
-                            logger.info("Client stopped recording. Sending end-of-turn signal.")
-                            # Send the final empty chunk to tell Gemini the turn is over
-                            await session.send_realtime_input(media=Blob(data=b'', mime_type=f"audio/pcm;rate={INPUT_SAMPLE_RATE}"))
-                            
-                            # Spawn a listener for the response
-                            asyncio.create_task(gemini_receiver())
-                            logger.info("Spawned new listener task for Gemini response.")
-                    
-                    elif "bytes" in message:
-                        # This is a raw PCM audio chunk, forward it directly
-                        await session.send_realtime_input(media=Blob(data=message["bytes"], mime_type=f"audio/pcm;rate={INPUT_SAMPLE_RATE}"))
-
-            except WebSocketDisconnect:
-                logger.info("Client disconnected gracefully.")
+                await pipeline.run()
+            finally:
+                logger.info(f"Uplink stats for connection: {pipeline.uplink_stats.snapshot()}")
+                if pipeline.vad is not None:
+                    logger.info(f"VAD sent {pipeline.vad.bytes_out} of {pipeline.vad.bytes_in} audio bytes.")
+                uplink_stats.merge(pipeline.uplink_stats)
 
     except Exception as e:
-        logger.error(f"An error occurred in the WebSocket endpoint: {e}")
\ No newline at end of file
+        logger.error(f"An error occurred in the WebSocket endpoint: {e}")
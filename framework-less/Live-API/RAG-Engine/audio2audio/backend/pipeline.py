@@ -0,0 +1,226 @@
+import asyncio
+import logging
+from typing import Optional
+
+from fastapi import WebSocket, WebSocketDisconnect
+from google.genai.types import Blob
+
+from audio_codecs import DownlinkEncoder
+from audio_framing import PcmFramer, UplinkStats
+from vad import VoiceActivityDetector
+
+logger = logging.getLogger(__name__)
+
+# Uplink queue marker for the client's STOP_RECORDING signal
+END_OF_TURN = object()
+
+SLOW_CLIENT_POLICIES = ("pause", "drop")
+
+
+class ConnectionPipeline:
+    """
+    Structured audio pipeline for one WebSocket connection and its Gemini Live session.
+
+    Four tasks run under a single task group and are all cancelled as soon as one of
+    them ends, e.g. when the client disconnects:
+
+      client reader  -> uplink queue   -> uplink (send_realtime_input)
+      Gemini receive -> downlink queue -> client writer (send_bytes / send_text)
+
+    Both queues are bounded, so memory per connection stays predictable. When the
+    downlink queue is full because the client reads too slowly, the "pause" policy
+    stops reading from Gemini until there is room, while the "drop" policy discards
+    the newest audio chunk. Control messages such as TURN_COMPLETE are never dropped.
+
+    With a `framer`, small client chunks are coalesced into fixed-duration frames
+    before they are sent, and any partial frame is flushed on STOP_RECORDING.
+
+    With a `vad`, leading and trailing silence is dropped before upload, and the
+    end-of-turn signal can be sent as soon as enough trailing silence is detected,
+    without waiting for STOP_RECORDING.
+
+    With an `encoder`, Gemini's PCM output is sent to the client as encoded frames
+    with a sequence number header instead of raw PCM chunks.
+
+    With `metrics` (a LiveMetrics), audio chunks and bytes are counted in both directions,
+    and each model turn is timed from the end-of-turn signal to its first audio chunk
+    and to turn complete.
+    """
+
+    def __init__(
+        self,
+        websocket: WebSocket,
+        session,
+        input_sample_rate: int,
+        uplink_queue_size: int = 64,
+        downlink_queue_size: int = 64,
+        slow_client_policy: str = "pause",
+        framer: Optional[PcmFramer] = None,
+        vad: Optional[VoiceActivityDetector] = None,
+        encoder: Optional[DownlinkEncoder] = None,
+        metrics=None,
+    ):
+        if slow_client_policy not in SLOW_CLIENT_POLICIES:
+            raise ValueError(f"Unknown slow client policy: {slow_client_policy}")
+        self.websocket = websocket
+        self.session = session
+        self.input_mime_type = f"audio/pcm;rate={input_sample_rate}"
+        self.slow_client_policy = slow_client_policy
+        self.uplink_queue: asyncio.Queue = asyncio.Queue(maxsize=uplink_queue_size)
+        self.downlink_queue: asyncio.Queue = asyncio.Queue(maxsize=downlink_queue_size)
+        self.dropped_chunks = 0
+        self.framer = framer
+        self.vad = vad
+        self.encoder = encoder
+        # "idle" until audio is sent, "open" while a turn has audio, "ended" after an automatic end of turn
+        self._turn_state = "idle"
+        self.uplink_stats = UplinkStats()
+        self.metrics = metrics
+        # The model turn being timed, from the end-of-turn signal until turn complete
+        self._turn = None
+
+    async def run(self):
+        """Runs the pipeline until the client disconnects or a stage fails."""
+        try:
+            async with asyncio.TaskGroup() as tg:
+                tg.create_task(self._client_reader())
+                tg.create_task(self._uplink())
+                tg.create_task(self._downlink())
+                tg.create_task(self._client_writer())
+        except* WebSocketDisconnect:
+            logger.info("Client disconnected gracefully.")
+        finally:
+            if self._turn is not None:
+                self._turn.complete("cancelled")
+        if self.dropped_chunks:
+            logger.warning(f"Dropped {self.dropped_chunks} audio chunks for a slow client.")
+
+    async def _client_reader(self):
+        """Reads client messages and queues them for the uplink."""
+        while True:
+            message = await self.websocket.receive()
+            if message["type"] == "websocket.disconnect":
+                raise WebSocketDisconnect(message.get("code", 1000))
+
+            if message.get("text") == "STOP_RECORDING":
+                # This is the signal to end the audio stream
+                logger.info("Client stopped recording. Sending end-of-turn signal.")
+                await self.uplink_queue.put(END_OF_TURN)
+            elif message.get("bytes"):
+                # This is a raw PCM audio chunk
+                await self.uplink_queue.put(message["bytes"])
+
+    async def _uplink(self):
+        """Forwards queued client audio to the Gemini Live session."""
+        while True:
+            item = await self.uplink_queue.get()
+            if item is END_OF_TURN:
+                # Flush any partial frame, then end the turn
+                if self.framer is not None:
+                    remainder = self.framer.flush()
+                    if remainder:
+                        await self._send_frame(remainder)
+                await self._stop_recording()
+                continue
+
+            self.uplink_stats.record_chunk()
+            if self.framer is None:
+                await self._send_frame(item)
+            else:
+                for frame in self.framer.feed(item):
+                    await self._send_frame(frame)
+
+    async def _send_frame(self, frame: bytes):
+        if self.vad is None:
+            await self._send_audio(frame)
+            return
+
+        audio, end_of_turn = self.vad.process(frame)
+        if audio:
+            await self._send_audio(audio)
+        if end_of_turn and self._turn_state == "open":
+            logger.info("Detected end of speech. Sending end-of-turn signal.")
+            await self._send_end_of_turn()
+            self._turn_state = "ended"
+
+    async def _send_audio(self, data: bytes):
+        await self.session.send_realtime_input(media=Blob(data=data, mime_type=self.input_mime_type))
+        self.uplink_stats.record_send(len(data))
+        if self.metrics is not None:
+            self.metrics.record_chunk("uplink", len(data))
+        self._turn_state = "open"
+
+    async def _send_end_of_turn(self):
+        # Send the final empty chunk to tell Gemini the turn is over
+        await self.session.send_realtime_input(media=Blob(data=b"", mime_type=self.input_mime_type))
+        if self.metrics is not None:
+            self._turn = self.metrics.start_turn()
+
+    async def _stop_recording(self):
+        if self.vad is not None:
+            self.vad.reset()
+            if self._turn_state == "ended":
+                # The turn already ended on trailing silence; Gemini's response is on its way.
+                self._turn_state = "idle"
+                return
+            if self._turn_state == "idle":
+                # Nothing but silence was recorded, so there is no turn for Gemini to answer.
+                await self.downlink_queue.put("TURN_COMPLETE")
+                return
+        await self._send_end_of_turn()
+        self._turn_state = "idle"
+
+    async def _downlink(self):
+        """Receives every Gemini turn for the lifetime of the session and queues it for the client."""
+        while True:
+            received = False
+            async for message in self.session.receive():
+                received = True
+                server_content = message.server_content
+                if server_content is None:
+                    continue
+                if server_content.model_turn and server_content.model_turn.parts:
+                    for part in server_content.model_turn.parts:
+                        if part.inline_data and part.inline_data.data:
+                            self._record_downlink(len(part.inline_data.data))
+                            if self.encoder is None:
+                                await self._queue_audio(part.inline_data.data)
+                            else:
+                                for frame in self.encoder.encode(part.inline_data.data):
+                                    await self._queue_audio(frame)
+                if server_content.turn_complete:
+                    if self._turn is not None:
+                        self._turn.complete()
+                        self._turn = None
+                    if self.encoder is not None:
+                        # The final frame of a turn is never dropped so the client sees the end of turn flag
+                        for frame in self.encoder.flush():
+                            await self.downlink_queue.put(frame)
+                    await self.downlink_queue.put("TURN_COMPLETE")
+            if not received:
+                raise RuntimeError("Gemini Live session closed.")
+
+    def _record_downlink(self, size: int):
+        if self._turn is not None:
+            self._turn.chunk(size)
+        elif self.metrics is not None:
+            # Audio the model sends before an explicit end of turn is counted but not timed
+            self.metrics.record_chunk("downlink", size)
+
+    async def _queue_audio(self, data: bytes):
+        if self.slow_client_policy == "drop":
+            try:
+                self.downlink_queue.put_nowait(data)
+            except asyncio.QueueFull:
+                self.dropped_chunks += 1
+        else:
+            await self.downlink_queue.put(data)
+
+    async def _client_writer(self):
+        """Sends queued Gemini output to the client."""
+        while True:
+            item = await self.downlink_queue.get()
+            if isinstance(item, str):
+                await self.websocket.send_text(item)
+            else:
+                await self.websocket.send_bytes(item)
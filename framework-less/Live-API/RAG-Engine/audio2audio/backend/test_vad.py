@@ -0,0 +1,38 @@
+import math
+
+import numpy as np
+
+from vad import VoiceActivityDetector
+
+SAMPLE_RATE = 16000
+
+
+def tone(duration_ms: int) -> bytes:
+    t = np.arange(SAMPLE_RATE * duration_ms // 1000) / SAMPLE_RATE
+    return (np.sin(2 * math.pi * 220 * t) * 8000).astype("<i2").tobytes()
+
+
+def test_odd_length_chunks_keep_samples_aligned():
+    vad = VoiceActivityDetector(SAMPLE_RATE, pre_roll_ms=0, hangover_ms=0)
+    audio = tone(200)
+
+    sent = []
+    # Raw client chunks with odd lengths, as with UPLINK_FRAME_MS=0
+    for offset in range(0, len(audio), 641):
+        out, _ = vad.process(audio[offset:offset + 641])
+        sent.append(out)
+
+    assert b"".join(sent) == audio
+
+
+def test_odd_trailing_byte_is_held_back():
+    vad = VoiceActivityDetector(SAMPLE_RATE, pre_roll_ms=0, hangover_ms=0)
+    audio = tone(20)
+
+    out, end_of_turn = vad.process(audio + audio[:1])
+    assert out == audio
+    assert not end_of_turn
+
+    # The held-back byte is the first byte of the next frame's first sample
+    out, _ = vad.process(audio[1:])
+    assert out == audio
@@ -0,0 +1,106 @@
+from collections import deque
+from typing import Tuple
+
+import numpy as np
+
+
+class VoiceActivityDetector:
+    """
+    Energy and zero-crossing-rate voice activity detection over 16-bit mono PCM.
+
+    Audio is split into short analysis windows whose features are computed with NumPy
+    in one pass per frame. Leading silence is dropped except for a short pre-roll that
+    keeps speech onsets intact, and trailing silence is only sent for `hangover_ms`
+    after speech. When `end_of_turn_silence_ms` is set, `process` reports the end of
+    the turn once that much silence follows speech.
+
+    Frames may have any length: an odd trailing byte is held back and prepended to
+    the next frame, so samples stay aligned across chunks.
+    """
+
+    def __init__(
+        self,
+        sample_rate: int,
+        window_ms: int = 20,
+        energy_threshold_db: float = -45.0,
+        max_zcr: float = 0.5,
+        pre_roll_ms: int = 200,
+        hangover_ms: int = 300,
+        end_of_turn_silence_ms: int = 0,
+    ):
+        self.window_samples = max(int(sample_rate * window_ms / 1000), 1)
+        self.energy_threshold_db = energy_threshold_db
+        self.max_zcr = max_zcr
+        self.pre_roll_windows = pre_roll_ms // window_ms
+        self.hangover_windows = hangover_ms // window_ms
+        self.end_of_turn_windows = end_of_turn_silence_ms // window_ms if end_of_turn_silence_ms else 0
+        self._pre_roll = deque(maxlen=self.pre_roll_windows or 1)
+        self._carry = b""
+        self.bytes_in = 0
+        self.bytes_out = 0
+        self.reset()
+
+    def reset(self):
+        """Starts a new turn."""
+        self._in_speech = False
+        self._silent_windows = 0
+        self._pre_roll.clear()
+
+    def speech_windows(self, samples: np.ndarray) -> np.ndarray:
+        """Returns a boolean speech flag per analysis window (the last window may be partial)."""
+        n_full = len(samples) // self.window_samples
+        windows = [samples[:n_full * self.window_samples].reshape(n_full, self.window_samples)] if n_full else []
+        flags = [self._classify(w) for w in windows]
+        if len(samples) % self.window_samples:
+            flags.append(self._classify(samples[n_full * self.window_samples:][np.newaxis, :]))
+        return np.concatenate(flags) if flags else np.zeros(0, dtype=bool)
+
+    def process(self, frame: bytes) -> Tuple[bytes, bool]:
+        """
+        Filters one frame of PCM audio.
+
+        Returns the audio to send (possibly empty) and whether the end of the turn was detected.
+        """
+        self.bytes_in += len(frame)
+        frame = self._carry + frame
+        # Hold back half a sample until the next frame completes it
+        usable = len(frame) - len(frame) % 2
+        frame, self._carry = frame[:usable], frame[usable:]
+        samples = np.frombuffer(frame, dtype="<i2")
+        flags = self.speech_windows(samples)
+        window_bytes = self.window_samples * 2
+
+        kept = []
+        end_of_turn = False
+        for i, is_speech in enumerate(flags):
+            window = frame[i * window_bytes:(i + 1) * window_bytes]
+            if is_speech:
+                if not self._in_speech:
+                    # Speech onset: include the pre-roll so the first syllable is not clipped
+                    kept.extend(self._pre_roll)
+                    self._pre_roll.clear()
+                    self._in_speech = True
+                self._silent_windows = 0
+                kept.append(window)
+            elif not self._in_speech:
+                # Leading silence: only keep the most recent windows as pre-roll
+                if self.pre_roll_windows:
+                    self._pre_roll.append(window)
+            else:
+                self._silent_windows += 1
+                if self._silent_windows <= self.hangover_windows:
+                    kept.append(window)
+                if self.end_of_turn_windows and self._silent_windows >= self.end_of_turn_windows:
+                    end_of_turn = True
+                    self.reset()
+
+        audio = b"".join(kept)
+        self.bytes_out += len(audio)
+        return audio, end_of_turn
+
+    def _classify(self, windows: np.ndarray) -> np.ndarray:
+        x = windows.astype(np.float32) / 32768.0
+        energy_db = 10.0 * np.log10(np.mean(x * x, axis=1) + 1e-12)
+        signs = np.signbit(windows)
+        zcr = np.mean(signs[:, 1:] != signs[:, :-1], axis=1) if windows.shape[1] > 1 else np.zeros(len(windows))
+        return (energy_db >= self.energy_threshold_db) & (zcr <= self.max_zcr)
@@ -0,0 +1,131 @@
+"""
+Local stand-in for the Gemini Live API, used to load test the backends without Vertex AI.
+
+FakeLiveClient mirrors the `client.aio.live.connect(model=..., config=...)` surface the
+text2text and audio2audio backends use. Its sessions accept `send_client_content` and
+`send_realtime_input`, and answer every completed user turn from `receive()` after a
+configurable first-chunk delay, with a fixed number of text or audio chunks at a fixed
+cadence followed by turn complete. The response modality follows the config's
+`response_modalities`, as it does for the real API.
+"""
+
+import asyncio
+import contextlib
+import os
+from types import SimpleNamespace
+from typing import Any, Dict, Optional
+
+from google.genai import types
+
+# Answers are made of this sentence, repeated as needed
+FAKE_TEXT = "The Grand Horizon welcomes pets under 25 pounds for a nightly fee. "
+
+
+class FakeLiveSession:
+    """A Live session whose responses are generated locally with a fixed timing profile."""
+
+    def __init__(self, client: "FakeLiveClient", modality: str):
+        self.client = client
+        self.modality = modality
+        self.bytes_received = 0
+        self._turns: asyncio.Queue = asyncio.Queue()
+        self._audio_open = False
+
+    async def send_client_content(self, turns=None, turn_complete: bool = True):
+        """Accepts conversation turns; a complete turn is answered from receive()."""
+        for turn in turns or []:
+            for part in turn.get("parts", []):
+                self.bytes_received += len(part.get("text", "").encode("utf-8"))
+        if turn_complete:
+            self._turns.put_nowait(True)
+
+    async def send_realtime_input(self, media=None, audio=None, audio_stream_end: Optional[bool] = None, **kwargs):
+        """Accepts audio; an empty chunk or audio_stream_end after audio ends the user's turn."""
+        blob = media if media is not None else audio
+        data = blob.data if blob is not None else None
+        if data:
+            self.bytes_received += len(data)
+            self._audio_open = True
+        elif (blob is not None or audio_stream_end) and self._audio_open:
+            self._audio_open = False
+            self._turns.put_nowait(True)
+
+    async def receive(self):
+        """Yields the response to the next user turn, ending after turn complete."""
+        if not await self._turns.get():
+            return  # The session was closed
+        await asyncio.sleep(self.client.first_chunk_delay)
+        chunk = self.client.audio_chunk if self.modality == "AUDIO" else self.client.text_chunk
+        for i in range(self.client.chunks_per_turn):
+            if i:
+                await asyncio.sleep(self.client.chunk_interval)
+            yield chunk
+        yield self.client.turn_complete
+
+    def close(self):
+        self._turns.put_nowait(False)
+
+
+class FakeLiveClient:
+    """
+    Drop-in for `genai.Client` where the backends open Live sessions.
+
+    `first_chunk_delay` is the time from the end of a user turn to the first response
+    chunk and `chunk_interval` the time between chunks, both in seconds. Each response
+    has `chunks_per_turn` chunks of `text_chunk_chars` characters or `audio_chunk_bytes`
+    bytes of 24 kHz PCM. `connect_delay` is added to every connect.
+    """
+
+    def __init__(
+        self,
+        first_chunk_delay: float = 0.5,
+        chunk_interval: float = 0.04,
+        chunks_per_turn: int = 25,
+        text_chunk_chars: int = 40,
+        audio_chunk_bytes: int = 3840,
+        connect_delay: float = 0.1,
+    ):
+        self.first_chunk_delay = first_chunk_delay
+        self.chunk_interval = chunk_interval
+        self.chunks_per_turn = chunks_per_turn
+        self.connect_delay = connect_delay
+        self.sessions_opened = 0
+
+        # Messages are immutable, so every session reuses the same few instances
+        text = (FAKE_TEXT * (text_chunk_chars // len(FAKE_TEXT) + 1))[:text_chunk_chars]
+        self.text_chunk = self._message(types.Part(text=text))
+        self.audio_chunk = self._message(types.Part(inline_data=types.Blob(
+            data=bytes(audio_chunk_bytes), mime_type="audio/pcm;rate=24000")))
+        self.turn_complete = types.LiveServerMessage(server_content=types.LiveServerContent(turn_complete=True))
+
+        # Same call path as the real client: client.aio.live.connect(...)
+        self.aio = SimpleNamespace(live=SimpleNamespace(connect=self.connect))
+
+    @classmethod
+    def from_env(cls) -> "FakeLiveClient":
+        """Builds a client from FAKE_LIVE_* environment variables (durations in milliseconds)."""
+        return cls(
+            first_chunk_delay=float(os.environ.get("FAKE_LIVE_FIRST_CHUNK_MS", "500")) / 1000,
+            chunk_interval=float(os.environ.get("FAKE_LIVE_CHUNK_INTERVAL_MS", "40")) / 1000,
+            chunks_per_turn=int(os.environ.get("FAKE_LIVE_CHUNKS_PER_TURN", "25")),
+            text_chunk_chars=int(os.environ.get("FAKE_LIVE_TEXT_CHUNK_CHARS", "40")),
+            audio_chunk_bytes=int(os.environ.get("FAKE_LIVE_AUDIO_CHUNK_BYTES", "3840")),
+            connect_delay=float(os.environ.get("FAKE_LIVE_CONNECT_MS", "100")) / 1000,
+        )
+
+    @contextlib.asynccontextmanager
+    async def connect(self, model: str, config: Optional[Dict[str, Any]] = None):
+        """Opens a fake Live session; it answers in audio if the config asks for AUDIO."""
+        modalities = (config or {}).get("response_modalities") or ["TEXT"]
+        await asyncio.sleep(self.connect_delay)
+        self.sessions_opened += 1
+        session = FakeLiveSession(self, "AUDIO" if "AUDIO" in modalities else "TEXT")
+        try:
+            yield session
+        finally:
+            session.close()
+
+    @staticmethod
+    def _message(part: types.Part) -> types.LiveServerMessage:
+        return types.LiveServerMessage(server_content=types.LiveServerContent(
+            model_turn=types.Content(role="model", parts=[part])))
@@ -0,0 +1,189 @@
+"""
+Latency and throughput instrumentation for the Live API backends.
+
+Shared by the text2text and audio2audio backends. Metrics are recorded with
+OpenTelemetry and exported in the Prometheus text format for a `/metrics`
+endpoint. Spans go to the globally configured OpenTelemetry tracer provider,
+so they cost next to nothing unless a tracing exporter is set up.
+"""
+
+import atexit
+import contextlib
+import logging
+import logging.handlers
+import queue
+import random
+import sys
+import time
+from typing import Any, AsyncContextManager, Dict, List, Optional, Tuple
+
+from opentelemetry import trace
+from opentelemetry.exporter.prometheus import PrometheusMetricReader
+from opentelemetry.sdk.metrics import MeterProvider
+from opentelemetry.sdk.resources import Resource
+from prometheus_client import CONTENT_TYPE_LATEST, generate_latest
+
+UPLINK = "uplink"
+DOWNLINK = "downlink"
+
+
+class LiveTurn:
+    """
+    Times one model turn: from the request (or end of the user's audio) to the first
+    response chunk, and to turn complete. Downlink chunks are counted as they arrive.
+    """
+
+    def __init__(self, metrics: "LiveMetrics", attributes: Dict[str, Any]):
+        self.metrics = metrics
+        self.attributes = attributes
+        self.chunks = 0
+        self.bytes = 0
+        self.first_chunk_ms: Optional[float] = None
+        self._start = time.perf_counter()
+        self._span = metrics.tracer.start_span("live.turn", attributes=attributes)
+        self._done = False
+
+    def chunk(self, size: int):
+        """Records a response chunk of `size` bytes."""
+        if self.first_chunk_ms is None:
+            self.first_chunk_ms = (time.perf_counter() - self._start) * 1000
+            self.metrics.time_to_first_chunk.record(self.first_chunk_ms, self.attributes)
+            self._span.add_event("first_chunk")
+        self.chunks += 1
+        self.bytes += size
+        self.metrics.record_chunk(DOWNLINK, size)
+
+    def complete(self, outcome: str = "ok"):
+        """Records the turn duration; later calls are ignored."""
+        if self._done:
+            return
+        self._done = True
+        elapsed_ms = (time.perf_counter() - self._start) * 1000
+        self.metrics.turn_duration.record(elapsed_ms, {**self.attributes, "outcome": outcome})
+        self._span.set_attribute("live.chunks", self.chunks)
+        self._span.set_attribute("live.bytes", self.bytes)
+        if outcome != "ok":
+            self._span.set_status(trace.Status(trace.StatusCode.ERROR, outcome))
+        self._span.end()
+
+
+class LiveMetrics:
+    """
+    OpenTelemetry instruments for Live API sessions, exported for Prometheus.
+
+    Records Live connect time, history send time, time to first chunk, time to turn
+    complete, chunks and bytes in each direction and the number of open sessions.
+    Durations are in milliseconds. Create one instance per process: the Prometheus
+    reader registers itself with the default prometheus_client registry.
+    """
+
+    def __init__(self, service_name: str):
+        self.service_name = service_name
+        self.reader = PrometheusMetricReader()
+        self.provider = MeterProvider(
+            resource=Resource.create({"service.name": service_name}),
+            metric_readers=[self.reader],
+        )
+        meter = self.provider.get_meter("rag_engine.live")
+        self.tracer = trace.get_tracer("rag_engine.live")
+
+        self.connect_duration = meter.create_histogram(
+            "live.connect.duration", unit="ms", description="Time to open a Live API session")
+        self.history_send_duration = meter.create_histogram(
+            "live.history_send.duration", unit="ms", description="Time to send conversation turns to a Live API session")
+        self.time_to_first_chunk = meter.create_histogram(
+            "live.time_to_first_chunk", unit="ms", description="Time from the start of a turn to the first response chunk")
+        self.turn_duration = meter.create_histogram(
+            "live.turn.duration", unit="ms", description="Time from the start of a turn to turn complete")
+        self.chunks = meter.create_counter(
+            "live.chunks", description="Chunks exchanged with the Live API, by direction")
+        self.bytes = meter.create_counter(
+            "live.bytes", unit="By", description="Payload bytes exchanged with the Live API, by direction")
+        self.active_sessions = meter.create_up_down_counter(
+            "live.sessions.active", description="Open Live API sessions")
+
+    @contextlib.contextmanager
+    def timed(self, name: str, histogram, **attributes):
+        """Records the duration of the block on `histogram` and as a span called `name`."""
+        start = time.perf_counter()
+        outcome = "ok"
+        with self.tracer.start_as_current_span(name, attributes=attributes):
+            try:
+                yield
+            except BaseException:
+                outcome = "error"
+                raise
+            finally:
+                histogram.record((time.perf_counter() - start) * 1000, {**attributes, "outcome": outcome})
+
+    @contextlib.asynccontextmanager
+    async def session(self, connect: AsyncContextManager):
+        """Enters a Live API connect() context, timing the connect and counting the session as active until it closes."""
+        async with contextlib.AsyncExitStack() as stack:
+            with self.timed("live.connect", self.connect_duration):
+                session = await stack.enter_async_context(connect)
+            self.active_sessions.add(1)
+            try:
+                yield session
+            finally:
+                self.active_sessions.add(-1)
+
+    @contextlib.contextmanager
+    def history_send(self, turns: List[Dict[str, Any]]):
+        """Times a send_client_content call and counts the text it uploads."""
+        with self.timed("live.history_send", self.history_send_duration):
+            trace.get_current_span().set_attribute("live.turns", len(turns))
+            yield
+        self.record_chunk(UPLINK, sum(
+            len(part.get("text", "").encode("utf-8")) for turn in turns for part in turn.get("parts", [])
+        ))
+
+    def start_turn(self, **attributes) -> LiveTurn:
+        """Starts timing a model turn."""
+        return LiveTurn(self, attributes)
+
+    def record_chunk(self, direction: str, size: int):
+        """Counts one chunk of `size` bytes sent to (uplink) or received from (downlink) the Live API."""
+        self.chunks.add(1, {"direction": direction})
+        self.bytes.add(size, {"direction": direction})
+
+    def exposition(self) -> Tuple[bytes, str]:
+        """Returns the current metrics in the Prometheus text format and its content type."""
+        return generate_latest(), CONTENT_TYPE_LATEST
+
+
+class SampleFilter(logging.Filter):
+    """Passes a random `rate` fraction of log records (1 passes all, 0 drops all)."""
+
+    def __init__(self, rate: float):
+        super().__init__()
+        self.rate = rate
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        return self.rate >= 1 or random.random() < self.rate
+
+
+def sampled_logger(name: str, sample_rate: float, stream=sys.stdout) -> logging.Logger:
+    """
+    Returns a logger for hot paths such as per-chunk logging.
+
+    Only a `sample_rate` fraction of records is kept, and kept records are handed to a
+    background thread through a queue, so logging never blocks the event loop on I/O.
+    """
+    logger = logging.getLogger(name)
+    logger.setLevel(logging.INFO)
+    logger.propagate = False
+    if logger.handlers:
+        return logger
+
+    records: queue.SimpleQueue = queue.SimpleQueue()
+    handler = logging.handlers.QueueHandler(records)
+    handler.addFilter(SampleFilter(sample_rate))
+    logger.addHandler(handler)
+
+    output = logging.StreamHandler(stream)
+    output.setFormatter(logging.Formatter("%(asctime)s %(name)s %(message)s"))
+    listener = logging.handlers.QueueListener(records, output)
+    listener.start()
+    atexit.register(listener.stop)
+    return logger
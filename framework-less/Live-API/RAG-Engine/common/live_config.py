@@ -0,0 +1,162 @@
+"""
+Background resolution of the RAG Engine corpus and Live API config.
+
+Shared by the text2text and audio2audio backends so that server startup never
+blocks on Vertex AI, and warm restarts can reuse a locally cached lookup.
+"""
+
+import asyncio
+import json
+import logging
+import os
+import time
+from typing import Any, Dict, List, Optional
+
+logger = logging.getLogger(__name__)
+
+
+def default_cache_path(name: str) -> str:
+    """Returns a cache file path for one backend under the user's cache dir, outside the source tree."""
+    cache_home = os.environ.get("XDG_CACHE_HOME") or os.path.join(os.path.expanduser("~"), ".cache")
+    return os.path.join(cache_home, "rag-engine-live", f"{name}.json")
+
+
+def rag_tools(corpus_name: Optional[str]) -> List[Dict[str, Any]]:
+    """Builds the Live API tools for a RAG Engine corpus, or no tools without one."""
+    if not corpus_name:
+        return []
+    return [{"retrieval": {"vertex_rag_store": {"rag_resources": [{"rag_corpus": corpus_name}]}}}]
+
+
+class LiveConfigLoader:
+    """
+    Resolves the RAG corpus in the background with retries and builds the Live API config.
+
+    `ready` is set once the config is available, either from the local cache file or
+    from a successful lookup. Until then `config` is None and requests should be refused.
+    """
+
+    def __init__(
+        self,
+        project: str,
+        location: str,
+        base_config: Dict[str, Any],
+        cache_path: Optional[str] = None,
+        cache_ttl: float = 24 * 3600.0,
+        require_corpus: bool = True,
+        retry_initial_delay: float = 1.0,
+        retry_max_delay: float = 60.0,
+    ):
+        self.project = project
+        self.location = location
+        self.base_config = base_config
+        self.cache_path = cache_path or default_cache_path("live_config")
+        self.cache_ttl = cache_ttl
+        self.require_corpus = require_corpus
+        self.retry_initial_delay = retry_initial_delay
+        self.retry_max_delay = retry_max_delay
+
+        self.ready = asyncio.Event()
+        self.corpus_name: Optional[str] = None
+        self.config: Optional[Dict[str, Any]] = None
+        self.last_error: Optional[str] = None
+        self._task: Optional[asyncio.Task] = None
+
+    async def start(self):
+        """Uses the cached config if it is fresh, otherwise starts resolving it in the background."""
+        cached = self._read_cache()
+        if cached is not None:
+            logger.info(f"Using cached Live API config (RAG corpus: {cached.get('corpus_name')}).")
+            self._set_config(cached.get("corpus_name"))
+            return
+        self._task = asyncio.create_task(self._resolve_with_retries())
+
+    def use_corpus(self, corpus_name: Optional[str]):
+        """Sets the config directly without a lookup, e.g. when running against a fake Live API."""
+        self._set_config(corpus_name)
+
+    async def stop(self):
+        """Cancels a lookup that is still in progress."""
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+    def status(self) -> Dict[str, Any]:
+        """Returns readiness details for a health endpoint."""
+        if self.ready.is_set():
+            return {"status": "ready", "rag_corpus": self.corpus_name}
+        return {"status": "starting", "last_error": self.last_error}
+
+    async def _resolve_with_retries(self):
+        delay = self.retry_initial_delay
+        attempt = 1
+        while True:
+            try:
+                corpus_name = await asyncio.to_thread(self._lookup_corpus)
+                break
+            except Exception as e:
+                self.last_error = str(e)
+                logger.warning(f"RAG corpus lookup attempt {attempt} failed: {e}. Retrying in {delay:.0f}s.")
+                await asyncio.sleep(delay)
+                delay = min(delay * 2, self.retry_max_delay)
+                attempt += 1
+
+        self._set_config(corpus_name)
+        self._write_cache(corpus_name)
+
+    def _lookup_corpus(self) -> Optional[str]:
+        # Imported here so that loading this module stays cheap at startup.
+        import vertexai
+        from vertexai import rag
+
+        vertexai.init(project=self.project, location=self.location)
+
+        # Assumes the most recently created corpus is listed last
+        corpora = list(rag.list_corpora())
+        if not corpora:
+            if self.require_corpus:
+                raise RuntimeError("No RAG corpora found. Please create one.")
+            logger.info("No RAG corpora found. Continuing without RAG.")
+            return None
+        logger.info(f"Using RAG Corpus: {corpora[-1].display_name} ({corpora[-1].name})")
+        return corpora[-1].name
+
+    def _set_config(self, corpus_name: Optional[str]):
+        self.corpus_name = corpus_name
+        self.config = {**self.base_config, "tools": rag_tools(corpus_name)}
+        self.last_error = None
+        self.ready.set()
+
+    def _read_cache(self) -> Optional[Dict[str, Any]]:
+        try:
+            with open(self.cache_path) as f:
+                cached = json.load(f)
+        except (OSError, ValueError):
+            return None
+        if cached.get("project") != self.project or cached.get("location") != self.location:
+            return None
+        if time.time() - cached.get("resolved_at", 0) > self.cache_ttl:
+            return None
+        if self.require_corpus and not cached.get("corpus_name"):
+            return None
+        return cached
+
+    def _write_cache(self, corpus_name: Optional[str]):
+        cached = {
+            "project": self.project,
+            "location": self.location,
+            "corpus_name": corpus_name,
+            "resolved_at": time.time(),
+        }
+        try:
+            os.makedirs(os.path.dirname(os.path.abspath(self.cache_path)), exist_ok=True)
+            tmp_path = f"{self.cache_path}.tmp"
+            with open(tmp_path, "w") as f:
+                json.dump(cached, f)
+            os.replace(tmp_path, self.cache_path)
+        except OSError as e:
+            logger.warning(f"Could not write Live API config cache {self.cache_path}: {e}")
@@ -0,0 +1,308 @@
+"""
+Load generator for the text2text and audio2audio backends.
+
+Drives N concurrent `/chat` clients and `/ws` audio callers and reports throughput and
+p50/p95/p99 of time to first chunk and time to turn complete for each concurrency level.
+Run the backends with LIVE_API_BACKEND=fake (or pass --spawn) so every run sees the same
+Live API timing, and save results with --output to compare them across commits.
+
+Usage:
+    python load_generator.py --spawn --clients 1,10,50 --output results/$(git rev-parse --short HEAD).json
+    python load_generator.py --compare results/<before>.json results/<after>.json
+"""
+
+import argparse
+import asyncio
+import json
+import math
+import os
+import subprocess
+import sys
+import tempfile
+import time
+from typing import Any, Dict, List, Optional
+
+import httpx
+import numpy as np
+import websockets
+
+RAG_ENGINE_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..")
+BACKEND_DIRS = {
+    "text": os.path.join(RAG_ENGINE_DIR, "text2text", "backend"),
+    "audio": os.path.join(RAG_ENGINE_DIR, "audio2audio", "backend"),
+}
+INPUT_SAMPLE_RATE = 16000
+PROMPT = "What is the pet policy?"
+
+
+# --- Synthetic audio ---
+
+def synthetic_pcm(duration_ms: int, sample_rate: int = INPUT_SAMPLE_RATE) -> bytes:
+    """Returns 16-bit mono PCM of a 220 Hz tone, loud enough to pass server-side VAD."""
+    t = np.arange(int(sample_rate * duration_ms / 1000)) / sample_rate
+    return (np.sin(2 * math.pi * 220 * t) * 8000).astype("<i2").tobytes()
+
+
+# --- Clients ---
+
+class TurnTimer:
+    """Collects time to first chunk and time to turn complete for every turn of a run."""
+
+    def __init__(self):
+        self.first_chunk_ms: List[float] = []
+        self.turn_ms: List[float] = []
+        self.errors: List[str] = []
+
+    def record(self, start: float, first_chunk: Optional[float], end: float):
+        if first_chunk is not None:
+            self.first_chunk_ms.append((first_chunk - start) * 1000)
+        self.turn_ms.append((end - start) * 1000)
+
+
+async def chat_client(http: httpx.AsyncClient, base_url: str, endpoint: str, turns: int, timer: TurnTimer):
+    """Runs one conversation of `turns` turns, sending only the new message each turn."""
+    conversation_id = None
+    for _ in range(turns):
+        body = {"message": {"role": "user", "parts": [{"text": PROMPT}]}}
+        if conversation_id:
+            body["conversation_id"] = conversation_id
+        start = time.perf_counter()
+        first_chunk = None
+        try:
+            if endpoint == "chat":
+                # /chat returns the whole answer at once, so only turn completion is measured
+                response = await http.post(f"{base_url}/chat", json=body)
+                response.raise_for_status()
+                conversation_id = response.json()["conversation_id"]
+            else:
+                async with http.stream("POST", f"{base_url}/chat/stream", json=body) as response:
+                    response.raise_for_status()
+                    event = None
+                    async for line in response.aiter_lines():
+                        if line.startswith("event: "):
+                            event = line[len("event: "):]
+                        elif line.startswith("data: "):
+                            if event == "text" and first_chunk is None:
+                                first_chunk = time.perf_counter()
+                            elif event == "done":
+                                conversation_id = json.loads(line[len("data: "):])["conversation_id"]
+                            elif event == "error":
+                                raise RuntimeError(json.loads(line[len("data: "):])["detail"])
+        except Exception as e:
+            timer.errors.append(f"chat: {e!r}")
+            return
+        timer.record(start, first_chunk, time.perf_counter())
+
+async def audio_caller(ws_url: str, turns: int, utterance_ms: int, chunk_ms: int, realtime: bool,
+                       turn_timeout: float, timer: TurnTimer):
+    """Runs one call of `turns` spoken turns, each ending with STOP_RECORDING."""
+    chunk_bytes = INPUT_SAMPLE_RATE * 2 * chunk_ms // 1000
+    utterance = synthetic_pcm(utterance_ms)
+    try:
+        async with websockets.connect(ws_url, max_size=None) as ws:
+            for _ in range(turns):
+                for offset in range(0, len(utterance), chunk_bytes):
+                    await ws.send(utterance[offset:offset + chunk_bytes])
+                    if realtime:
+                        await asyncio.sleep(chunk_ms / 1000)
+                await ws.send("STOP_RECORDING")
+
+                start = time.perf_counter()
+                first_chunk = None
+                async with asyncio.timeout(turn_timeout):
+                    while True:
+                        message = await ws.recv()
+                        if isinstance(message, bytes):
+                            if first_chunk is None:
+                                first_chunk = time.perf_counter()
+                        elif message == "TURN_COMPLETE":
+                            break
+                timer.record(start, first_chunk, time.perf_counter())
+    except Exception as e:
+        timer.errors.append(f"audio: {e!r}")
+
+
+# --- Runs and reports ---
+
+def percentiles(values: List[float]) -> Dict[str, Optional[float]]:
+    if not values:
+        return {"p50": None, "p95": None, "p99": None}
+    p50, p95, p99 = np.percentile(values, [50, 95, 99])
+    return {"p50": round(float(p50), 1), "p95": round(float(p95), 1), "p99": round(float(p99), 1)}
+
+async def run_level(target: str, clients: int, args) -> Dict[str, Any]:
+    """Runs `clients` concurrent clients of one kind and summarizes their turns."""
+    timer = TurnTimer()
+    start = time.perf_counter()
+
+    async def delayed(i, coro):
+        # Spread client starts over the ramp so connects do not all land at once
+        await asyncio.sleep(args.ramp_s * i / clients)
+        await coro
+
+    if target == "text":
+        limits = httpx.Limits(max_connections=None, max_keepalive_connections=None)
+        async with httpx.AsyncClient(limits=limits, timeout=args.turn_timeout) as http:
+            await asyncio.gather(*(
+                delayed(i, chat_client(http, args.text_url, args.text_endpoint, args.turns, timer))
+                for i in range(clients)
+            ))
+    else:
+        await asyncio.gather(*(
+            delayed(i, audio_caller(args.audio_url, args.turns, args.utterance_ms, args.chunk_ms,
+                                    not args.no_realtime, args.turn_timeout, timer))
+            for i in range(clients)
+        ))
+
+    elapsed = time.perf_counter() - start
+    return {
+        "target": target,
+        "clients": clients,
+        "turns": len(timer.turn_ms),
+        "errors": len(timer.errors),
+        "error_samples": timer.errors[:5],
+        "elapsed_s": round(elapsed, 2),
+        "turns_per_s": round(len(timer.turn_ms) / elapsed, 2),
+        "first_chunk_ms": percentiles(timer.first_chunk_ms),
+        "turn_ms": percentiles(timer.turn_ms),
+    }
+
+def print_result(result: Dict[str, Any]):
+    ttfc, turn = result["first_chunk_ms"], result["turn_ms"]
+    print(f"{result['target']:<6}{result['clients']:>8}{result['turns']:>8}{result['errors']:>8}"
+          f"{result['turns_per_s']:>10}   "
+          f"{_fmt(ttfc['p50'])} {_fmt(ttfc['p95'])} {_fmt(ttfc['p99'])}   "
+          f"{_fmt(turn['p50'])} {_fmt(turn['p95'])} {_fmt(turn['p99'])}")
+
+def print_header():
+    print(f"{'target':<6}{'clients':>8}{'turns':>8}{'errors':>8}{'turns/s':>10}   "
+          f"{'first chunk p50/p95/p99 ms':>26}   {'turn complete p50/p95/p99 ms':>26}")
+
+def _fmt(value: Optional[float]) -> str:
+    return f"{value:8.1f}" if value is not None else f"{'-':>8}"
+
+def compare(before_path: str, after_path: str):
+    """Prints the change in throughput and latency percentiles between two saved runs."""
+    with open(before_path) as f:
+        before = json.load(f)
+    with open(after_path) as f:
+        after = json.load(f)
+    print(f"before: {before.get('commit')}  after: {after.get('commit')}")
+    baseline = {(r["target"], r["clients"]): r for r in before["results"]}
+    for result in after["results"]:
+        old = baseline.get((result["target"], result["clients"]))
+        if old is None:
+            continue
+        print(f"\n{result['target']} x {result['clients']}: turns/s {old['turns_per_s']} -> {result['turns_per_s']}"
+              f" ({_change(old['turns_per_s'], result['turns_per_s'])})")
+        for metric in ("first_chunk_ms", "turn_ms"):
+            for p in ("p50", "p95", "p99"):
+                a, b = old[metric][p], result[metric][p]
+                if a is not None and b is not None:
+                    print(f"  {metric:<15}{p}  {a:9.1f} -> {b:9.1f} ms  ({_change(a, b)})")
+
+def _change(before: float, after: float) -> str:
+    return f"{(after - before) / before * 100:+.1f}%" if before else "n/a"
+
+
+# --- Spawned backends ---
+
+def spawn_backend(target: str, port: int) -> subprocess.Popen:
+    """Starts a backend with the fake Live API; FAKE_LIVE_* settings are inherited from this environment."""
+    env = {**os.environ, "LIVE_API_BACKEND": "fake"}
+    log_path = os.path.join(tempfile.gettempdir(), f"loadtest-{target}-backend.log")
+    print(f"Starting the {target} backend on port {port} (log: {log_path})")
+    with open(log_path, "w") as log:
+        return subprocess.Popen(
+            [sys.executable, "-m", "uvicorn", "main:app", "--port", str(port), "--log-level", "warning"],
+            cwd=BACKEND_DIRS[target], env=env, stdout=log, stderr=subprocess.STDOUT,
+        )
+
+async def wait_ready(base_url: str, timeout: float = 60.0):
+    deadline = time.monotonic() + timeout
+    async with httpx.AsyncClient() as http:
+        while time.monotonic() < deadline:
+            try:
+                if (await http.get(f"{base_url}/readyz")).status_code == 200:
+                    return
+            except httpx.TransportError:
+                pass
+            await asyncio.sleep(0.25)
+    raise RuntimeError(f"{base_url} did not become ready within {timeout:.0f}s")
+
+def git_commit() -> Optional[str]:
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], cwd=RAG_ENGINE_DIR,
+                              capture_output=True, text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+async def main(args):
+    targets = ["text", "audio"] if args.target == "both" else [args.target]
+    levels = [int(n) for n in args.clients.split(",")]
+
+    processes = []
+    try:
+        if args.spawn:
+            ports = {"text": args.text_port, "audio": args.audio_port}
+            args.text_url = f"http://127.0.0.1:{ports['text']}"
+            args.audio_url = f"ws://127.0.0.1:{ports['audio']}/ws"
+            for target in targets:
+                processes.append(spawn_backend(target, ports[target]))
+            for target in targets:
+                await wait_ready(f"http://127.0.0.1:{ports[target]}")
+
+        print_header()
+        results = []
+        for target in targets:
+            for clients in levels:
+                result = await run_level(target, clients, args)
+                print_result(result)
+                for error in result["error_samples"]:
+                    print(f"    {error}")
+                results.append(result)
+    finally:
+        for process in processes:
+            process.terminate()
+            process.wait()
+
+    if args.output:
+        os.makedirs(os.path.dirname(os.path.abspath(args.output)), exist_ok=True)
+        report = {
+            "commit": git_commit(),
+            "started_at": time.strftime("%Y-%m-%dT%H:%M:%S%z"),
+            "params": {key: value for key, value in vars(args).items() if key not in ("output", "compare")},
+            "fake_live": {key: value for key, value in os.environ.items() if key.startswith("FAKE_LIVE_")},
+            "results": results,
+        }
+        with open(args.output, "w") as f:
+            json.dump(report, f, indent=2)
+        print(f"\nSaved results to {args.output}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Load test the Live API backends.")
+    parser.add_argument("--target", choices=["text", "audio", "both"], default="both")
+    parser.add_argument("--clients", default="1,10,50", help="Comma-separated concurrency levels to run in turn")
+    parser.add_argument("--turns", type=int, default=5, help="Turns per client")
+    parser.add_argument("--text-url", default="http://127.0.0.1:8000")
+    parser.add_argument("--audio-url", default="ws://127.0.0.1:8001/ws")
+    parser.add_argument("--text-endpoint", choices=["stream", "chat"], default="stream",
+                        help="'stream' uses /chat/stream and measures time to first chunk; 'chat' uses /chat")
+    parser.add_argument("--utterance-ms", type=int, default=2000, help="Length of each spoken turn")
+    parser.add_argument("--chunk-ms", type=int, default=40, help="Audio sent per WebSocket message")
+    parser.add_argument("--no-realtime", action="store_true", help="Send audio as fast as possible instead of in real time")
+    parser.add_argument("--ramp-s", type=float, default=1.0, help="Spread client starts over this many seconds")
+    parser.add_argument("--turn-timeout", type=float, default=60.0)
+    parser.add_argument("--spawn", action="store_true", help="Start the backends with the fake Live API")
+    parser.add_argument("--text-port", type=int, default=8000)
+    parser.add_argument("--audio-port", type=int, default=8001)
+    parser.add_argument("--output", help="Save results as JSON")
+    parser.add_argument("--compare", nargs=2, metavar=("BEFORE", "AFTER"), help="Compare two saved results and exit")
+    args = parser.parse_args()
+
+    if args.compare:
+        compare(*args.compare)
+    else:
+        asyncio.run(main(args))
@@ -0,0 +1,130 @@
+import asyncio
+import contextlib
+import json
+import sqlite3
+import threading
+from abc import ABC, abstractmethod
+from collections import OrderedDict
+from typing import Any, Dict, List, Optional
+
+
+class ConversationStore(ABC):
+    """
+    Server-side conversation history, so clients can send only the new turn.
+
+    Turns are stored as the same dicts sent to the Gemini API,
+    e.g. {"role": "user", "parts": [{"text": "..."}]}.
+    """
+
+    def __init__(self):
+        # Per-conversation turn locks with the number of turns holding or waiting for each
+        self._conversation_locks: Dict[str, list] = {}
+
+    @abstractmethod
+    async def get(self, conversation_id: str) -> Optional[List[Dict[str, Any]]]:
+        """Returns the stored history, or None if the conversation is unknown."""
+
+    @abstractmethod
+    async def append(self, conversation_id: str, turns: List[Dict[str, Any]]):
+        """Appends turns to a conversation, creating it if needed."""
+
+    @contextlib.asynccontextmanager
+    async def lock(self, conversation_id: str):
+        """
+        Serializes turns of one conversation within this process.
+
+        Hold it from reading the history until the new turns are appended, so that
+        concurrent turns neither answer from a stale history nor interleave their appends.
+        """
+        entry = self._conversation_locks.setdefault(conversation_id, [asyncio.Lock(), 0])
+        entry[1] += 1
+        try:
+            async with entry[0]:
+                yield
+        finally:
+            entry[1] -= 1
+            if entry[1] == 0:
+                del self._conversation_locks[conversation_id]
+
+
+class InMemoryConversationStore(ConversationStore):
+    """Keeps conversations in process memory, evicting the least recently used beyond `max_conversations`."""
+
+    def __init__(self, max_conversations: int = 10000):
+        super().__init__()
+        self.max_conversations = max_conversations
+        self._conversations: "OrderedDict[str, List[Dict[str, Any]]]" = OrderedDict()
+
+    async def get(self, conversation_id):
+        history = self._conversations.get(conversation_id)
+        if history is None:
+            return None
+        self._conversations.move_to_end(conversation_id)
+        return list(history)
+
+    async def append(self, conversation_id, turns):
+        self._conversations.setdefault(conversation_id, []).extend(turns)
+        self._conversations.move_to_end(conversation_id)
+        while len(self._conversations) > self.max_conversations:
+            self._conversations.popitem(last=False)
+
+
+class SQLiteConversationStore(ConversationStore):
+    """Keeps conversations in a local SQLite file, one row per turn, so they survive restarts."""
+
+    def __init__(self, path: str = "conversations.db"):
+        super().__init__()
+        self._db = sqlite3.connect(path, check_same_thread=False)
+        self._lock = threading.Lock()
+        with self._lock, self._db:
+            self._db.execute("PRAGMA journal_mode=WAL")
+            self._db.execute(
+                """
+                CREATE TABLE IF NOT EXISTS turns (
+                    conversation_id TEXT NOT NULL,
+                    seq INTEGER NOT NULL,
+                    role TEXT NOT NULL,
+                    parts TEXT NOT NULL,
+                    PRIMARY KEY (conversation_id, seq)
+                )
+                """
+            )
+
+    async def get(self, conversation_id):
+        return await asyncio.to_thread(self._get, conversation_id)
+
+    async def append(self, conversation_id, turns):
+        await asyncio.to_thread(self._append, conversation_id, turns)
+
+    def _get(self, conversation_id):
+        with self._lock:
+            rows = self._db.execute(
+                "SELECT role, parts FROM turns WHERE conversation_id = ? ORDER BY seq",
+                (conversation_id,),
+            ).fetchall()
+        if not rows:
+            return None
+        return [{"role": role, "parts": json.loads(parts)} for role, parts in rows]
+
+    def _append(self, conversation_id, turns):
+        with self._lock, self._db:
+            (next_seq,) = self._db.execute(
+                "SELECT COALESCE(MAX(seq) + 1, 0) FROM turns WHERE conversation_id = ?",
+                (conversation_id,),
+            ).fetchone()
+            self._db.executemany(
+                "INSERT INTO turns (conversation_id, seq, role, parts) VALUES (?, ?, ?, ?)",
+                [
+                    (conversation_id, next_seq + i, turn["role"], json.dumps(turn["parts"]))
+                    for i, turn in enumerate(turns)
+                ],
+            )
+
+
+def create_conversation_store(backend: str, path: str = "conversations.db") -> ConversationStore:
+    """Builds the conversation store named by `backend` ("memory" or "sqlite")."""
+    if backend == "memory":
+        return InMemoryConversationStore()
+    if backend == "sqlite":
+        return SQLiteConversationStore(path)
+    raise ValueError(f"Unknown conversation store backend: {backend}")
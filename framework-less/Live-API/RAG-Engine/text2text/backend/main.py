@@ -1,58 +1,86 @@
 import os
+import sys
+import json
+import uuid
 import uvicorn
-import vertexai
-from vertexai import rag
+from contextlib import asynccontextmanager
 from google import genai
 from fastapi import FastAPI, HTTPException
-from pydantic import BaseModel, Field
-from typing import List, Dict, Any
+from fastapi.responses import JSONResponse, Response, StreamingResponse
+from pydantic import BaseModel, Field, model_validator
+from typing import List, Dict, Any, Optional
+
+from conversation_store import create_conversation_store
+from response_cache import ResponseCache
+from session_manager import LiveSessionManager
+
+# History compaction is shared with the CLI in the parent text2text folder
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+from history_compaction import HistoryCompactor, make_gemini_summarizer
+
+# Startup helpers are shared with the audio2audio backend
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "..", "common"))
+from live_config import LiveConfigLoader, default_cache_path
+from instrumentation import LiveMetrics, sampled_logger
+from fake_live import FakeLiveClient
 
 # --- Configuration ---
 PROJECT_ID = os.environ.get("GCP_PROJECT_ID", "andrewcooley-genai-tests")
 LOCATION = os.environ.get("GCP_LOCATION", "us-central1")
 MODEL_NAME = "gemini-2.0-flash-live-preview-04-09"
+LIVE_API_BACKEND = os.environ.get("LIVE_API_BACKEND", "vertex") # 'vertex' or 'fake'
+LIVE_MAX_SESSIONS = int(os.environ.get("LIVE_MAX_SESSIONS", "100"))
+LIVE_SESSION_IDLE_TTL = float(os.environ.get("LIVE_SESSION_IDLE_TTL", "300"))
+CONVERSATION_STORE = os.environ.get("CONVERSATION_STORE", "memory") # 'memory' or 'sqlite'
+CONVERSATION_DB_PATH = os.environ.get("CONVERSATION_DB_PATH", "conversations.db")
+HISTORY_TOKEN_BUDGET = int(os.environ.get("HISTORY_TOKEN_BUDGET", "8000"))
+HISTORY_KEEP_TURNS = int(os.environ.get("HISTORY_KEEP_TURNS", "6"))
+SUMMARY_MODEL_NAME = os.environ.get("SUMMARY_MODEL_NAME", "gemini-2.0-flash-001")
+LIVE_CONFIG_CACHE_PATH = os.environ.get("LIVE_CONFIG_CACHE_PATH", default_cache_path("text2text"))
+RESPONSE_CACHE_ENABLED = os.environ.get("RESPONSE_CACHE_ENABLED", "false").lower() == "true"
+RESPONSE_CACHE_MAX_ENTRIES = int(os.environ.get("RESPONSE_CACHE_MAX_ENTRIES", "1000"))
+RESPONSE_CACHE_TTL = float(os.environ.get("RESPONSE_CACHE_TTL", "3600"))
+RESPONSE_CACHE_MAX_BYTES = int(os.environ.get("RESPONSE_CACHE_MAX_BYTES", str(16 * 1024 * 1024)))
+CHUNK_LOG_SAMPLE_RATE = float(os.environ.get("CHUNK_LOG_SAMPLE_RATE", "0.01"))
 
-# --- Initialization (runs once on server startup) ---
-print("Initializing Vertex AI and Gemini Client...")
-try:
-    vertexai.init(project=PROJECT_ID, location=LOCATION)
-    
-    # Get RAG corpus for use with Live API
-    corpora_list = list(rag.list_corpora())
-    if not corpora_list:
-        print("No RAG corpora found. Continuing without RAG.")
-        TOOLS = []
-    else:
-        rag_corpus = rag.get_corpus(name=corpora_list[-1].name)
-        print(f"Using RAG Corpus: {rag_corpus.display_name} ({rag_corpus.name})")
-
-    # Define the tools for the agent
-    TOOLS = [
-        {
-            "retrieval": {
-                "vertex_rag_store": {
-                    "rag_resources": [
-                        {"rag_corpus": f"{rag_corpus.name}"}
-                    ]
-                }
-            }
-        }
-    ]
-    
-    # Initialize the Gemini Client
-    client = genai.Client(
-      vertexai=True,
-      project=PROJECT_ID,
-      location=LOCATION
-    )
-    
-    # Define the generation config
-    config = {"response_modalities": ["TEXT"], "tools": TOOLS}
+# --- Initialization ---
+# The RAG corpus is resolved in the background on server startup (see lifespan below),
+# so importing this module never blocks on Vertex AI.
+live_config = LiveConfigLoader(
+    project=PROJECT_ID,
+    location=LOCATION,
+    base_config={"response_modalities": ["TEXT"]},
+    cache_path=LIVE_CONFIG_CACHE_PATH,
+    require_corpus=False,
+)
+
+# Initialize the Gemini Client
+client = genai.Client(
+  vertexai=True,
+  project=PROJECT_ID,
+  location=LOCATION
+)
 
-except Exception as e:
-    print(f"FATAL: Could not initialize Vertex AI or RAG Corpus. Error: {e}")
-    # Exit if we can't initialize properly
-    exit(1)
+# A local stand-in for the Live API, for load testing without Vertex AI (see ../../loadtest)
+live_client = FakeLiveClient.from_env() if LIVE_API_BACKEND == "fake" else client
+
+# Latency, chunk and session metrics, served at /metrics
+live_metrics = LiveMetrics("rag-engine-text2text")
+
+# Response chunks are logged from a background thread, and only a sample of them
+chunk_log = sampled_logger("text2text.chunks", CHUNK_LOG_SAMPLE_RATE)
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    if LIVE_API_BACKEND == "fake":
+        print("Using the fake Live API. Skipping the RAG corpus lookup.")
+        live_config.use_corpus(None)
+    else:
+        print("Resolving RAG corpus and Live API config in the background...")
+        await live_config.start()
+    yield
+    await live_config.stop()
+    await session_manager.close_all()
 
 
 # --- FastAPI Application ---
@@ -60,8 +88,34 @@ app = FastAPI(
     title="Vertex AI RAG Engine Live API",
     description="An interface for multi-turn conversations with the Gemini Live API using a RAG Engine corpus.",
     version="1.0.0",
+    lifespan=lifespan,
+)
+
+# Live sessions stay open between turns of the same conversation
+session_manager = LiveSessionManager(
+    connect=lambda: live_metrics.session(live_client.aio.live.connect(model=MODEL_NAME, config=live_config.config)),
+    max_sessions=LIVE_MAX_SESSIONS,
+    idle_ttl=LIVE_SESSION_IDLE_TTL,
+    metrics=live_metrics,
 )
 
+# Server-side history for clients that only send the new turn
+conversation_store = create_conversation_store(CONVERSATION_STORE, CONVERSATION_DB_PATH)
+
+# Keeps the history sent to the Live model within a token budget
+history_compactor = HistoryCompactor(
+    summarize=make_gemini_summarizer(client, SUMMARY_MODEL_NAME),
+    token_budget=HISTORY_TOKEN_BUDGET,
+    keep_turns=HISTORY_KEEP_TURNS,
+)
+
+# Opt-in cache of complete answers for repeated conversations
+response_cache = ResponseCache(
+    max_entries=RESPONSE_CACHE_MAX_ENTRIES,
+    ttl=RESPONSE_CACHE_TTL,
+    max_bytes=RESPONSE_CACHE_MAX_BYTES,
+) if RESPONSE_CACHE_ENABLED else None
+
 # --- Pydantic Models for Request and Response Validation ---
 
 class Part(BaseModel):
@@ -72,73 +126,266 @@ class Turn(BaseModel):
     parts: List[Part]
 
 class ChatRequest(BaseModel):
-    history: List[Turn] = Field(
-        ...,
-        description="The entire conversation history, including the latest user message.",
+    history: Optional[List[Turn]] = Field(
+        None,
+        description="The entire conversation history, including the latest user message. Omit when sending `message`.",
         example=[{"role": "user", "parts": [{"text": "What is the pet policy?"}]}]
     )
+    message: Optional[Turn] = Field(
+        None,
+        description="Only the new user turn. The server keeps the history for `conversation_id`. Omit when sending `history`.",
+    )
+    conversation_id: Optional[str] = Field(
+        None,
+        description="Identifies the conversation so its history and Live session can be reused across turns. A new id is assigned when omitted.",
+    )
+
+    @model_validator(mode="after")
+    def check_history_or_message(self):
+        if (self.history is None) == (self.message is None):
+            raise ValueError("Provide exactly one of 'history' or 'message'.")
+        return self
 
 class ChatResponse(BaseModel):
     response: str
-    history: List[Turn]
+    history: Optional[List[Turn]] = Field(
+        None,
+        description="The updated conversation history. Only returned to clients that sent `history`.",
+    )
+    conversation_id: str
 
-# --- API Endpoint ---
+# --- Live API Turn ---
 
-@app.post("/chat", response_model=ChatResponse)
-async def chat(request: ChatRequest):
+async def stream_turn(history_dicts: List[Dict[str, Any]], conversation_id: str):
     """
-    Handles a single turn in a conversation.
+    Runs a single conversation turn against the Live API and yields events as they arrive.
 
-    Receives the entire conversation history and returns the model's response.
-    The client is responsible for maintaining and sending the history.
+    Yields ("text", str) for each response chunk, ("tool_code", str) and ("tool_output", str)
+    for tool usage parts. With the response cache enabled, a repeated conversation yields
+    the cached answer as a single text event without calling the Live API.
     """
-    # The history from the request is already validated by Pydantic.
-    # We need to convert it from Pydantic models to simple dicts for the Gemini API.
-    history_dicts = [turn.model_dump() for turn in request.history]
-    
-    # Get the last user prompt for logging
-    last_user_prompt = history_dicts[-1]['parts'][0]['text'] if history_dicts else "No prompt"
-    print(f"\nReceived request. Last prompt: '{last_user_prompt}'")
-    print(f"History contains {len(history_dicts)} turns.")
+    cache_key = None
+    if response_cache is not None:
+        cache_key = response_cache.key(history_dicts, live_config.corpus_name or "", MODEL_NAME)
+        cached_response = response_cache.get(cache_key)
+        if cached_response is not None:
+            print("Response cache hit.")
+            yield "text", cached_response
+            return
 
-    full_response = ""
-    
+    # Time to first chunk and turn completion are measured from here, including compaction
+    turn = live_metrics.start_turn()
     try:
-        async with client.aio.live.connect(model=MODEL_NAME, config=config) as session:
-            # Send the ENTIRE history to the model
-            await session.send_client_content(turns=history_dicts)
+        # Older turns are folded into a rolling summary once the history exceeds the token budget
+        live_history = await history_compactor.compact(conversation_id, history_dicts)
+
+        async with session_manager.session(conversation_id) as live:
+            # Send only the new turn on a reused session, or the ENTIRE (compacted) history on a new one
+            await session_manager.send_turn(live, live_history)
 
             # Stream the model's response for this turn
-            async for chunk in session.receive():
+            full_response = ""
+            async for chunk in live.session.receive():
                 if chunk.server_content:
                     if chunk.text:
-                        print(chunk.text, end="", flush=True)
+                        turn.chunk(len(chunk.text.encode("utf-8")))
                         full_response += chunk.text
+                        yield "text", chunk.text
 
-                    # Optional: Log tool usage if needed
                     model_turn = chunk.server_content.model_turn
                     if model_turn:
                         for part in model_turn.parts:
                             if part.executable_code is not None:
-                                print(f"\n[Tool Code]:\n{part.executable_code.code}")
+                                yield "tool_code", part.executable_code.code
                             if part.code_execution_result is not None:
-                                print(f"\n[Tool Output]:\n{part.code_execution_result.output}")
-        
-        print("\nStream complete.")
+                                yield "tool_output", part.code_execution_result.output
+
+            # The next turn reuses this session only if its history ends with this exact reply
+            session_manager.record_reply(live, full_response)
+        turn.complete()
+    except Exception:
+        turn.complete("error")
+        raise
+    finally:
+        # A client that disconnects mid-stream closes this generator early
+        turn.complete("cancelled")
+
+    if cache_key is not None and full_response:
+        response_cache.put(cache_key, full_response)
+
+async def load_stored_history(conversation_id: str) -> List[Dict[str, Any]]:
+    """Returns the server-side history of a conversation, or raises 404 if it is unknown."""
+    stored_history = await conversation_store.get(conversation_id)
+    if stored_history is None:
+        raise HTTPException(
+            status_code=404,
+            detail=f"Unknown conversation '{conversation_id}'. Resend the full history to continue.",
+        )
+    return stored_history
+
+async def prepare_turn(request: ChatRequest):
+    """Resolves the request into Gemini API history dicts and a conversation id."""
+    if not live_config.ready.is_set():
+        raise HTTPException(status_code=503, detail="The Live API configuration is not ready yet. Please retry shortly.")
+
+    conversation_id = request.conversation_id or str(uuid.uuid4())
+
+    if request.message is not None:
+        # Delta mode: the server holds the history and the client sends only the new turn
+        if request.message.role != "user":
+            raise HTTPException(status_code=400, detail="'message' must be a user turn.")
+        stored_history = []
+        if request.conversation_id:
+            stored_history = await load_stored_history(conversation_id)
+        history_dicts = stored_history + [request.message.model_dump()]
+    else:
+        # The history from the request is already validated by Pydantic.
+        # We need to convert it from Pydantic models to simple dicts for the Gemini API.
+        history_dicts = [turn.model_dump() for turn in request.history]
+    
+    # Get the last user prompt for logging
+    last_user_prompt = history_dicts[-1]['parts'][0]['text'] if history_dicts else "No prompt"
+    print(f"\nReceived request. Last prompt: '{last_user_prompt}'")
+    print(f"History contains {len(history_dicts)} turns.")
+
+    return history_dicts, conversation_id
+
+@asynccontextmanager
+async def conversation_turn(request: ChatRequest, history_dicts: List[Dict[str, Any]], conversation_id: str):
+    """
+    Serializes delta-mode turns of one conversation and yields the history to answer from.
+
+    The stored history is re-read under the conversation's lock, so a turn that waited
+    for a concurrent turn of the same conversation answers from, and appends after, it.
+    """
+    if request.message is None or not request.conversation_id:
+        # Full-history clients and new conversations share no server-side history
+        yield history_dicts
+        return
+    async with conversation_store.lock(conversation_id):
+        yield await load_stored_history(conversation_id) + [request.message.model_dump()]
 
-        # Append the model's full response to the history to be returned
-        updated_history = history_dicts + [{"role": "model", "parts": [{"text": full_response}]}]
-        
-        # Convert the updated history back to Pydantic models for the response
-        response_history_models = [Turn(**turn) for turn in updated_history]
+async def finish_turn(request: ChatRequest, history_dicts: List[Dict[str, Any]], full_response: str, conversation_id: str) -> ChatResponse:
+    """Records the model's full response and builds the response model."""
+    model_turn = {"role": "model", "parts": [{"text": full_response}]}
 
-        return ChatResponse(response=full_response, history=response_history_models)
+    if request.message is not None:
+        # Delta mode: store the new user and model turns and return only the model's response
+        await conversation_store.append(conversation_id, [history_dicts[-1], model_turn])
+        return ChatResponse(response=full_response, conversation_id=conversation_id)
 
+    # Append the model's full response to the validated request history to be returned
+    response_history_models = request.history + [Turn(**model_turn)]
+
+    return ChatResponse(response=full_response, history=response_history_models, conversation_id=conversation_id)
+
+# --- API Endpoints ---
+
+@app.post("/chat", response_model=ChatResponse, response_model_exclude_none=True)
+async def chat(request: ChatRequest):
+    """
+    Handles a single turn in a conversation.
+
+    Either receives the entire conversation history and returns the model's response
+    with the updated history, or receives only the new user `message` for a
+    `conversation_id` whose history the server keeps, and returns only the model's
+    response. Sending back the returned conversation_id lets later turns reuse the
+    open Live session.
+    """
+    history_dicts, conversation_id = await prepare_turn(request)
+    full_response = ""
+    
+    try:
+        async with conversation_turn(request, history_dicts, conversation_id) as history_dicts:
+            async for kind, value in stream_turn(history_dicts, conversation_id):
+                if kind == "text":
+                    chunk_log.info("%s: %r", conversation_id, value)
+                    full_response += value
+                elif kind == "tool_code":
+                    print(f"\n[Tool Code]:\n{value}")
+                elif kind == "tool_output":
+                    print(f"\n[Tool Output]:\n{value}")
+
+            print(f"Stream complete. Received {len(full_response)} characters.")
+
+            return await finish_turn(request, history_dicts, full_response, conversation_id)
+
+    except HTTPException:
+        raise
     except Exception as e:
         print(f"\nAn error occurred during the API call: {e}")
         raise HTTPException(status_code=500, detail=f"An error occurred: {str(e)}")
 
 
+@app.get("/healthz")
+async def healthz():
+    """Liveness probe: the server process is up."""
+    return {"status": "ok"}
+
+@app.get("/readyz")
+async def readyz():
+    """Readiness probe: the RAG corpus and Live API config are resolved and chat requests can be served."""
+    status_code = 200 if live_config.ready.is_set() else 503
+    return JSONResponse(status_code=status_code, content=live_config.status())
+
+@app.get("/metrics")
+async def get_metrics():
+    """Prometheus scrape endpoint: Live API latency histograms, chunk and byte counters and open sessions."""
+    body, content_type = live_metrics.exposition()
+    return Response(content=body, media_type=content_type)
+
+@app.get("/cache/stats")
+async def cache_stats():
+    """Returns response cache hit, miss and eviction counters."""
+    if response_cache is None:
+        return {"enabled": False}
+    return {"enabled": True, **response_cache.stats()}
+
+
+def sse_event(event: str, data: Any) -> str:
+    """Formats a single Server-Sent Event with a JSON payload."""
+    return f"event: {event}\ndata: {json.dumps(data)}\n\n"
+
+@app.post("/chat/stream")
+async def chat_stream(request: ChatRequest):
+    """
+    Handles a single turn in a conversation, streaming the response as Server-Sent Events.
+
+    Emits a `text` event for each response chunk as it arrives, `tool_code` and
+    `tool_output` events for tool usage, and a final `done` event carrying the
+    same payload as /chat. Errors after the stream has started are sent as an
+    `error` event.
+    """
+    history_dicts, conversation_id = await prepare_turn(request)
+
+    async def event_stream():
+        full_response = ""
+        try:
+            async with conversation_turn(request, history_dicts, conversation_id) as turn_history:
+                async for kind, value in stream_turn(turn_history, conversation_id):
+                    if kind == "text":
+                        full_response += value
+                        yield sse_event("text", {"text": value})
+                    elif kind == "tool_code":
+                        yield sse_event("tool_code", {"code": value})
+                    elif kind == "tool_output":
+                        yield sse_event("tool_output", {"output": value})
+
+                print(f"Stream complete. Sent {len(full_response)} characters.")
+                response = await finish_turn(request, turn_history, full_response, conversation_id)
+            yield sse_event("done", response.model_dump(exclude_none=True))
+
+        except Exception as e:
+            print(f"\nAn error occurred during the API call: {e}")
+            yield sse_event("error", {"detail": f"An error occurred: {str(e)}"})
+
+    return StreamingResponse(
+        event_stream(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+
+
 # To run the server from the command line
 if __name__ == "__main__":
     # Note: Use `uvicorn main:app --reload` for development
@@ -0,0 +1,83 @@
+import hashlib
+import json
+import re
+import time
+from collections import OrderedDict
+from typing import Any, Dict, List, Optional
+
+
+def normalize_text(text: str) -> str:
+    """Lowercases text and collapses whitespace so trivially different questions share a cache entry."""
+    return re.sub(r"\s+", " ", text).strip().lower()
+
+
+class ResponseCache:
+    """
+    LRU + TTL cache of complete model responses, keyed by normalized conversation
+    content, RAG corpus and model name.
+
+    Entries expire after `ttl` seconds, and the least recently used entries are
+    evicted once there are more than `max_entries` or they take more than
+    `max_bytes` of text.
+    """
+
+    def __init__(self, max_entries: int = 1000, ttl: float = 3600.0, max_bytes: int = 16 * 1024 * 1024):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self.max_bytes = max_bytes
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self._bytes = 0
+        self._entries: "OrderedDict[str, tuple]" = OrderedDict()
+
+    @staticmethod
+    def key(history: List[Dict[str, Any]], corpus_name: str, model_name: str) -> str:
+        """Builds the cache key for a conversation."""
+        content = [
+            [turn["role"], [normalize_text(part.get("text") or "") for part in turn["parts"]]]
+            for turn in history
+        ]
+        payload = json.dumps([content, corpus_name, model_name], separators=(",", ":"))
+        return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+    def get(self, key: str) -> Optional[str]:
+        """Returns the cached response for a key, or None on a miss."""
+        entry = self._entries.get(key)
+        if entry is not None and time.monotonic() - entry[1] > self.ttl:
+            self._remove(key)
+            self.evictions += 1
+            entry = None
+        if entry is None:
+            self.misses += 1
+            return None
+        self._entries.move_to_end(key)
+        self.hits += 1
+        return entry[0]
+
+    def put(self, key: str, response: str):
+        """Caches a complete response."""
+        size = len(key) + len(response.encode("utf-8"))
+        if size > self.max_bytes:
+            return
+        if key in self._entries:
+            self._remove(key)
+        self._entries[key] = (response, time.monotonic(), size)
+        self._bytes += size
+        while len(self._entries) > self.max_entries or self._bytes > self.max_bytes:
+            self._remove(next(iter(self._entries)))
+            self.evictions += 1
+
+    def stats(self) -> Dict[str, Any]:
+        """Returns hit, miss and eviction counters and current usage."""
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+            "entries": len(self._entries),
+            "bytes": self._bytes,
+        }
+
+    def _remove(self, key: str):
+        _, _, size = self._entries.pop(key)
+        self._bytes -= size
@@ -0,0 +1,177 @@
+import asyncio
+import contextlib
+import hashlib
+import json
+import time
+from collections import OrderedDict
+from typing import Any, Callable, Dict, List, Optional
+
+
+def history_digest(history: List[Dict[str, Any]]) -> str:
+    """Returns a digest of conversation turns, used to check what an open Live session holds."""
+    return hashlib.sha256(json.dumps(history, sort_keys=True).encode("utf-8")).hexdigest()
+
+
+class LiveSession:
+    """A Gemini Live session that stays open across /chat turns of one conversation."""
+
+    def __init__(self, conversation_id: str):
+        self.conversation_id = conversation_id
+        self.session = None
+        # Digest of the history turns (user and model) the open Live session already holds,
+        # or None when that is unknown, e.g. until the model's reply has been recorded.
+        self.context_digest: Optional[str] = None
+        self.sent_history: Optional[List[Dict[str, Any]]] = None
+        self.last_used = time.monotonic()
+        self.users = 0
+        self.lock = asyncio.Lock()
+        self._stack: Optional[contextlib.AsyncExitStack] = None
+
+    async def open(self, connect: Callable[[], Any]):
+        """Opens the underlying Live session if it is not already open."""
+        if self.session is not None:
+            return
+        stack = contextlib.AsyncExitStack()
+        self.session = await stack.enter_async_context(connect())
+        self._stack = stack
+        self.context_digest = None
+        self.sent_history = None
+
+    async def close(self):
+        """Closes the underlying Live session, ignoring errors from a dead socket."""
+        stack, self._stack, self.session = self._stack, None, None
+        self.context_digest = None
+        self.sent_history = None
+        if stack is None:
+            return
+        try:
+            await stack.aclose()
+        except Exception as e:
+            print(f"Error while closing Live session {self.conversation_id}: {e}")
+
+
+class LiveSessionManager:
+    """
+    Keeps Live API sessions open between /chat turns so that each turn reuses
+    the same connection and only sends the new user turn.
+
+    Sessions are keyed by conversation id, capped at `max_sessions` with LRU
+    eviction and closed after `idle_ttl` seconds without a turn. A session that
+    was evicted or died is rebuilt by resending the full history.
+
+    With `metrics` (a LiveMetrics), every history send is timed and counted.
+    """
+
+    def __init__(self, connect: Callable[[], Any], max_sessions: int = 100, idle_ttl: float = 300.0, metrics=None):
+        self._connect = connect
+        self.max_sessions = max_sessions
+        self.idle_ttl = idle_ttl
+        self.metrics = metrics
+        self._sessions: "OrderedDict[str, LiveSession]" = OrderedDict()
+        self._lock = asyncio.Lock()
+
+    def __len__(self):
+        return len(self._sessions)
+
+    @contextlib.asynccontextmanager
+    async def session(self, conversation_id: str):
+        """Checks out the Live session for a conversation, holding it for a single turn."""
+        live = await self._checkout(conversation_id)
+        try:
+            async with live.lock:
+                try:
+                    yield live
+                except BaseException:
+                    # The socket state is unknown after a failed turn, so the next
+                    # turn starts from a fresh connection and the full history.
+                    await live.close()
+                    raise
+                finally:
+                    live.last_used = time.monotonic()
+        finally:
+            live.users -= 1
+
+    async def send_turn(self, live: LiveSession, history: List[Dict[str, Any]]):
+        """
+        Sends a conversation turn on a checked-out session.
+
+        If the open session already holds exactly every turn but the last one, only the
+        new user turn is sent. Otherwise, e.g. after an earlier turn was edited or the
+        history was compacted, the session is (re)opened and the whole history is sent.
+        A reused session that fails on send is rebuilt once from history.
+        """
+        reused = live.session is not None
+        if reused and live.context_digest is not None and live.context_digest == history_digest(history[:-1]):
+            turns = history[-1:]
+        else:
+            await live.close()
+            reused = False
+            turns = history
+
+        try:
+            await live.open(self._connect)
+            await self._send(live, turns)
+        except Exception as e:
+            if not reused:
+                raise
+            print(f"Live session {live.conversation_id} died ({e}). Rebuilding from history.")
+            await live.close()
+            await live.open(self._connect)
+            await self._send(live, history)
+
+        # The session can only be reused once the model's reply is known (see record_reply)
+        live.context_digest = None
+        live.sent_history = history
+
+    def record_reply(self, live: LiveSession, text: str):
+        """Records the model's reply to the turn just sent, which is now part of the session context."""
+        if live.sent_history is None:
+            return
+        model_turn = {"role": "model", "parts": [{"text": text}]}
+        live.context_digest = history_digest(live.sent_history + [model_turn])
+        live.sent_history = None
+
+    async def close_all(self):
+        """Closes every open session, e.g. on server shutdown."""
+        async with self._lock:
+            sessions = list(self._sessions.values())
+            self._sessions.clear()
+        for live in sessions:
+            await live.close()
+
+    async def _send(self, live: LiveSession, turns: List[Dict[str, Any]]):
+        timer = self.metrics.history_send(turns) if self.metrics is not None else contextlib.nullcontext()
+        with timer:
+            await live.session.send_client_content(turns=turns)
+
+    async def _checkout(self, conversation_id: str) -> LiveSession:
+        async with self._lock:
+            live = self._sessions.get(conversation_id)
+            if live is None:
+                live = LiveSession(conversation_id)
+                self._sessions[conversation_id] = live
+            self._sessions.move_to_end(conversation_id)
+            live.users += 1
+            evicted = self._pop_expired() + self._pop_overflow()
+
+        for stale in evicted:
+            await stale.close()
+        return live
+
+    def _pop_expired(self) -> List[LiveSession]:
+        now = time.monotonic()
+        expired = [
+            key for key, live in self._sessions.items()
+            if live.users == 0 and now - live.last_used > self.idle_ttl
+        ]
+        return [self._sessions.pop(key) for key in expired]
+
+    def _pop_overflow(self) -> List[LiveSession]:
+        evicted = []
+        # Iterate from least to most recently used, skipping sessions mid-turn.
+        for key in list(self._sessions):
+            if len(self._sessions) <= self.max_sessions:
+                break
+            if self._sessions[key].users == 0:
+                evicted.append(self._sessions.pop(key))
+        return evicted
@@ -0,0 +1,134 @@
+"""
+Token-budgeted history compaction for Live API turns.
+
+Shared by the multi-turn CLI (rag_engine_live_api.py) and the HTTP backend (backend/main.py).
+"""
+
+import hashlib
+import json
+from collections import OrderedDict
+from typing import Any, Awaitable, Callable, Dict, List, Optional
+
+SUMMARY_PROMPT = """Summarize the conversation below between a hotel guest (user) and an assistant (model).
+Keep every fact, policy detail, name, date and open question needed to continue the conversation.
+Write plain prose, no more than a few short paragraphs.
+
+{previous}Conversation:
+{transcript}"""
+
+
+def estimate_tokens(turns: List[Dict[str, Any]]) -> int:
+    """Roughly estimates the token count of turns at about four characters per token."""
+    chars = sum(len(part.get("text") or "") for turn in turns for part in turn["parts"])
+    return chars // 4 + 4 * len(turns)
+
+
+def make_gemini_summarizer(client, model: str) -> Callable[[str, List[Dict[str, Any]]], Awaitable[str]]:
+    """Builds a summarizer that folds turns into a running summary with a (non-Live) Gemini model."""
+
+    async def summarize(previous_summary: str, turns: List[Dict[str, Any]]) -> str:
+        transcript = "\n".join(
+            f"{turn['role']}: {' '.join(part.get('text') or '' for part in turn['parts'])}" for turn in turns
+        )
+        previous = f"Summary so far:\n{previous_summary}\n\n" if previous_summary else ""
+        response = await client.aio.models.generate_content(
+            model=model,
+            contents=SUMMARY_PROMPT.format(previous=previous, transcript=transcript),
+        )
+        return response.text or previous_summary
+
+    return summarize
+
+
+class _Summary:
+    def __init__(self, boundary: int, fingerprint: str, text: str):
+        self.boundary = boundary  # Number of leading history turns folded into the summary
+        self.fingerprint = fingerprint
+        self.text = text
+
+
+class HistoryCompactor:
+    """
+    Keeps the history sent to the Live model within a token budget.
+
+    While a conversation fits the budget it is sent verbatim. Once it does not, older
+    turns are folded into a rolling summary (cached per conversation) and only the last
+    `keep_turns` turns are kept verbatim, never splitting a user/model pair. The summary
+    is only refreshed when the conversation outgrows the budget again, so between
+    refreshes the compacted history grows by appending turns, just like the original.
+    """
+
+    def __init__(
+        self,
+        summarize: Callable[[str, List[Dict[str, Any]]], Awaitable[str]],
+        token_budget: int = 8000,
+        keep_turns: int = 6,
+        count_tokens: Callable[[List[Dict[str, Any]]], int] = estimate_tokens,
+        max_conversations: int = 10000,
+    ):
+        self._summarize = summarize
+        self.token_budget = token_budget
+        self.keep_turns = keep_turns
+        self._count_tokens = count_tokens
+        self.max_conversations = max_conversations
+        self._summaries: "OrderedDict[str, _Summary]" = OrderedDict()
+
+    async def compact(self, conversation_id: str, history: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        """Returns the history to send for this turn, compacted to the token budget if needed."""
+        summary = self._cached_summary(conversation_id, history)
+        compacted = self._with_summary(summary, history)
+        if self._count_tokens(compacted) <= self.token_budget:
+            return compacted
+
+        boundary = self._fold_boundary(history)
+        start = summary.boundary if summary else 0
+        if boundary <= start:
+            # Nothing older than the verbatim window is left to fold.
+            return compacted
+
+        previous_text = summary.text if summary else ""
+        try:
+            text = await self._summarize(previous_text, history[start:boundary])
+        except Exception as e:
+            print(f"Could not summarize history for {conversation_id}: {e}")
+            return compacted
+
+        summary = _Summary(boundary, _fingerprint(history[:boundary]), text)
+        self._summaries[conversation_id] = summary
+        self._summaries.move_to_end(conversation_id)
+        while len(self._summaries) > self.max_conversations:
+            self._summaries.popitem(last=False)
+
+        return self._with_summary(summary, history)
+
+    def _cached_summary(self, conversation_id: str, history: List[Dict[str, Any]]) -> Optional[_Summary]:
+        summary = self._summaries.get(conversation_id)
+        if summary is None:
+            return None
+        # Discard the summary if the client rewrote the turns it covers.
+        if summary.boundary > len(history) or summary.fingerprint != _fingerprint(history[:summary.boundary]):
+            del self._summaries[conversation_id]
+            return None
+        self._summaries.move_to_end(conversation_id)
+        return summary
+
+    def _fold_boundary(self, history: List[Dict[str, Any]]) -> int:
+        """Finds the latest turn index at or before the verbatim window that starts a user/model pair."""
+        boundary = max(len(history) - 1 - self.keep_turns, 0)
+        while boundary > 0 and not (history[boundary]["role"] == "user" and history[boundary - 1]["role"] == "model"):
+            boundary -= 1
+        return boundary
+
+    @staticmethod
+    def _with_summary(summary: Optional[_Summary], history: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        if summary is None:
+            return history
+        # The summary is sent as its own user/model pair so roles keep alternating.
+        return [
+            {"role": "user", "parts": [{"text": f"Summary of our conversation so far:\n{summary.text}"}]},
+            {"role": "model", "parts": [{"text": "Understood. I will continue from that summary."}]},
+        ] + history[summary.boundary:]
+
+
+def _fingerprint(turns: List[Dict[str, Any]]) -> str:
+    return hashlib.sha1(json.dumps(turns, sort_keys=True).encode("utf-8")).hexdigest()
@@ -7,6 +7,8 @@ import asyncio
 from google import genai
 from google.genai import types
 
+from history_compaction import HistoryCompactor, make_gemini_summarizer
+
 vertexai.init(project="andrewcooley-genai-tests", location="us-central1")
 
 # Get RAG corpus for use with Live API
@@ -38,6 +40,13 @@ client = genai.Client(
 
 config = {"response_modalities": ["TEXT"], "tools": TOOLS}
 
+# Keep the history sent each turn within a token budget by summarizing older turns
+history_compactor = HistoryCompactor(
+    summarize=make_gemini_summarizer(client, "gemini-2.0-flash-001"),
+    token_budget=8000,
+    keep_turns=6,
+)
+
 async def main():
     """
     Starts an interactive, multi-turn chat session with the Gemini model.
@@ -73,8 +82,9 @@ async def main():
         try:
             async with client.aio.live.connect(model=MODEL, config=config) as session:
                 
-                # 4. Send the ENTIRE history to the model
-                await session.send_client_content(turns=history)
+                # 4. Send the history to the model, compacted to the token budget
+                turns = await history_compactor.compact("cli", history)
+                await session.send_client_content(turns=turns)
 
                 # 5. Stream the model's response for this turn
                 async for chunk in session.receive():
@@ -0,0 +1,62 @@
+# How to run file:
+# python benchmark_places_client.py --queries 20 --latency-ms 80
+
+import argparse
+import statistics
+import time
+
+import requests
+
+from places_client import PlacesClient
+from places_stub_server import PlacesStubHandler, start_stub_server
+
+
+def original_google_maps_reviews(user_query: str, base_url: str, api_key: str = "") -> str:
+    """The notebook's original tool: two unpooled requests per call and no caching"""
+
+    response = requests.post(f"{base_url}/places:searchText", json={"textQuery": user_query},
+                             headers={"Content-Type": "application/json", "X-Goog-Api-Key": api_key,
+                                      "X-Goog-FieldMask": "places.id,places.displayName"})
+    place_id = response.json().get("places", [])[0]["id"]
+    response = requests.get(f"{base_url}/places/{place_id}",
+                            headers={"Content-Type": "application/json", "X-Goog-Api-Key": api_key,
+                                     "X-Goog-FieldMask": "id,displayName,rating,reviews"})
+    combined_reviews = ""
+    for review in response.json().get("reviews"):
+        combined_reviews += review.get("text")["text"]
+    return combined_reviews
+
+def benchmark(label, lookup, queries):
+    """Runs a lookup for every query and prints wall time and stub requests"""
+
+    before = PlacesStubHandler.request_count
+    timings = []
+    for query in queries:
+        start = time.perf_counter()
+        result = lookup(query)
+        timings.append(time.perf_counter() - start)
+
+    print(f"{label:<24} requests: {PlacesStubHandler.request_count - before:>4}   "
+          f"median: {statistics.median(timings) * 1000:8.1f} ms   total: {sum(timings) * 1000:8.1f} ms")
+    return result
+
+def main():
+    parser = argparse.ArgumentParser(description="Compare the original reviews tool with PlacesClient against a local stub.")
+    parser.add_argument("--queries", type=int, default=20, help="Number of distinct restaurants to look up")
+    parser.add_argument("--latency-ms", type=float, default=80.0, help="Simulated Places API latency per request")
+    args = parser.parse_args()
+
+    server = start_stub_server(latency_ms=args.latency_ms)
+    base_url = f"http://127.0.0.1:{server.server_port}/v1"
+    queries = [f"Restaurant {i} Prosper, TX" for i in range(args.queries)]
+
+    client = PlacesClient(api_key="", base_url=base_url)
+    original = benchmark("original", lambda query: original_google_maps_reviews(query, base_url), queries)
+    cold = benchmark("PlacesClient (cold)", client.reviews, queries)
+    benchmark("PlacesClient (warm)", client.reviews, queries)
+
+    print("Same reviews returned:", original == cold)
+    server.shutdown()
+
+if __name__ == "__main__":
+    main()
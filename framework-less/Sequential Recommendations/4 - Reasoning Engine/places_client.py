@@ -0,0 +1,114 @@
+# Google Maps Places API client for the reviews agent
+import threading
+from typing import Dict, List, Optional
+
+import requests
+from cachetools import TTLCache
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+
+PLACES_BASE_URL = "https://places.googleapis.com/v1"
+
+
+class PlacesClient:
+    """Looks up Google Maps reviews with a pooled keep-alive session, retries and TTL caches.
+
+    Query-to-place-id and place-id-to-reviews lookups are cached separately, since a place
+    id is stable for far longer than its reviews. The text search asks for reviews in its
+    field mask, so a cold lookup usually takes one round trip; the place details call is
+    only made when the search result carries no reviews.
+    """
+
+    def __init__(self, api_key: str, base_url: str = PLACES_BASE_URL, place_id_ttl: float = 7 * 24 * 3600,
+                 reviews_ttl: float = 6 * 3600, max_entries: int = 1024, timeout: float = 10.0,
+                 retries: int = 3, pool_size: int = 10):
+        self.api_key = api_key
+        self.base_url = base_url.rstrip("/")
+        self.timeout = timeout
+        self._place_ids = TTLCache(maxsize=max_entries, ttl=place_id_ttl)
+        self._reviews = TTLCache(maxsize=max_entries, ttl=reviews_ttl)
+        self._lock = threading.Lock()
+        self._stats = {"requests": 0, "place_id_hits": 0, "reviews_hits": 0}
+
+        retry = Retry(total=retries, backoff_factor=0.5, status_forcelist=(429, 500, 502, 503, 504),
+                      allowed_methods=("GET", "POST"))
+        adapter = HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size, max_retries=retry)
+        self.session = requests.Session()
+        self.session.mount("https://", adapter)
+        self.session.mount("http://", adapter)
+        self.session.headers.update({"Content-Type": "application/json", "X-Goog-Api-Key": api_key})
+
+    def reviews(self, user_query: str) -> str:
+        """Returns the reviews of the best matching place as one combined string"""
+
+        key = " ".join(user_query.lower().split())
+        with self._lock:
+            place_id = self._place_ids.get(key)
+            cached = self._reviews.get(place_id) if place_id else None
+            if place_id:
+                self._stats["place_id_hits"] += 1
+            if cached is not None:
+                self._stats["reviews_hits"] += 1
+                return cached
+
+        if place_id is None:
+            place = self._search(user_query)
+            place_id = place["id"]
+            texts = _review_texts(place) if "reviews" in place else None
+            with self._lock:
+                self._place_ids[key] = place_id
+        else:
+            texts = None
+
+        if texts is None:
+            texts = _review_texts(self._details(place_id))
+
+        combined = "".join(texts)
+        with self._lock:
+            self._reviews[place_id] = combined
+        return combined
+
+    def stats(self) -> Dict[str, int]:
+        """Returns HTTP request count and cache hits"""
+
+        with self._lock:
+            return dict(self._stats, cached_place_ids=len(self._place_ids), cached_reviews=len(self._reviews))
+
+    def close(self):
+        self.session.close()
+
+    def _search(self, user_query: str) -> dict:
+        response = self._request("POST", f"{self.base_url}/places:searchText", "places.id,places.displayName,places.reviews",
+                                 json={"textQuery": user_query})
+        places = response.get("places", [])
+        if not places:
+            raise LookupError(f"No Google Maps place found for: {user_query}")
+        return places[0]
+
+    def _details(self, place_id: str) -> dict:
+        return self._request("GET", f"{self.base_url}/places/{place_id}", "id,displayName,rating,reviews")
+
+    def _request(self, method: str, url: str, field_mask: str, **kwargs) -> dict:
+        with self._lock:
+            self._stats["requests"] += 1
+        response = self.session.request(method, url, headers={"X-Goog-FieldMask": field_mask}, timeout=self.timeout, **kwargs)
+        response.raise_for_status()
+        return response.json()
+
+
+def _review_texts(place: dict) -> List[str]:
+    return [review["text"]["text"] for review in place.get("reviews") or [] if review.get("text")]
+
+
+# One client per API key and process, created on first use so the agent stays picklable
+_clients: Dict[str, PlacesClient] = {}
+_clients_lock = threading.Lock()
+
+def get_places_client(api_key: str, base_url: Optional[str] = None) -> PlacesClient:
+    """Returns the process-wide PlacesClient for an API key"""
+
+    with _clients_lock:
+        key = f"{api_key}|{base_url or PLACES_BASE_URL}"
+        if key not in _clients:
+            _clients[key] = PlacesClient(api_key, base_url=base_url or PLACES_BASE_URL)
+        return _clients[key]
@@ -0,0 +1,95 @@
+# How to run file:
+# python places_stub_server.py --port 8765 --latency-ms 80
+#
+# Serves canned responses for the two Places API endpoints the reviews tool calls, so the
+# tool can be benchmarked offline. Point a PlacesClient at http://localhost:8765/v1.
+
+import argparse
+import hashlib
+import json
+import socket
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+REVIEWS_PER_PLACE = 5
+
+
+def fake_place(query_or_id: str, with_reviews: bool) -> dict:
+    """Returns a deterministic place for a search query or place id"""
+
+    place_id = query_or_id if query_or_id.startswith("stub-") else "stub-" + hashlib.sha1(query_or_id.lower().encode("utf-8")).hexdigest()[:16]
+    place = {"id": place_id, "displayName": {"text": f"Place {place_id[5:11]}", "languageCode": "en"}, "rating": 4.5}
+    if with_reviews:
+        place["reviews"] = [
+            {"rating": 5, "text": {"text": f"Review {i} of {place_id}: the spicy tuna roll and the fried rice were excellent. ", "languageCode": "en"}}
+            for i in range(REVIEWS_PER_PLACE)
+        ]
+    return place
+
+
+class PlacesStubHandler(BaseHTTPRequestHandler):
+    """Handles places:searchText and places/{id} with a fixed latency, honouring the field mask"""
+
+    protocol_version = "HTTP/1.1"
+    latency = 0.0
+    request_count = 0
+    lock = threading.Lock()
+
+    def setup(self):
+        super().setup()
+        # Headers and body go out in separate writes; avoid Nagle delays on kept-alive connections
+        self.connection.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+
+    def do_POST(self):
+        if not self.path.startswith("/v1/places:searchText"):
+            return self._send(404, {"error": {"message": "not found"}})
+        body = json.loads(self.rfile.read(int(self.headers.get("Content-Length", 0))) or b"{}")
+        with_reviews = "places.reviews" in self.headers.get("X-Goog-FieldMask", "")
+        self._send(200, {"places": [fake_place(body.get("textQuery", ""), with_reviews)]})
+
+    def do_GET(self):
+        if not self.path.startswith("/v1/places/"):
+            return self._send(404, {"error": {"message": "not found"}})
+        place_id = self.path.rsplit("/", 1)[1]
+        with_reviews = "reviews" in self.headers.get("X-Goog-FieldMask", "").split(",")
+        self._send(200, fake_place(place_id, with_reviews))
+
+    def log_message(self, format, *args):
+        pass
+
+    def _send(self, status: int, payload: dict):
+        with PlacesStubHandler.lock:
+            PlacesStubHandler.request_count += 1
+        time.sleep(self.latency)
+        data = json.dumps(payload).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+
+def start_stub_server(port: int = 0, latency_ms: float = 0.0) -> ThreadingHTTPServer:
+    """Starts the stub server on a background thread and returns it; port 0 picks a free port"""
+
+    handler = type("Handler", (PlacesStubHandler,), {"latency": latency_ms / 1000})
+    server = ThreadingHTTPServer(("127.0.0.1", port), handler)
+    threading.Thread(target=server.serve_forever, name="places-stub", daemon=True).start()
+    return server
+
+def main():
+    parser = argparse.ArgumentParser(description="Offline stub of the Google Maps Places API.")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--latency-ms", type=float, default=80.0, help="Added delay per request")
+    args = parser.parse_args()
+
+    server = start_stub_server(args.port, args.latency_ms)
+    print(f"Places stub listening on http://127.0.0.1:{server.server_port}/v1")
+    try:
+        threading.Event().wait()
+    except KeyboardInterrupt:
+        server.shutdown()
+
+if __name__ == "__main__":
+    main()
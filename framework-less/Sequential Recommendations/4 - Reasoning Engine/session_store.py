@@ -0,0 +1,195 @@
+# Bounded chat history store for the Reasoning Engine agent
+import json
+import sqlite3
+import threading
+import time
+import weakref
+from collections import OrderedDict
+from typing import Dict, List, Optional, Sequence
+
+from langchain_core.chat_history import BaseChatMessageHistory
+from langchain_core.messages import BaseMessage, messages_from_dict, messages_to_dict
+
+
+class WindowedChatMessageHistory(BaseChatMessageHistory):
+    """In-memory chat history that keeps only the most recent max_messages messages"""
+
+    def __init__(self, max_messages: int, messages: Optional[List[BaseMessage]] = None, on_change=None):
+        if max_messages < 1:
+            raise ValueError("max_messages must be at least 1")
+        self.max_messages = max_messages
+        self._messages: List[BaseMessage] = list(messages or [])[-max_messages:]
+        self._on_change = on_change
+
+    @property
+    def messages(self) -> List[BaseMessage]:
+        return list(self._messages)
+
+    def add_messages(self, messages: Sequence[BaseMessage]) -> None:
+        self._messages.extend(messages)
+        del self._messages[:-self.max_messages]
+        if self._on_change:
+            self._on_change()
+
+    def clear(self) -> None:
+        self._messages = []
+        if self._on_change:
+            self._on_change()
+
+    def size_bytes(self) -> int:
+        return sum(len(str(message.content).encode("utf-8")) for message in self._messages)
+
+
+class BoundedSessionStore:
+    """Session history factory for LangchainAgent(chat_history=...) with bounded memory.
+
+    Sessions are kept least recently used first and evicted when there are more than
+    max_sessions, when resident history exceeds max_bytes, or when a session has been idle
+    for idle_ttl seconds. Each session keeps only its last max_messages messages. With
+    spill_path set, evicted sessions are written to SQLite and resumed on their next use.
+    A session evicted while a caller still holds its history (for example mid-turn) is
+    taken back in when that history changes or the session is next used, so messages
+    added after eviction are not lost.
+
+    Only the configuration is pickled, so the store can be deployed with the agent; each
+    process starts with an empty in-memory store.
+    """
+
+    def __init__(self, max_sessions: int = 1000, idle_ttl: float = 3600, max_messages: int = 20,
+                 max_bytes: Optional[int] = 64 * 1024 * 1024, spill_path: Optional[str] = None,
+                 spill_ttl: float = 7 * 24 * 3600):
+        if max_messages < 1:
+            raise ValueError("max_messages must be at least 1")
+        self.max_sessions = max_sessions
+        self.idle_ttl = idle_ttl
+        self.max_messages = max_messages
+        self.max_bytes = max_bytes
+        self.spill_path = spill_path
+        self.spill_ttl = spill_ttl
+        self._init_runtime()
+
+    def __getstate__(self):
+        return {key: value for key, value in self.__dict__.items() if not key.startswith("_")}
+
+    def __setstate__(self, state):
+        self.__dict__.update(state)
+        self._init_runtime()
+
+    def __call__(self, session_id: str) -> WindowedChatMessageHistory:
+        """Returns the history for a session, creating or resuming it as needed"""
+
+        with self._lock:
+            now = time.monotonic()
+            entry = self._sessions.get(session_id)
+            if entry is not None:
+                self._sessions.move_to_end(session_id)
+                entry["last_used"] = now
+                history = entry["history"]
+            else:
+                history = self._orphans.pop(session_id, None)
+                if history is not None:
+                    # Still held by a caller, so it is newer than any spilled copy
+                    self._discard_spill(session_id)
+                    self._stats["readmitted"] += 1
+                else:
+                    messages = self._unspill(session_id)
+                    history = WindowedChatMessageHistory(self.max_messages, messages, on_change=lambda: self._touch(session_id))
+                self._admit(session_id, history, now)
+            self._evict(keep=session_id)
+            return history
+
+    def metrics(self) -> Dict[str, int]:
+        """Returns resident sessions, messages and bytes, plus eviction and spill counters"""
+
+        with self._lock:
+            return dict(
+                self._stats,
+                resident_sessions=len(self._sessions),
+                resident_messages=sum(len(entry["history"].messages) for entry in self._sessions.values()),
+                resident_bytes=self._bytes,
+            )
+
+    def _init_runtime(self):
+        self._sessions: "OrderedDict[str, dict]" = OrderedDict()
+        self._bytes = 0
+        self._lock = threading.RLock()
+        self._stats = {"evicted_idle": 0, "evicted_capacity": 0, "spilled": 0, "resumed": 0, "readmitted": 0}
+        # Evicted histories that a caller may still hold and add messages to
+        self._orphans: "weakref.WeakValueDictionary[str, WindowedChatMessageHistory]" = weakref.WeakValueDictionary()
+        self._conn = None
+
+    def _admit(self, session_id: str, history: WindowedChatMessageHistory, now: float):
+        self._sessions[session_id] = {"history": history, "last_used": now, "bytes": history.size_bytes()}
+        self._bytes += self._sessions[session_id]["bytes"]
+
+    def _touch(self, session_id: str):
+        with self._lock:
+            entry = self._sessions.get(session_id)
+            if entry is None:
+                # Evicted while in use: take it back so the new messages are kept
+                history = self._orphans.pop(session_id, None)
+                if history is None:
+                    return
+                self._discard_spill(session_id)
+                self._admit(session_id, history, time.monotonic())
+                self._stats["readmitted"] += 1
+                entry = self._sessions[session_id]
+            size = entry["history"].size_bytes()
+            self._bytes += size - entry["bytes"]
+            entry["bytes"] = size
+            entry["last_used"] = time.monotonic()
+            self._evict(keep=session_id)
+
+    def _evict(self, keep: str):
+        now = time.monotonic()
+        for session_id in list(self._sessions):
+            if session_id != keep and now - self._sessions[session_id]["last_used"] > self.idle_ttl:
+                self._drop(session_id)
+                self._stats["evicted_idle"] += 1
+
+        while len(self._sessions) > 1 and (
+                len(self._sessions) > self.max_sessions or (self.max_bytes is not None and self._bytes > self.max_bytes)):
+            session_id = next(iter(self._sessions))
+            if session_id == keep:
+                break
+            self._drop(session_id)
+            self._stats["evicted_capacity"] += 1
+
+    def _drop(self, session_id: str):
+        entry = self._sessions.pop(session_id)
+        self._bytes -= entry["bytes"]
+        self._orphans[session_id] = entry["history"]
+        messages = entry["history"].messages
+        if self.spill_path and messages:
+            conn = self._spill_db()
+            conn.execute("INSERT OR REPLACE INTO sessions (session_id, messages, spilled_at) VALUES (?, ?, ?)",
+                         (session_id, json.dumps(messages_to_dict(messages)), time.time()))
+            conn.execute("DELETE FROM sessions WHERE spilled_at < ?", (time.time() - self.spill_ttl,))
+            conn.commit()
+            self._stats["spilled"] += 1
+
+    def _unspill(self, session_id: str) -> List[BaseMessage]:
+        if not self.spill_path:
+            return []
+        conn = self._spill_db()
+        row = conn.execute("SELECT messages FROM sessions WHERE session_id = ?", (session_id,)).fetchone()
+        if row is None:
+            return []
+        conn.execute("DELETE FROM sessions WHERE session_id = ?", (session_id,))
+        conn.commit()
+        self._stats["resumed"] += 1
+        return messages_from_dict(json.loads(row[0]))
+
+    def _discard_spill(self, session_id: str):
+        if self.spill_path:
+            conn = self._spill_db()
+            conn.execute("DELETE FROM sessions WHERE session_id = ?", (session_id,))
+            conn.commit()
+
+    def _spill_db(self) -> sqlite3.Connection:
+        if self._conn is None:
+            self._conn = sqlite3.connect(self.spill_path, check_same_thread=False)
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.execute("CREATE TABLE IF NOT EXISTS sessions (session_id TEXT PRIMARY KEY, messages TEXT NOT NULL, spilled_at REAL NOT NULL)")
+            self._conn.commit()
+        return self._conn
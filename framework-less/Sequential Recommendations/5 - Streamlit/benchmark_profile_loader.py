@@ -0,0 +1,75 @@
+# How to run file:
+# python benchmark_profile_loader.py tomjohn --runs 5
+
+import argparse
+import statistics
+import threading
+import time
+
+from google.cloud import firestore
+from google.cloud.firestore_v1.client import Client
+from google.cloud.firestore_v1.collection import CollectionReference
+from google.cloud.firestore_v1.document import DocumentReference
+
+from profile_loader import get_nested_subcollections, load_nested_document
+
+PROJECT_ID = "andrewcooley-test-project"
+FIRESTORE_DB = "test-db"
+
+
+class RoundTripCounter:
+    """Counts Firestore requests by wrapping the client methods the profile loaders call"""
+
+    def __init__(self):
+        self.count = 0
+        self._lock = threading.Lock()
+
+    def wrap(self, cls, name):
+        original = getattr(cls, name)
+        counter = self
+
+        def wrapper(*args, **kwargs):
+            with counter._lock:
+                counter.count += 1
+            return original(*args, **kwargs)
+
+        setattr(cls, name, wrapper)
+
+def benchmark(label, load, counter, runs):
+    """Runs a loader several times and prints round trips and wall time"""
+
+    timings = []
+    for _ in range(runs):
+        counter.count = 0
+        start = time.perf_counter()
+        profile = load()
+        timings.append(time.perf_counter() - start)
+
+    print(f"{label:<28} round trips: {counter.count:>5}   "
+          f"median: {statistics.median(timings) * 1000:8.1f} ms   "
+          f"min: {min(timings) * 1000:8.1f} ms")
+    return profile
+
+def main():
+    parser = argparse.ArgumentParser(description="Compare serial and batched customer profile loading.")
+    parser.add_argument("customer", help="Document id in the customers collection, e.g. tomjohn")
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("--max-workers", type=int, default=8)
+    args = parser.parse_args()
+
+    db = firestore.Client(project=PROJECT_ID, database=FIRESTORE_DB)
+    doc_ref = db.collection("customers").document(args.customer)
+
+    counter = RoundTripCounter()
+    counter.wrap(DocumentReference, "get")
+    counter.wrap(DocumentReference, "collections")
+    counter.wrap(CollectionReference, "stream")
+    counter.wrap(Client, "get_all")
+
+    serial = benchmark("get_nested_subcollections", lambda: get_nested_subcollections(doc_ref), counter, args.runs)
+    batched = benchmark("load_nested_document", lambda: load_nested_document(db, doc_ref, args.max_workers), counter, args.runs)
+
+    print("Same profile returned:", serial == batched)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,65 @@
+# How to run file:
+# python benchmark_vector_index.py --queries 20 --runs 5
+
+import argparse
+import statistics
+import time
+
+import numpy as np
+from google.cloud import firestore
+
+from restaurant_index import FirestoreRestaurantIndex, LocalRestaurantIndex
+
+PROJECT_ID = "andrewcooley-test-project"
+FIRESTORE_DB = "test-db"
+
+
+def benchmark(label, index, queries, k, runs):
+    """Runs one query at a time and a batch of all queries, and prints wall time"""
+
+    single, batched = [], []
+    for _ in range(runs):
+        for query in queries:
+            start = time.perf_counter()
+            index.search([query], k)
+            single.append(time.perf_counter() - start)
+
+        start = time.perf_counter()
+        results = index.search(queries, k)
+        batched.append(time.perf_counter() - start)
+
+    print(f"{label:<10} per query median: {statistics.median(single) * 1000:8.2f} ms   "
+          f"p95: {np.percentile(single, 95) * 1000:8.2f} ms   "
+          f"batch of {len(queries)}: {statistics.median(batched) * 1000:8.2f} ms")
+    return results
+
+def main():
+    parser = argparse.ArgumentParser(description="Compare the local and Firestore restaurant vector indexes.")
+    parser.add_argument("--queries", type=int, default=20, help="Number of random query vectors")
+    parser.add_argument("--k", type=int, default=10)
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    db = firestore.Client(project=PROJECT_ID, database=FIRESTORE_DB)
+
+    start = time.perf_counter()
+    local = LocalRestaurantIndex(db)
+    print(f"Local index: {len(local)} restaurants loaded in {(time.perf_counter() - start) * 1000:.0f} ms")
+    remote = FirestoreRestaurantIndex(db)
+
+    # Random unit vectors with the same dimensionality as the stored embeddings
+    rng = np.random.default_rng(args.seed)
+    queries = rng.standard_normal((args.queries, local.dimensions)).astype(np.float32)
+    queries /= np.linalg.norm(queries, axis=1, keepdims=True)
+
+    local_results = benchmark("local", local, queries, args.k, args.runs)
+    remote_results = benchmark("firestore", remote, queries, args.k, args.runs)
+
+    agree = sum(a[0][1]["id"] == b[0][1]["id"] for a, b in zip(local_results, remote_results) if a and b)
+    print(f"Top-1 agreement: {agree}/{len(queries)}")
+
+    local.close()
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,147 @@
+# Write-behind persistence of chat messages to Firestore
+import logging
+import re
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Dict, List
+
+logger = logging.getLogger(__name__)
+
+
+def plain_text(html: str) -> str:
+    """Returns the visible text of an HTML message with whitespace collapsed"""
+
+    from bs4 import BeautifulSoup
+
+    text = BeautifulSoup(html, "html.parser").get_text()
+    return re.sub(r'\s+', ' ', text).strip()
+
+
+class ChatPersister:
+    """Appends chat messages to their Firestore session documents from a background thread.
+
+    Messages are queued per session and written with ArrayUnion on the session's
+    'messages' field, grouped into one WriteBatch per flush. A flush happens every
+    flush_interval seconds or as soon as max_pending messages are queued, and close()
+    flushes whatever is left. Failed writes stay queued and are retried after a delay
+    that starts at flush_interval and doubles with each consecutive failure, up to
+    max_retry_delay seconds. At most max_backlog messages are kept queued after a
+    failure; the oldest are dropped first.
+    """
+
+    def __init__(self, db, flush_interval: float = 2.0, max_pending: int = 50, max_batch_writes: int = 500,
+                 max_backlog: int = 10000, max_retry_delay: float = 60.0):
+        self.db = db
+        self.flush_interval = flush_interval
+        self.max_pending = max_pending
+        self.max_batch_writes = max_batch_writes
+        self.max_backlog = max_backlog
+        self.max_retry_delay = max_retry_delay
+        self._pending: "OrderedDict[str, List[Dict[str, Any]]]" = OrderedDict()
+        self._refs = {}
+        self._condition = threading.Condition()
+        self._flush_lock = threading.Lock()
+        self._stats = {"queued": 0, "written": 0, "batches": 0, "failures": 0, "dropped": 0}
+        self._closed = False
+        self._worker = threading.Thread(target=self._run, name="chat-persister", daemon=True)
+        self._worker.start()
+
+    def append(self, session_ref, message: Dict[str, Any]):
+        """Queues a message for the session document; it should already be plain text"""
+
+        with self._condition:
+            if self._closed:
+                raise RuntimeError("ChatPersister is closed")
+            self._refs[session_ref.path] = session_ref
+            self._pending.setdefault(session_ref.path, []).append(message)
+            self._stats["queued"] += 1
+            if self._pending_count() >= self.max_pending:
+                self._condition.notify()
+
+    def flush(self) -> bool:
+        """Writes all queued messages now; returns False if a write failed and messages were re-queued"""
+
+        with self._flush_lock:
+            with self._condition:
+                pending, self._pending = self._pending, OrderedDict()
+            if not pending:
+                return True
+
+            from google.cloud.firestore import ArrayUnion
+
+            paths = list(pending)
+            written = 0
+            try:
+                while written < len(paths):
+                    chunk = paths[written:written + self.max_batch_writes]
+                    batch = self.db.batch()
+                    for path in chunk:
+                        batch.set(self._refs[path], {"messages": ArrayUnion(pending[path])}, merge=True)
+                    batch.commit()
+                    written += len(chunk)
+                    with self._condition:
+                        self._stats["batches"] += 1
+                        self._stats["written"] += sum(len(pending[path]) for path in chunk)
+            except Exception as e:
+                logger.warning(f"Persisting chat messages failed; will retry: {e}")
+                with self._condition:
+                    self._stats["failures"] += 1
+                    # Put unwritten messages back in front of anything queued since
+                    unwritten = OrderedDict((path, pending[path]) for path in paths[written:])
+                    for path, messages in self._pending.items():
+                        unwritten.setdefault(path, []).extend(messages)
+                    self._pending = unwritten
+                    self._drop_oldest()
+                return False
+            return True
+
+    def stats(self) -> Dict[str, int]:
+        """Returns queued, written, batch and failure counts plus messages still pending"""
+
+        with self._condition:
+            return dict(self._stats, pending=self._pending_count())
+
+    def close(self):
+        """Stops the background thread and flushes remaining messages"""
+
+        with self._condition:
+            self._closed = True
+            self._condition.notify()
+        self._worker.join()
+        self.flush()
+
+    def _pending_count(self) -> int:
+        return sum(len(messages) for messages in self._pending.values())
+
+    def _drop_oldest(self):
+        # Called with the condition held; sessions are ordered by their oldest queued message
+        excess = self._pending_count() - self.max_backlog
+        if excess <= 0:
+            return
+        dropped = 0
+        while dropped < excess:
+            path, messages = next(iter(self._pending.items()))
+            count = min(len(messages), excess - dropped)
+            del messages[:count]
+            dropped += count
+            if not messages:
+                del self._pending[path]
+        self._stats["dropped"] += dropped
+        logger.warning(f"Chat persistence backlog exceeded {self.max_backlog} messages; dropped the {dropped} oldest")
+
+    def _run(self):
+        failures = 0
+        while True:
+            with self._condition:
+                # After a failed flush wait out the whole retry delay, even if max_pending messages are queued
+                delay = self.flush_interval if not failures else min(self.flush_interval * 2 ** (failures - 1), self.max_retry_delay)
+                deadline = time.monotonic() + delay
+                while not self._closed and (failures or self._pending_count() < self.max_pending):
+                    remaining = deadline - time.monotonic()
+                    if remaining <= 0:
+                        break
+                    self._condition.wait(remaining)
+                if self._closed:
+                    return
+            failures = 0 if self.flush() else failures + 1
@@ -0,0 +1,213 @@
+# Persistent embedding cache and request batching
+import hashlib
+import json
+import logging
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import Future
+from typing import Callable, Dict, List, Optional, Tuple
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+# (task, model_name, dimensionality) - texts can only share a request when these match
+EmbeddingParams = Tuple[str, str, Optional[int]]
+
+
+class EmbeddingStore:
+    """Stores embeddings in SQLite as compact float16 or float32 blobs, with an in-memory LRU in front.
+
+    Keys are a hash of the whitespace-normalized text and the embedding parameters, so the
+    same query written twice is only embedded once, across sessions and restarts.
+    """
+
+    def __init__(self, path: str, dtype: str = "float16", max_memory_entries: int = 10000):
+        self.dtype = np.dtype(dtype)
+        self.max_memory_entries = max_memory_entries
+        self._memory: "OrderedDict[str, np.ndarray]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._stats = {"memory_hits": 0, "disk_hits": 0, "misses": 0}
+
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("CREATE TABLE IF NOT EXISTS embeddings (key TEXT PRIMARY KEY, dtype TEXT NOT NULL, vector BLOB NOT NULL)")
+        self._conn.commit()
+
+    @staticmethod
+    def key(text: str, params: EmbeddingParams) -> str:
+        """Returns the cache key for a text and its embedding parameters"""
+
+        normalized = " ".join(text.split())
+        return hashlib.sha256(json.dumps([normalized, *params]).encode("utf-8")).hexdigest()
+
+    def get_many(self, keys: List[str]) -> Dict[str, np.ndarray]:
+        """Returns the cached vectors for the keys that are present"""
+
+        found = {}
+        with self._lock:
+            missing = []
+            for key in keys:
+                if key in self._memory:
+                    self._memory.move_to_end(key)
+                    found[key] = self._memory[key]
+                    self._stats["memory_hits"] += 1
+                else:
+                    missing.append(key)
+
+            if missing:
+                placeholders = ",".join("?" * len(missing))
+                rows = self._conn.execute(f"SELECT key, dtype, vector FROM embeddings WHERE key IN ({placeholders})", missing).fetchall()
+                for key, dtype, blob in rows:
+                    vector = np.frombuffer(blob, dtype=dtype)
+                    found[key] = vector
+                    self._remember(key, vector)
+                    self._stats["disk_hits"] += 1
+                self._stats["misses"] += len(missing) - len(rows)
+
+        return found
+
+    def put_many(self, vectors: Dict[str, np.ndarray]):
+        """Stores vectors under their keys, converted to the store's dtype"""
+
+        with self._lock:
+            rows = []
+            for key, vector in vectors.items():
+                vector = np.asarray(vector, dtype=self.dtype)
+                self._remember(key, vector)
+                rows.append((key, self.dtype.name, vector.tobytes()))
+            self._conn.executemany("INSERT OR REPLACE INTO embeddings (key, dtype, vector) VALUES (?, ?, ?)", rows)
+            self._conn.commit()
+
+    def stats(self) -> Dict[str, int]:
+        """Returns hit and miss counts and the number of vectors held in memory"""
+
+        with self._lock:
+            return dict(self._stats, memory_entries=len(self._memory))
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
+
+    def _remember(self, key: str, vector: np.ndarray):
+        self._memory[key] = vector
+        self._memory.move_to_end(key)
+        while len(self._memory) > self.max_memory_entries:
+            self._memory.popitem(last=False)
+
+
+class EmbeddingBatcher:
+    """Merges concurrent embedding requests into shared get_embeddings calls.
+
+    Callers from any thread enqueue texts and wait on futures. A single worker waits up to
+    max_wait seconds for more texts with the same parameters, then sends up to max_batch
+    of them in one request.
+    """
+
+    def __init__(self, embed_batch: Callable[[List[str], str, str, Optional[int]], List[List[float]]],
+                 max_batch: int = 250, max_wait: float = 0.01):
+        self.embed_batch = embed_batch
+        self.max_batch = max_batch
+        self.max_wait = max_wait
+        self._pending: "OrderedDict[EmbeddingParams, List[Tuple[str, Future]]]" = OrderedDict()
+        self._condition = threading.Condition()
+        self._stats = {"requests": 0, "texts": 0, "largest_batch": 0}
+        self._closed = False
+        self._worker = threading.Thread(target=self._run, name="embedding-batcher", daemon=True)
+        self._worker.start()
+
+    def embed(self, texts: List[str], params: EmbeddingParams) -> List[List[float]]:
+        """Embeds texts, sharing the request with any other callers waiting at the same time"""
+
+        futures = []
+        with self._condition:
+            if self._closed:
+                raise RuntimeError("EmbeddingBatcher is closed")
+            pending = self._pending.setdefault(params, [])
+            for text in texts:
+                future = Future()
+                pending.append((text, future))
+                futures.append(future)
+            self._condition.notify()
+        return [future.result() for future in futures]
+
+    def stats(self) -> Dict[str, int]:
+        """Returns the number of requests sent, texts embedded and the largest batch"""
+
+        with self._condition:
+            return dict(self._stats)
+
+    def close(self):
+        with self._condition:
+            self._closed = True
+            self._condition.notify()
+        self._worker.join()
+
+    def _run(self):
+        while True:
+            with self._condition:
+                while not self._pending and not self._closed:
+                    self._condition.wait()
+                if self._closed and not self._pending:
+                    return
+
+            # Give other sessions a moment to join this batch
+            time.sleep(self.max_wait)
+
+            with self._condition:
+                params, pending = next(iter(self._pending.items()))
+                batch, rest = pending[:self.max_batch], pending[self.max_batch:]
+                if rest:
+                    self._pending[params] = rest
+                    self._pending.move_to_end(params)
+                else:
+                    del self._pending[params]
+                self._stats["requests"] += 1
+                self._stats["texts"] += len(batch)
+                self._stats["largest_batch"] = max(self._stats["largest_batch"], len(batch))
+
+            try:
+                vectors = self.embed_batch([text for text, _ in batch], *params)
+            except Exception as e:
+                logger.warning(f"Embedding request for {len(batch)} texts failed: {e}")
+                for _, future in batch:
+                    future.set_exception(e)
+                continue
+            for (_, future), vector in zip(batch, vectors):
+                future.set_result(vector)
+
+
+class CachedEmbedder:
+    """Serves embeddings from an EmbeddingStore and batches the misses through an EmbeddingBatcher"""
+
+    def __init__(self, store: EmbeddingStore, batcher: EmbeddingBatcher):
+        self.store = store
+        self.batcher = batcher
+
+    def embed(self, texts: List[str], task: str, model_name: str, dimensionality: Optional[int]) -> List[List[float]]:
+        """Returns one vector per text, embedding only texts that are not cached"""
+
+        params = (task, model_name, dimensionality)
+        keys = [self.store.key(text, params) for text in texts]
+        found = self.store.get_many(list(dict.fromkeys(keys)))
+
+        # Embed each missing text once, even if it appears several times
+        missing: Dict[str, str] = {}
+        for key, text in zip(keys, texts):
+            if key not in found:
+                missing.setdefault(key, text)
+        if missing:
+            vectors = self.batcher.embed(list(missing.values()), params)
+            # Round through the store's dtype so cached and fresh results are identical
+            new = {key: np.asarray(vector, dtype=self.store.dtype) for key, vector in zip(missing, vectors)}
+            self.store.put_many(new)
+            found.update(new)
+
+        return [found[key].astype(np.float32).tolist() for key in keys]
+
+    def stats(self) -> Dict[str, Dict[str, int]]:
+        """Returns cache and batching statistics"""
+
+        return {"cache": self.store.stats(), "batching": self.batcher.stats()}
@@ -0,0 +1,247 @@
+# Streaming reader for Firestore managed export files
+import datetime
+import os
+import struct
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+
+# Export files are LevelDB logs: 32 KiB blocks of records with a 7 byte header
+BLOCK_SIZE = 32768
+HEADER_SIZE = 7
+FULL, FIRST, MIDDLE, LAST = 1, 2, 3, 4
+
+# Property meanings used by the export's EntityProto encoding
+MEANING_TIMESTAMP = 7
+MEANING_BLOB = 14
+MEANING_TEXT = 15
+MEANING_EMBEDDED_ENTITY = 19
+MEANING_EMPTY_LIST = 24
+
+
+def read_records(path: str) -> Iterator[bytes]:
+    """Yields the records of a LevelDB log file one at a time, reassembling fragmented records"""
+
+    with open(path, "rb") as f:
+        fragments: List[bytes] = []
+        while True:
+            block = f.read(BLOCK_SIZE)
+            if not block:
+                break
+            offset = 0
+            while offset + HEADER_SIZE <= len(block):
+                _checksum, length, record_type = struct.unpack_from("<IHB", block, offset)
+                offset += HEADER_SIZE
+                if record_type == 0 and length == 0:
+                    # Zero padding at the end of a block
+                    break
+                data = block[offset:offset + length]
+                offset += length
+
+                if record_type == FULL:
+                    yield data
+                elif record_type == FIRST:
+                    fragments = [data]
+                elif record_type == MIDDLE:
+                    fragments.append(data)
+                elif record_type == LAST:
+                    fragments.append(data)
+                    yield b"".join(fragments)
+                    fragments = []
+                else:
+                    raise ValueError(f"Unknown record type {record_type} in {path}")
+
+def export_files(export_dir: str) -> List[str]:
+    """Returns the output-N files of an export folder in order, searching subfolders"""
+
+    files = []
+    for root, _, names in os.walk(export_dir):
+        files.extend(os.path.join(root, name) for name in names if name.startswith("output-"))
+    return sorted(files, key=lambda path: (os.path.dirname(path), int(path.rsplit("-", 1)[1])))
+
+def iter_documents(export_dir: str) -> Iterator[Tuple[str, Dict[str, Any]]]:
+    """Yields (document path, fields) for every document in an export, streaming file by file"""
+
+    for path in export_files(export_dir):
+        for record in read_records(path):
+            key, fields = parse_entity(record)
+            yield "/".join(key), fields
+
+def load_documents(export_dir: str) -> Dict[str, Dict[str, Any]]:
+    """Returns all documents of an export keyed by document path"""
+
+    return dict(iter_documents(export_dir))
+
+def nested_documents(documents: Dict[str, Dict[str, Any]], collection: str) -> Dict[str, Dict[str, Any]]:
+    """Builds the nested dict of each document in a top-level collection, in the shape the app's profile loader returns"""
+
+    def nest(doc_path):
+        doc_id = doc_path.rsplit("/", 1)[1]
+        data = {doc_id: documents[doc_path]}
+        depth = doc_path.count("/") + 2
+        for path in sorted(documents):
+            if path.startswith(doc_path + "/") and path.count("/") == depth:
+                subcollection, child_id = path.rsplit("/", 2)[1:]
+                data.setdefault(subcollection, {})[child_id] = nest(path)
+        return data
+
+    return {path.split("/")[1]: nest(path) for path in sorted(documents)
+            if path.startswith(collection + "/") and path.count("/") == 1}
+
+
+# --- EntityProto decoding ---
+
+def parse_entity(data: bytes) -> Tuple[List[str], Dict[str, Any]]:
+    """Decodes an EntityProto into its key path elements and a dict of Firestore-style values"""
+
+    key: List[str] = []
+    properties: List[Tuple[str, Any, bool]] = []
+    for field, wire_type, value in _fields(data):
+        if field == 13 and wire_type == 2:
+            key = _parse_reference(value)
+        elif field in (14, 15) and wire_type == 2:
+            properties.append(_parse_property(value))
+    return key, _collect(properties)
+
+def _parse_reference(data: bytes) -> List[str]:
+    for field, wire_type, value in _fields(data):
+        if field == 14 and wire_type == 2:
+            return _parse_path(value)
+    return []
+
+def _parse_path(data: bytes) -> List[str]:
+    # Path elements are groups of (type, id or name)
+    elements: List[str] = []
+    for field, wire_type, value in _fields(data):
+        if field == 1 and wire_type == 3:
+            element = {number: item for number, _, item in _fields(value)}
+            name = element.get(4)
+            elements.append(element[2].decode("utf-8"))
+            elements.append(name.decode("utf-8") if name is not None else str(element.get(3)))
+    return elements
+
+def _parse_property(data: bytes) -> Tuple[str, Any, bool]:
+    name, meaning, multiple, raw = "", 0, False, b""
+    for field, wire_type, value in _fields(data):
+        if field == 1:
+            meaning = value
+        elif field == 3:
+            name = value.decode("utf-8")
+        elif field == 4:
+            multiple = bool(value)
+        elif field == 5:
+            raw = value
+    return name, _parse_value(raw, meaning), multiple
+
+def _parse_value(data: bytes, meaning: int) -> Any:
+    if meaning == MEANING_EMPTY_LIST:
+        return []
+    for field, wire_type, value in _fields(data):
+        if field == 1:
+            if meaning == MEANING_TIMESTAMP:
+                return datetime.datetime.fromtimestamp(0, datetime.timezone.utc) + datetime.timedelta(microseconds=_signed(value))
+            return _signed(value)
+        if field == 2:
+            return bool(value)
+        if field == 3:
+            if meaning == MEANING_EMBEDDED_ENTITY:
+                return parse_entity(value)[1]
+            if meaning == MEANING_BLOB:
+                return value
+            return value.decode("utf-8")
+        if field == 4:
+            return struct.unpack("<d", value)[0]
+        if field == 5 and wire_type == 3:
+            point = {number: struct.unpack("<d", item)[0] for number, _, item in _fields(value)}
+            return {"latitude": point.get(6), "longitude": point.get(7)}
+        if field == 12 and wire_type == 3:
+            path = [item for number, _, item in _fields(value) if number == 14]
+            return "/".join(_parse_path_elements(path))
+    return None
+
+def _parse_path_elements(groups: List[bytes]) -> List[str]:
+    # Reference values use fields 15/16/17 for type/id/name inside their path groups
+    elements: List[str] = []
+    for group in groups:
+        element = {number: item for number, _, item in _fields(group)}
+        elements.append(element[15].decode("utf-8"))
+        name = element.get(17)
+        elements.append(name.decode("utf-8") if name is not None else str(element.get(16)))
+    return elements
+
+def _collect(properties: List[Tuple[str, Any, bool]]) -> Dict[str, Any]:
+    fields: Dict[str, Any] = {}
+    for name, value, multiple in properties:
+        if multiple:
+            fields.setdefault(name, []).append(value)
+        else:
+            fields[name] = value
+
+    # Firestore vectors are exported as maps tagged with __type__
+    for name, value in fields.items():
+        if isinstance(value, dict) and value.get("__type__") == "__vector__":
+            fields[name] = [float(item) for item in value.get("value", [])]
+    return fields
+
+
+# --- Protocol buffer wire format ---
+
+def _varint(data: bytes, offset: int) -> Tuple[int, int]:
+    result, shift = 0, 0
+    while True:
+        byte = data[offset]
+        offset += 1
+        result |= (byte & 0x7F) << shift
+        if not byte & 0x80:
+            return result, offset
+        shift += 7
+
+def _signed(value: int) -> int:
+    return value - (1 << 64) if value >= 1 << 63 else value
+
+def _fields(data: bytes, offset: int = 0, end: Optional[int] = None) -> Iterator[Tuple[int, int, Any]]:
+    """Yields (field number, wire type, value); groups are returned as their raw contents"""
+
+    end = len(data) if end is None else end
+    while offset < end:
+        tag, offset = _varint(data, offset)
+        field, wire_type = tag >> 3, tag & 7
+        if wire_type == 0:
+            value, offset = _varint(data, offset)
+        elif wire_type == 1:
+            value, offset = data[offset:offset + 8], offset + 8
+        elif wire_type == 2:
+            length, offset = _varint(data, offset)
+            value, offset = data[offset:offset + length], offset + length
+        elif wire_type == 5:
+            value, offset = data[offset:offset + 4], offset + 4
+        elif wire_type == 3:
+            start, depth = offset, 1
+            while depth:
+                inner_tag, offset = _varint(data, offset)
+                inner_type = inner_tag & 7
+                if inner_type == 3:
+                    depth += 1
+                elif inner_type == 4:
+                    depth -= 1
+                elif inner_type == 0:
+                    _, offset = _varint(data, offset)
+                elif inner_type == 1:
+                    offset += 8
+                elif inner_type == 2:
+                    length, offset = _varint(data, offset)
+                    offset += length
+                elif inner_type == 5:
+                    offset += 4
+            # Strip the end-group tag, which is one byte for the field numbers used here
+            value = data[start:offset - _varint_size((field << 3) | 4)]
+        elif wire_type == 4:
+            continue
+        else:
+            raise ValueError(f"Unsupported wire type {wire_type}")
+        yield field, wire_type, value
+
+def _varint_size(value: int) -> int:
+    size = 1
+    while value >= 0x80:
+        value >>= 7
+        size += 1
+    return size
@@ -0,0 +1,121 @@
+# Bounded on-disk cache of resized images
+import hashlib
+import io
+import logging
+import os
+import threading
+from collections import OrderedDict
+from pathlib import Path
+from typing import Callable, Dict
+
+logger = logging.getLogger(__name__)
+
+
+class ImageCache:
+    """Stores display-sized thumbnails of remote images on disk, keyed by image URI.
+
+    Each image is downloaded once, downscaled to the display width with Pillow and
+    re-encoded as WebP (or JPEG), so chat messages only need to carry the URI. Files
+    are evicted least recently used once the cache grows past max_bytes, and survive
+    restarts of the app.
+    """
+
+    def __init__(self, cache_dir: str, fetch: Callable[[str], bytes], width: int = 400,
+                 image_format: str = "WEBP", quality: int = 80, max_bytes: int = 256 * 1024 * 1024):
+        self.cache_dir = Path(cache_dir)
+        self.fetch = fetch
+        self.width = width
+        self.image_format = image_format.upper()
+        self.quality = quality
+        self.max_bytes = max_bytes
+        self._extension = ".jpg" if self.image_format == "JPEG" else f".{self.image_format.lower()}"
+        self._lock = threading.Lock()
+        self._key_locks: Dict[str, threading.Lock] = {}
+        self._stats = {"hits": 0, "misses": 0, "evictions": 0, "bytes_fetched": 0}
+
+        # Rebuild the LRU order from a previous run, oldest access first
+        self.cache_dir.mkdir(parents=True, exist_ok=True)
+        files = sorted(self.cache_dir.glob(f"*{self._extension}"), key=lambda path: path.stat().st_mtime)
+        self._entries: "OrderedDict[str, int]" = OrderedDict((path.stem, path.stat().st_size) for path in files)
+        self._bytes = sum(self._entries.values())
+
+    def key(self, image_uri: str) -> str:
+        """Returns the cache key for an image URI at the configured size and format"""
+
+        return hashlib.sha256(f"{image_uri}|{self.width}|{self.image_format}".encode("utf-8")).hexdigest()[:32]
+
+    def thumbnail(self, image_uri: str) -> Path:
+        """Returns the path of the resized image, downloading and converting it on a miss"""
+
+        key = self.key(image_uri)
+        path = self.cache_dir / f"{key}{self._extension}"
+
+        with self._lock:
+            if key in self._entries and path.exists():
+                self._entries.move_to_end(key)
+                self._stats["hits"] += 1
+                os.utime(path)
+                return path
+            key_lock = self._key_locks.setdefault(key, threading.Lock())
+
+        # Only one thread downloads a given image; others wait and then read it from disk
+        with key_lock:
+            try:
+                with self._lock:
+                    if key in self._entries and path.exists():
+                        self._entries.move_to_end(key)
+                        self._stats["hits"] += 1
+                        return path
+
+                original = self.fetch(image_uri)
+                data = self._resize(original)
+                tmp_path = path.with_suffix(".tmp")
+                tmp_path.write_bytes(data)
+                os.replace(tmp_path, path)
+
+                with self._lock:
+                    self._stats["misses"] += 1
+                    self._stats["bytes_fetched"] += len(original)
+                    self._bytes += len(data) - self._entries.pop(key, 0)
+                    self._entries[key] = len(data)
+                    self._evict(keep=key)
+            finally:
+                # Drop the lock whether or not the fetch succeeded, so failing URLs do not accumulate
+                with self._lock:
+                    if self._key_locks.get(key) is key_lock:
+                        del self._key_locks[key]
+
+        return path
+
+    def stats(self) -> Dict[str, int]:
+        """Returns hit, miss and eviction counts plus current entries and bytes on disk"""
+
+        with self._lock:
+            return dict(self._stats, entries=len(self._entries), bytes=self._bytes)
+
+    def _resize(self, data: bytes) -> bytes:
+        from PIL import Image
+
+        with Image.open(io.BytesIO(data)) as image:
+            if image.width > self.width:
+                height = round(image.height * self.width / image.width)
+                image = image.resize((self.width, height), Image.LANCZOS)
+            if self.image_format == "JPEG" and image.mode not in ("RGB", "L"):
+                image = image.convert("RGB")
+            output = io.BytesIO()
+            image.save(output, format=self.image_format, quality=self.quality)
+            return output.getvalue()
+
+    def _evict(self, keep: str):
+        while self._bytes > self.max_bytes and len(self._entries) > 1:
+            key, size = next(iter(self._entries.items()))
+            if key == keep:
+                break
+            del self._entries[key]
+            self._bytes -= size
+            self._stats["evictions"] += 1
+            try:
+                (self.cache_dir / f"{key}{self._extension}").unlink()
+            except FileNotFoundError:
+                pass
+            logger.info(f"Evicted cached image {key}")
@@ -0,0 +1,299 @@
+# In-process stand-in for the Firestore client, for offline runs and load tests
+import copy
+import datetime
+import math
+import threading
+import uuid
+from collections import namedtuple
+from enum import Enum
+from typing import Any, Callable, Dict, Iterator, List, Optional, Set, Tuple
+
+from google.cloud.firestore_v1.transforms import DELETE_FIELD, SERVER_TIMESTAMP, ArrayRemove, ArrayUnion
+
+from firestore_export import iter_documents
+
+
+class LocalFirestore:
+    """Holds documents in memory and serves the subset of the Firestore client API the app uses.
+
+    Supports collection and document references, get, set (with merge, SERVER_TIMESTAMP,
+    DELETE_FIELD, ArrayUnion and ArrayRemove), stream, collections, get_all, batched writes, on_snapshot listeners and
+    find_nearest. Data can be loaded from a Firestore managed export, which gives load tests
+    and profiling runs the same deterministic data every time.
+    """
+
+    def __init__(self, documents: Optional[Dict[str, Dict[str, Any]]] = None):
+        self._documents: Dict[str, Dict[str, Any]] = {}
+        self._children: Dict[str, Set[str]] = {}
+        self._subcollections: Dict[str, Set[str]] = {}
+        self._listeners: Dict[str, List[Callable]] = {}
+        self._lock = threading.RLock()
+        for path, fields in (documents or {}).items():
+            self._write(path, fields)
+
+    @classmethod
+    def from_export(cls, export_dir: str) -> "LocalFirestore":
+        """Loads every document of a Firestore managed export"""
+
+        return cls(dict(iter_documents(export_dir)))
+
+    def collection(self, collection_id: str) -> "LocalCollectionReference":
+        return LocalCollectionReference(self, collection_id)
+
+    def document(self, path: str) -> "LocalDocumentReference":
+        return LocalDocumentReference(self, path)
+
+    def collections(self) -> Iterator["LocalCollectionReference"]:
+        with self._lock:
+            ids = sorted(self._subcollections.get("", ()))
+        return iter([self.collection(collection_id) for collection_id in ids])
+
+    def get_all(self, references) -> Iterator["LocalDocumentSnapshot"]:
+        return iter([reference.get() for reference in references])
+
+    def batch(self) -> "LocalWriteBatch":
+        return LocalWriteBatch(self)
+
+    # --- Storage ---
+
+    def _read(self, path: str) -> Optional[Dict[str, Any]]:
+        with self._lock:
+            data = self._documents.get(path)
+            return copy.deepcopy(data) if data is not None else None
+
+    def _write(self, path: str, data: Dict[str, Any], merge: bool = False):
+        self._write_all([(path, data, merge)])
+
+    def _write_all(self, writes: List[Tuple[str, Dict[str, Any], bool]]):
+        """Applies writes atomically, then notifies snapshot listeners outside the lock"""
+
+        notifications = []
+        with self._lock:
+            # Resolve every write before storing any, so a rejected write leaves the batch unapplied
+            updates = []
+            for path, data, merge in writes:
+                existing = self._documents.get(path)
+                base = copy.deepcopy(existing) if merge and existing is not None else {}
+                updates.append((path, existing is not None, _apply(base, data, merge)))
+
+            for path, existed, document in updates:
+                self._documents[path] = document
+
+                # Index the path so collections() and stream() do not scan every document
+                parts = path.split("/")
+                for depth in range(0, len(parts), 2):
+                    parent = "/".join(parts[:depth])
+                    self._subcollections.setdefault(parent, set()).add(parts[depth])
+                    self._children.setdefault("/".join(parts[:depth + 1]), set()).add(parts[depth + 1])
+
+                collection_path = path.rsplit("/", 1)[0]
+                listeners = list(self._listeners.get(collection_path, ()))
+                if listeners:
+                    change_type = ChangeType.MODIFIED if existed else ChangeType.ADDED
+                    notifications.append((path, collection_path, change_type, listeners))
+
+        for path, collection_path, change_type, listeners in notifications:
+            snapshot = self.document(path).get()
+            changes = [DocumentChange(change_type, snapshot)]
+            docs = list(LocalCollectionReference(self, collection_path).stream())
+            for callback in listeners:
+                callback(docs, changes, _now())
+
+    def _listen(self, collection_path: str, callback: Callable) -> "LocalWatch":
+        docs = list(LocalCollectionReference(self, collection_path).stream())
+        with self._lock:
+            self._listeners.setdefault(collection_path, []).append(callback)
+        callback(docs, [DocumentChange(ChangeType.ADDED, doc) for doc in docs], _now())
+        return LocalWatch(self, collection_path, callback)
+
+
+class LocalCollectionReference:
+    """Collection reference backed by a LocalFirestore"""
+
+    def __init__(self, client: LocalFirestore, path: str):
+        self._client = client
+        self.path = path
+        self.id = path.rsplit("/", 1)[-1]
+
+    @property
+    def parent(self) -> Optional["LocalDocumentReference"]:
+        if "/" not in self.path:
+            return None
+        return LocalDocumentReference(self._client, self.path.rsplit("/", 1)[0])
+
+    def document(self, document_id: Optional[str] = None) -> "LocalDocumentReference":
+        return LocalDocumentReference(self._client, f"{self.path}/{document_id or uuid.uuid4().hex[:20]}")
+
+    def stream(self) -> Iterator["LocalDocumentSnapshot"]:
+        with self._client._lock:
+            ids = sorted(self._client._children.get(self.path, ()))
+        snapshots = [self.document(document_id).get() for document_id in ids]
+        return iter([snapshot for snapshot in snapshots if snapshot.exists])
+
+    def get(self) -> List["LocalDocumentSnapshot"]:
+        return list(self.stream())
+
+    def on_snapshot(self, callback: Callable) -> "LocalWatch":
+        return self._client._listen(self.path, callback)
+
+    def find_nearest(self, vector_field: str, query_vector, distance_measure, limit: int,
+                     distance_result_field: Optional[str] = None) -> "LocalVectorQuery":
+        return LocalVectorQuery(self, vector_field, query_vector, distance_measure, limit, distance_result_field)
+
+
+class LocalDocumentReference:
+    """Document reference backed by a LocalFirestore"""
+
+    def __init__(self, client: LocalFirestore, path: str):
+        self._client = client
+        self.path = path
+        self.id = path.rsplit("/", 1)[-1]
+
+    @property
+    def parent(self) -> LocalCollectionReference:
+        return LocalCollectionReference(self._client, self.path.rsplit("/", 1)[0])
+
+    def collection(self, collection_id: str) -> LocalCollectionReference:
+        return LocalCollectionReference(self._client, f"{self.path}/{collection_id}")
+
+    def collections(self) -> Iterator[LocalCollectionReference]:
+        with self._client._lock:
+            ids = sorted(self._client._subcollections.get(self.path, ()))
+        return iter([self.collection(collection_id) for collection_id in ids])
+
+    def get(self) -> "LocalDocumentSnapshot":
+        return LocalDocumentSnapshot(self, self._client._read(self.path))
+
+    def set(self, document_data: Dict[str, Any], merge: bool = False):
+        self._client._write(self.path, document_data, merge=merge)
+
+
+class LocalDocumentSnapshot:
+    """Point-in-time copy of a document"""
+
+    def __init__(self, reference: LocalDocumentReference, data: Optional[Dict[str, Any]]):
+        self.reference = reference
+        self.id = reference.id
+        self._data = data
+
+    @property
+    def exists(self) -> bool:
+        return self._data is not None
+
+    def to_dict(self) -> Optional[Dict[str, Any]]:
+        return copy.deepcopy(self._data)
+
+    def get(self, field_path: str) -> Any:
+        value = self._data
+        for part in field_path.split("."):
+            value = value[part]
+        return copy.deepcopy(value)
+
+
+class LocalVectorQuery:
+    """Exact nearest-neighbour search over a collection's vector field"""
+
+    def __init__(self, collection: LocalCollectionReference, vector_field: str, query_vector, distance_measure,
+                 limit: int, distance_result_field: Optional[str]):
+        self.collection = collection
+        self.vector_field = vector_field
+        self.query_vector = [float(value) for value in query_vector]
+        self.measure = getattr(distance_measure, "name", str(distance_measure)).upper()
+        self.limit = limit
+        self.distance_result_field = distance_result_field
+
+    def stream(self) -> Iterator[LocalDocumentSnapshot]:
+        scored = []
+        for snapshot in self.collection.stream():
+            vector = snapshot._data.get(self.vector_field)
+            if vector is None or len(vector) != len(self.query_vector):
+                continue
+            scored.append((self._distance([float(value) for value in vector]), snapshot))
+
+        # Dot product is a similarity, so larger is nearer; the other measures are distances
+        scored.sort(key=lambda item: item[0], reverse=self.measure == "DOT_PRODUCT")
+        for distance, snapshot in scored[:self.limit]:
+            if self.distance_result_field:
+                snapshot._data[self.distance_result_field] = distance
+            yield snapshot
+
+    def get(self) -> List[LocalDocumentSnapshot]:
+        return list(self.stream())
+
+    def _distance(self, vector: List[float]) -> float:
+        dot = sum(a * b for a, b in zip(self.query_vector, vector))
+        if self.measure == "DOT_PRODUCT":
+            return dot
+        if self.measure == "COSINE":
+            norms = math.sqrt(sum(a * a for a in self.query_vector)) * math.sqrt(sum(b * b for b in vector))
+            return 1.0 - dot / norms if norms else 1.0
+        return math.sqrt(sum((a - b) ** 2 for a, b in zip(self.query_vector, vector)))
+
+
+class LocalWriteBatch:
+    """Collects writes and applies them together on commit"""
+
+    def __init__(self, client: LocalFirestore):
+        self._client = client
+        self._writes = []
+
+    def set(self, reference: LocalDocumentReference, document_data: Dict[str, Any], merge: bool = False):
+        self._writes.append((reference.path, document_data, merge))
+
+    def commit(self):
+        writes, self._writes = self._writes, []
+        self._client._write_all(writes)
+
+
+class LocalWatch:
+    """Handle returned by on_snapshot"""
+
+    def __init__(self, client: LocalFirestore, collection_path: str, callback: Callable):
+        self._client = client
+        self._collection_path = collection_path
+        self._callback = callback
+
+    def unsubscribe(self):
+        with self._client._lock:
+            listeners = self._client._listeners.get(self._collection_path, [])
+            if self._callback in listeners:
+                listeners.remove(self._callback)
+
+
+class ChangeType(Enum):
+    ADDED = 1
+    REMOVED = 2
+    MODIFIED = 3
+
+
+DocumentChange = namedtuple("DocumentChange", ["type", "document"])
+
+
+def _now() -> datetime.datetime:
+    return datetime.datetime.now(datetime.timezone.utc)
+
+def _apply(base: Dict[str, Any], data: Dict[str, Any], merge: bool) -> Dict[str, Any]:
+    """Merges data into base, resolving SERVER_TIMESTAMP, DELETE_FIELD, ArrayUnion and ArrayRemove"""
+
+    for key, value in data.items():
+        if value is SERVER_TIMESTAMP:
+            base[key] = _now()
+        elif value is DELETE_FIELD:
+            if not merge:
+                raise ValueError("Cannot apply DELETE_FIELD in a set request without specifying 'merge=True'")
+            base.pop(key, None)
+        elif isinstance(value, ArrayUnion):
+            # As in Firestore, a field that is not an array is replaced
+            result = list(base[key]) if isinstance(base.get(key), list) else []
+            for item in copy.deepcopy(value.values):
+                if item not in result:
+                    result.append(item)
+            base[key] = result
+        elif isinstance(value, ArrayRemove):
+            existing = base[key] if isinstance(base.get(key), list) else []
+            base[key] = [item for item in existing if item not in value.values]
+        elif isinstance(value, dict):
+            base[key] = _apply(base[key] if isinstance(base.get(key), dict) else {}, value, merge)
+        else:
+            base[key] = copy.deepcopy(value)
+    return base
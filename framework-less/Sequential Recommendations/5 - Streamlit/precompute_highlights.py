@@ -0,0 +1,42 @@
+# How to run file:
+# python precompute_highlights.py --workers 4 --max-age-days 7
+
+import argparse
+import datetime
+import logging
+
+import vertexai
+from google.cloud import firestore
+from vertexai.preview import reasoning_engines
+
+from review_highlights import precompute_highlights
+
+PROJECT_ID = "andrewcooley-test-project"
+LOCATION = "us-central1"
+FIRESTORE_DB = "test-db"
+REMOTE_AGENT = "projects/619758184732/locations/us-central1/reasoningEngines/6556783660614287360"
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Store Google Maps review highlights on every restaurant document.")
+    parser.add_argument("--workers", type=int, default=4, help="Concurrent agent queries")
+    parser.add_argument("--max-age-days", type=float, default=7, help="Recompute highlights older than this")
+    parser.add_argument("--retries", type=int, default=3)
+    parser.add_argument("--force", action="store_true", help="Recompute even fresh highlights")
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s %(levelname)s %(message)s")
+
+    vertexai.init(project=PROJECT_ID, location=LOCATION)
+    db = firestore.Client(project=PROJECT_ID, database=FIRESTORE_DB)
+    agent = reasoning_engines.ReasoningEngine(REMOTE_AGENT)
+
+    def summarize(query, session_id):
+        return agent.query(input=query, config={"configurable": {"session_id": session_id}})["output"]
+
+    counts = precompute_highlights(db, summarize, datetime.timedelta(days=args.max_age_days),
+                                   max_workers=args.workers, retries=args.retries, force=args.force)
+    print(f"{counts['total']} restaurants: {counts['updated']} updated, {counts['skipped']} fresh, {counts['failed']} failed")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,60 @@
+# Customer profile loading from Firestore
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Dict, List
+
+
+def get_nested_subcollections(doc_ref):
+    """Recursively fetches all documents from a document and its nested subcollections, one request at a time."""
+
+    doc = doc_ref.get()
+    data = {}
+    if doc.exists:
+        data[doc_ref.id] = doc.to_dict()
+
+        for subcollection in doc_ref.collections():
+            data[subcollection.id] = {}
+            for doc in subcollection.stream():
+                nested_data = get_nested_subcollections(doc.reference)
+                data[subcollection.id][doc.id] = nested_data
+
+    return data
+
+def load_nested_document(db, doc_ref, max_workers: int = 8) -> Dict[str, Any]:
+    """Fetches a document and its nested subcollections level by level, with bounded parallel requests.
+
+    Returns the same nested dict shape as get_nested_subcollections. The root document is read
+    with a batched get_all, every document on a level lists its subcollections concurrently,
+    and every subcollection is streamed concurrently. Streamed snapshots already carry their
+    data, so nested documents are not read a second time.
+    """
+
+    root = next(iter(db.get_all([doc_ref])), None)
+    if root is None or not root.exists:
+        return {}
+
+    with ThreadPoolExecutor(max_workers=max_workers) as pool:
+        return _load_level(pool, [root])[0]
+
+def _load_level(pool, snapshots) -> List[Dict[str, Any]]:
+    """Builds the nested dicts for all documents on one level of the tree."""
+
+    # One collections() call per document, in parallel
+    subcollections = list(pool.map(lambda snapshot: list(snapshot.reference.collections()), snapshots))
+
+    # One stream() call per subcollection, in parallel
+    flat_subcollections = [subcollection for per_doc in subcollections for subcollection in per_doc]
+    children = list(pool.map(lambda subcollection: list(subcollection.stream()), flat_subcollections))
+
+    # Load the next level for all children at once
+    flat_children = [child for per_subcollection in children for child in per_subcollection]
+    nested_children = iter(_load_level(pool, flat_children) if flat_children else [])
+
+    results = []
+    children_iter = iter(children)
+    for snapshot, per_doc in zip(snapshots, subcollections):
+        data = {snapshot.id: snapshot.to_dict()}
+        for subcollection in per_doc:
+            data[subcollection.id] = {child.id: next(nested_children) for child in next(children_iter)}
+        results.append(data)
+
+    return results
@@ -0,0 +1,114 @@
+# Process-wide registry of models and GCP clients
+import logging
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Callable, Dict, Hashable, List, Optional
+
+logger = logging.getLogger(__name__)
+
+
+class ResourceRegistry:
+    """Builds models and GCP clients once and shares them across Streamlit sessions and reruns.
+
+    Each resource records how long it took to build and how many times it was reused.
+    GenerativeModel instances are pooled per (system_instruction, tools) and evicted
+    least recently used beyond max_models.
+    """
+
+    def __init__(self, project_id: str, location: str, firestore_db: str, remote_agent: str, model_id: str, max_models: int = 32):
+        self.project_id = project_id
+        self.location = location
+        self.firestore_db = firestore_db
+        self.remote_agent = remote_agent
+        self.model_id = model_id
+        self.max_models = max_models
+        self._resources: "OrderedDict[Hashable, Any]" = OrderedDict()
+        self._stats: Dict[str, Dict[str, float]] = {}
+        self._lock = threading.RLock()
+
+        import vertexai
+        vertexai.init(project=project_id, location=location)
+
+    def firestore(self):
+        """Returns the shared Firestore client"""
+
+        def build():
+            from google.cloud import firestore
+            return firestore.Client(project=self.project_id, database=self.firestore_db)
+
+        return self._get("firestore", "firestore", build)
+
+    def storage(self):
+        """Returns the shared Cloud Storage client"""
+
+        def build():
+            from google.cloud import storage
+            return storage.Client(project=self.project_id)
+
+        return self._get("storage", "storage", build)
+
+    def agent(self):
+        """Returns the shared Reasoning Engine agent handle"""
+
+        def build():
+            from vertexai.preview import reasoning_engines
+            return reasoning_engines.ReasoningEngine(self.remote_agent)
+
+        return self._get("agent", "agent", build)
+
+    def embedding_model(self, model_name: str):
+        """Returns the shared text embedding model"""
+
+        def build():
+            from vertexai.language_models import TextEmbeddingModel
+            return TextEmbeddingModel.from_pretrained(model_name)
+
+        return self._get(("embedding_model", model_name), "embedding_model", build)
+
+    def generative_model(self, system_instruction: str, tools: Optional[List[Any]] = None):
+        """Returns a pooled GenerativeModel for a system instruction and tool set"""
+
+        def build():
+            from vertexai.generative_models import GenerativeModel
+            if tools:
+                return GenerativeModel(self.model_id, tools=tools, system_instruction=[system_instruction])
+            return GenerativeModel(self.model_id, system_instruction=[system_instruction])
+
+        key = ("generative_model", system_instruction, _tools_key(tools))
+        model = self._get(key, "generative_model", build)
+        with self._lock:
+            generative_keys = [k for k in self._resources if isinstance(k, tuple) and k[0] == "generative_model"]
+            for stale in generative_keys[:max(len(generative_keys) - self.max_models, 0)]:
+                del self._resources[stale]
+        return model
+
+    def stats(self) -> Dict[str, Dict[str, float]]:
+        """Returns build count, total build seconds and reuse count per resource type"""
+
+        with self._lock:
+            return {name: dict(values) for name, values in self._stats.items()}
+
+    def _get(self, key: Hashable, name: str, build: Callable[[], Any]):
+        with self._lock:
+            stats = self._stats.setdefault(name, {"builds": 0, "build_seconds": 0.0, "reuses": 0})
+            if key in self._resources:
+                self._resources.move_to_end(key)
+                stats["reuses"] += 1
+                return self._resources[key]
+
+            start = time.perf_counter()
+            resource = build()
+            elapsed = time.perf_counter() - start
+            stats["builds"] += 1
+            stats["build_seconds"] += elapsed
+            logger.info(f"Built {name} in {elapsed * 1000:.0f} ms")
+            self._resources[key] = resource
+            return resource
+
+def _tools_key(tools: Optional[List[Any]]) -> Hashable:
+    """Returns a stable key for a list of tools, which are rebuilt on every Streamlit rerun"""
+
+    if not tools:
+        return ()
+    return tuple(repr(tool.to_dict()) if hasattr(tool, "to_dict") else repr(tool) for tool in tools)
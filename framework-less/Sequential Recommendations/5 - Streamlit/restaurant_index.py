@@ -0,0 +1,255 @@
+# Top-k vector search over restaurant embeddings
+import json
+import logging
+import os
+import threading
+from abc import ABC, abstractmethod
+from typing import Any, Dict, Iterable, List, Optional, Sequence, Set, Tuple
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+# A scored search result: (dot product, restaurant document fields without the vector)
+Candidate = Tuple[float, Dict[str, Any]]
+
+
+class RestaurantIndex(ABC):
+    """Common interface of the restaurant vector search backends"""
+
+    @abstractmethod
+    def search(self, query_vectors: Sequence[Sequence[float]], k: int = 10) -> List[List[Candidate]]:
+        """Returns the k nearest restaurants by dot product for each query vector, best first"""
+
+    def close(self):
+        """Releases listeners or other resources held by the backend"""
+
+
+class FirestoreRestaurantIndex(RestaurantIndex):
+    """Runs find_nearest against the Firestore vector index, one request per query"""
+
+    def __init__(self, db, collection: str = "restaurants", vector_field: str = "docVector"):
+        self.collection_ref = db.collection(collection)
+        self.vector_field = vector_field
+
+    def search(self, query_vectors, k=10):
+        from google.cloud.firestore_v1.base_vector_query import DistanceMeasure
+        from google.cloud.firestore_v1.vector import Vector
+
+        results = []
+        for query_vector in query_vectors:
+            query = self.collection_ref.find_nearest(
+                vector_field=self.vector_field,
+                query_vector=Vector(list(query_vector)),
+                distance_measure=DistanceMeasure.DOT_PRODUCT,
+                limit=k,
+                distance_result_field="vector_distance")
+
+            candidates = []
+            for doc in query.get():
+                fields = doc.to_dict()
+                fields.pop(self.vector_field, None)
+                score = float(fields.pop("vector_distance", 0.0))
+                fields["id"] = doc.id
+                candidates.append((score, fields))
+            results.append(candidates)
+        return results
+
+
+class LocalRestaurantIndex(RestaurantIndex):
+    """Holds all restaurant vectors in a contiguous float32 matrix and searches it in process.
+
+    A Firestore listener applies added, modified and removed restaurants incrementally,
+    so the index stays current without re-reading the collection. When cache_path is set
+    the matrix is also saved to disk after each update and memory-mapped on the next
+    start, so queries are served before the first snapshot arrives.
+    """
+
+    def __init__(self, db=None, collection: str = "restaurants", vector_field: str = "docVector",
+                 cache_path: Optional[str] = None, initial_snapshot_timeout: float = 10.0):
+        self.vector_field = vector_field
+        self.cache_path = cache_path
+        self._lock = threading.Lock()
+        self._watch = None
+
+        # An immutable (matrix, ids, fields) tuple, replaced in a single assignment on every update;
+        # readers take one reference to it so they never pair rows from different versions
+        self._snapshot: Tuple[np.ndarray, List[str], List[Dict[str, Any]]] = (np.zeros((0, 0), dtype=np.float32), [], [])
+
+        if cache_path and os.path.exists(cache_path):
+            self._load(cache_path)
+
+        if db is not None:
+            self._listen(db.collection(collection), initial_snapshot_timeout)
+
+    def __len__(self):
+        return len(self._snapshot[1])
+
+    @property
+    def dimensions(self) -> int:
+        """Length of the stored vectors, or 0 while the index is empty"""
+
+        matrix, ids, _ = self._snapshot
+        return matrix.shape[1] if ids else 0
+
+    def search(self, query_vectors, k=10):
+        matrix, ids, fields = self._snapshot
+        if not ids:
+            return [[] for _ in query_vectors]
+
+        queries = np.asarray(query_vectors, dtype=np.float32)
+        scores = queries @ matrix.T
+        k = min(k, len(ids))
+
+        # Partial sort per row, then order only the k winners
+        top = np.argpartition(-scores, k - 1, axis=1)[:, :k]
+        results = []
+        for row, indices in zip(scores, top):
+            ordered = indices[np.argsort(-row[indices])]
+            results.append([(float(row[i]), dict(fields[i], id=ids[i])) for i in ordered])
+        return results
+
+    def apply(self, upserts: Dict[str, Dict[str, Any]], removals: Iterable[str] = ()):
+        """Adds or replaces restaurants by document id and drops removed ones"""
+
+        with self._lock:
+            current_matrix, current_ids, current_fields = self._snapshot
+            positions = {doc_id: row for row, doc_id in enumerate(current_ids)}
+            ids = list(current_ids)
+            fields = list(current_fields)
+            rows = [current_matrix[row] for row in range(len(ids))]
+
+            for doc_id in removals:
+                row = positions.pop(doc_id, None)
+                if row is not None:
+                    ids[row] = None
+
+            for doc_id, data in upserts.items():
+                data = dict(data)
+                vector = data.pop(self.vector_field, None)
+                if vector is None:
+                    logger.warning(f"Restaurant {doc_id} has no {self.vector_field}; skipping.")
+                    continue
+                vector = np.asarray(list(vector), dtype=np.float32)
+                if doc_id in positions:
+                    row = positions[doc_id]
+                    rows[row], fields[row] = vector, data
+                else:
+                    positions[doc_id] = len(ids)
+                    ids.append(doc_id)
+                    rows.append(vector)
+                    fields.append(data)
+
+            keep = [row for row, doc_id in enumerate(ids) if doc_id is not None]
+            matrix = np.ascontiguousarray(np.stack([rows[row] for row in keep])) if keep else np.zeros((0, 0), dtype=np.float32)
+            self._snapshot = (matrix, [ids[row] for row in keep], [fields[row] for row in keep])
+
+            # Saved under the lock so concurrent updates cannot interleave their cache files
+            if self.cache_path:
+                self._save(self.cache_path)
+
+    def close(self):
+        if self._watch is not None:
+            self._watch.unsubscribe()
+            self._watch = None
+
+    def _listen(self, collection_ref, initial_snapshot_timeout: float):
+        first_snapshot = threading.Event()
+
+        def on_snapshot(docs, changes, read_time):
+            upserts, removals = {}, []
+            for change in changes:
+                if change.type.name == "REMOVED":
+                    removals.append(change.document.id)
+                else:
+                    upserts[change.document.id] = change.document.to_dict()
+            if not first_snapshot.is_set():
+                # The first snapshot is the whole collection; drop anything only known from the disk cache
+                current = {doc.id for doc in docs}
+                removals.extend(doc_id for doc_id in self._snapshot[1] if doc_id not in current)
+            self.apply(upserts, removals)
+            first_snapshot.set()
+
+        self._watch = collection_ref.on_snapshot(on_snapshot)
+        if not first_snapshot.wait(initial_snapshot_timeout) and not len(self):
+            logger.warning("No initial snapshot for the restaurant index; reading it directly.")
+            self.apply({doc.id: doc.to_dict() for doc in collection_ref.stream()})
+
+    def _save(self, path: str):
+        matrix, ids, fields = self._snapshot
+        tmp_path = f"{path}.tmp.npy"
+        np.save(tmp_path, matrix)
+        os.replace(tmp_path, path)
+        with open(f"{path}.json.tmp", "w") as f:
+            json.dump({"ids": ids, "fields": fields}, f, default=str)
+        os.replace(f"{path}.json.tmp", f"{path}.json")
+
+    def _load(self, path: str):
+        try:
+            with open(f"{path}.json") as f:
+                meta = json.load(f)
+            matrix = np.load(path, mmap_mode="r")
+        except (OSError, ValueError) as e:
+            logger.warning(f"Ignoring unreadable restaurant index cache {path}: {e}")
+            return
+        if matrix.shape[0] != len(meta["ids"]):
+            logger.warning(f"Ignoring restaurant index cache {path}: row count does not match its metadata.")
+            return
+        self._snapshot = (matrix, meta["ids"], meta["fields"])
+        logger.info(f"Loaded {len(meta['ids'])} restaurants from {path}")
+
+
+def create_restaurant_index(backend: str, db, cache_path: Optional[str] = None) -> RestaurantIndex:
+    """Builds the configured restaurant index backend: 'local' or 'firestore'"""
+
+    if backend == "local":
+        return LocalRestaurantIndex(db, cache_path=cache_path)
+    if backend == "firestore":
+        return FirestoreRestaurantIndex(db)
+    raise ValueError(f"Unknown restaurant index backend: {backend}")
+
+
+# --- Profile-aware re-ranking ---
+
+def profile_preferences(user_profile: Dict[str, Any], customer: str) -> Tuple[Set[str], Set[str]]:
+    """Returns the customer's dietary restrictions and the names of restaurants they already ordered from"""
+
+    customer_fields = user_profile.get(customer, {})
+    diet_restricts = {str(diet).strip().lower() for diet in customer_fields.get("dietRestricts") or []}
+
+    # Orders are nested as {order_id: {order_id: {order fields}, 'items': {...}}}
+    ordered = set()
+    for order_id, order in (user_profile.get("orders") or {}).items():
+        name = order.get(order_id, {}).get("restaurantName")
+        if name:
+            ordered.add(_normalize(name))
+
+    return diet_restricts, ordered
+
+def rerank(candidates: List[Candidate], diet_restricts: Set[str] = frozenset(), ordered: Set[str] = frozenset(),
+           repeat_penalty: float = 0.05) -> List[Candidate]:
+    """Filters candidates by dietary restrictions and demotes restaurants the customer already ordered from.
+
+    Restaurants that list 'dietOptions' must cover every restriction; restaurants without the
+    field are kept, since nothing is known about them. If the filter leaves nothing, the
+    unfiltered candidates are ranked instead so there is always a top pick.
+    """
+
+    def allowed(fields):
+        options = fields.get("dietOptions")
+        if not diet_restricts or options is None:
+            return True
+        return diet_restricts <= {str(option).strip().lower() for option in options}
+
+    filtered = [candidate for candidate in candidates if allowed(candidate[1])] or list(candidates)
+
+    def adjusted(candidate):
+        score, fields = candidate
+        if _normalize(fields.get("restaurantName", "")) in ordered:
+            score -= repeat_penalty
+        return score
+
+    return sorted(filtered, key=adjusted, reverse=True)
+
+def _normalize(name: str) -> str:
+    return " ".join(name.replace("'", "").lower().split())
@@ -0,0 +1,95 @@
+# Precomputed Google Maps review highlights stored on restaurant documents
+import datetime
+import logging
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from typing import Any, Callable, Dict, Optional
+
+logger = logging.getLogger(__name__)
+
+HIGHLIGHTS_FIELD = "reviewHighlights"
+UPDATED_AT_FIELD = "reviewHighlightsUpdatedAt"
+
+
+def restaurant_query(restaurant: Dict[str, Any]) -> str:
+    """Returns the name and address search text the reviews agent is queried with"""
+
+    return restaurant['restaurantName'].replace("'", "") + ' ' + restaurant['restaurantAddress'].replace("'", "")
+
+def stored_highlights(restaurant: Dict[str, Any], max_age: datetime.timedelta) -> Optional[str]:
+    """Returns a restaurant's stored review highlights, or None if they are missing or older than max_age"""
+
+    highlights = restaurant.get(HIGHLIGHTS_FIELD)
+    updated_at = _as_datetime(restaurant.get(UPDATED_AT_FIELD))
+    if not highlights or updated_at is None:
+        return None
+    if datetime.datetime.now(datetime.timezone.utc) - updated_at > max_age:
+        return None
+    return highlights
+
+def precompute_highlights(db, summarize: Callable[[str, str], str], max_age: datetime.timedelta,
+                          max_workers: int = 4, retries: int = 3, force: bool = False,
+                          collection: str = "restaurants") -> Dict[str, int]:
+    """Runs the reviews agent for every restaurant without fresh highlights and stores the results.
+
+    summarize(query, session_id) returns the highlights text. Each attempt uses a fresh
+    agent session id, so earlier answers never feed into new highlights. Restaurants run
+    concurrently up to max_workers, each retried with exponential backoff. Results are
+    written as they finish, so an interrupted run resumes where it stopped: fresh
+    restaurants are skipped unless force is set.
+    """
+
+    from google.cloud.firestore import SERVER_TIMESTAMP
+
+    todo = []
+    counts = {"total": 0, "skipped": 0, "updated": 0, "failed": 0}
+    for doc in db.collection(collection).stream():
+        counts["total"] += 1
+        restaurant = doc.to_dict()
+        if not force and stored_highlights(restaurant, max_age) is not None:
+            counts["skipped"] += 1
+            continue
+        todo.append((doc.reference, restaurant))
+
+    run_id = uuid.uuid4().hex[:8]
+
+    def run(doc_ref, restaurant):
+        for attempt in range(retries + 1):
+            try:
+                return summarize(restaurant_query(restaurant), f"highlights-{doc_ref.id}-{run_id}-{attempt}")
+            except Exception as e:
+                if attempt == retries:
+                    raise
+                delay = 2 ** attempt
+                logger.warning(f"Highlights for {doc_ref.id} failed ({e}); retrying in {delay}s")
+                time.sleep(delay)
+
+    with ThreadPoolExecutor(max_workers=max_workers) as pool:
+        futures = {pool.submit(run, doc_ref, restaurant): doc_ref for doc_ref, restaurant in todo}
+        for future in as_completed(futures):
+            doc_ref = futures[future]
+            try:
+                highlights = future.result()
+            except Exception as e:
+                counts["failed"] += 1
+                logger.error(f"Giving up on highlights for {doc_ref.id}: {e}")
+                continue
+            doc_ref.set({HIGHLIGHTS_FIELD: highlights, UPDATED_AT_FIELD: SERVER_TIMESTAMP}, merge=True)
+            counts["updated"] += 1
+            logger.info(f"Stored highlights for {doc_ref.id}")
+
+    return counts
+
+def _as_datetime(value) -> Optional[datetime.datetime]:
+    # Timestamps come back as datetimes from Firestore and as strings from the local index's disk cache
+    if value is None:
+        return None
+    if isinstance(value, str):
+        try:
+            value = datetime.datetime.fromisoformat(value)
+        except ValueError:
+            return None
+    if not isinstance(value, datetime.datetime):
+        return None
+    return value if value.tzinfo else value.replace(tzinfo=datetime.timezone.utc)
@@ -0,0 +1,217 @@
+# Tiered routing of user messages: local exemplar classifier first, LLM router as fallback
+import logging
+import random
+import threading
+import time
+from dataclasses import dataclass
+from typing import Callable, Dict, List, Optional, Tuple
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+RECOMMENDATION = "recommendation"
+ASSISTANCE = "assistance"
+
+# Labelled examples of user messages; the LLM router answers "recommendation" for the first group
+ROUTE_EXEMPLARS = {
+    RECOMMENDATION: [
+        "I really want sushi tonight",
+        "I want a burger",
+        "Get me some pizza",
+        "I'm craving spicy ramen",
+        "Tacos please",
+        "I'd like Chinese food for dinner",
+        "Let's do Italian, pasta sounds great",
+        "I want a Big Mac from McDonald's",
+        "Something like my usual order",
+        "I feel like Thai food, pad thai with extra spice",
+        "Find me a good steakhouse",
+    ],
+    ASSISTANCE: [
+        "I don't know what I want",
+        "What do you recommend?",
+        "I'm not sure, can you help me decide?",
+        "What's good around here?",
+        "Hmm, maybe something healthy?",
+        "What are my options?",
+        "I'm hungry but undecided",
+        "Can you suggest a few places?",
+        "What did I order last time?",
+        "Do you have anything vegetarian?",
+        "Hi",
+        "Surprise me with some ideas",
+    ],
+}
+
+
+@dataclass
+class RouteDecision:
+    """Result of routing one user message"""
+
+    route: str
+    text: str
+    source: str
+    confidence: Optional[float] = None
+
+
+class ExemplarClassifier:
+    """Labels a text by cosine similarity to embedded, labelled exemplars.
+
+    A label is only returned when the best match clears min_similarity and beats the
+    best exemplar of any other label by margin; otherwise the classifier abstains.
+    """
+
+    def __init__(self, embed: Callable[[List[str]], List[List[float]]], exemplars: Dict[str, List[str]] = ROUTE_EXEMPLARS,
+                 min_similarity: float = 0.7, margin: float = 0.05):
+        self.embed = embed
+        self.exemplars = exemplars
+        self.min_similarity = min_similarity
+        self.margin = margin
+        self._matrix = None
+        self._labels: List[str] = []
+        self._lock = threading.Lock()
+
+    def classify(self, text: str) -> Tuple[Optional[str], float]:
+        """Returns (label, similarity), with label None when the classifier is not confident"""
+
+        matrix, labels = self._exemplar_matrix()
+        query = _normalize(np.asarray(self.embed([text]), dtype=np.float32))[0]
+        similarities = matrix @ query
+
+        best = {}
+        for label, similarity in zip(labels, similarities):
+            best[label] = max(best.get(label, -1.0), float(similarity))
+        ranked = sorted(best.items(), key=lambda item: item[1], reverse=True)
+
+        label, similarity = ranked[0]
+        runner_up = ranked[1][1] if len(ranked) > 1 else -1.0
+        if similarity < self.min_similarity or similarity - runner_up < self.margin:
+            return None, similarity
+        return label, similarity
+
+    def _exemplar_matrix(self):
+        with self._lock:
+            if self._matrix is None:
+                texts = [text for texts in self.exemplars.values() for text in texts]
+                self._labels = [label for label, texts in self.exemplars.items() for _ in texts]
+                self._matrix = _normalize(np.asarray(self.embed(texts), dtype=np.float32))
+            return self._matrix, self._labels
+
+
+class TieredRouter:
+    """Routes user messages with a local classifier and falls back to the LLM router.
+
+    The LLM router's reply doubles as the assistant's answer when the user needs more
+    help, so only confident "recommendation" decisions can skip it. The classifier sees
+    only the latest message, so short replies to the assistant's answers (up to
+    follow_up_words words, e.g. "yes, go ahead") go straight to the LLM router, which
+    sees the whole conversation. The opening greeting does not count, so short first
+    requests such as "Tacos please" are still classified locally. A sample of local decisions is also checked against the LLM router in
+    the background to measure agreement.
+    """
+
+    def __init__(self, classifier: ExemplarClassifier, llm_route: Callable[[List[Dict]], str],
+                 executor=None, shadow_rate: float = 0.1, follow_up_words: int = 4):
+        self.classifier = classifier
+        self.llm_route = llm_route
+        self.executor = executor
+        self.shadow_rate = shadow_rate
+        self.follow_up_words = follow_up_words
+        self._lock = threading.Lock()
+        self._stats = {"local": 0, "llm": 0, "abstained": 0, "follow_ups": 0, "compared": 0, "agreed": 0}
+        self._llm_calls = 0
+        self._llm_seconds = 0.0
+        # Classification time on decisions made locally, and on those that still needed the LLM
+        self._local_seconds = 0.0
+        self._fallback_seconds = 0.0
+
+    def route(self, prompt: str, messages: List[Dict]) -> RouteDecision:
+        """Routes the latest user prompt given the conversation so far"""
+
+        if self._is_follow_up(prompt, messages):
+            text = self._timed_llm_route(messages)
+            with self._lock:
+                self._stats["llm"] += 1
+                self._stats["follow_ups"] += 1
+            return RouteDecision(RECOMMENDATION if text == RECOMMENDATION else ASSISTANCE, text, "llm")
+
+        start = time.perf_counter()
+        try:
+            label, confidence = self.classifier.classify(prompt)
+        except Exception as e:
+            logger.warning(f"Local router failed; using the LLM router: {e}")
+            label, confidence = None, 0.0
+        local_seconds = time.perf_counter() - start
+
+        if label == RECOMMENDATION:
+            with self._lock:
+                self._stats["local"] += 1
+                self._local_seconds += local_seconds
+            if self.executor is not None and random.random() < self.shadow_rate:
+                self.executor.submit(self._shadow, list(messages), label)
+            return RouteDecision(RECOMMENDATION, RECOMMENDATION, "local", confidence)
+
+        text = self._timed_llm_route(messages)
+        route = RECOMMENDATION if text == RECOMMENDATION else ASSISTANCE
+        with self._lock:
+            self._stats["llm"] += 1
+            # Classification ran before the LLM call, so it added to this message's latency
+            self._fallback_seconds += local_seconds
+            if label is None:
+                self._stats["abstained"] += 1
+            else:
+                # The local tier was confident but could not answer on its own; compare for free
+                self._record_agreement(label, route)
+        return RouteDecision(route, text, "llm", confidence)
+
+    def stats(self) -> Dict[str, float]:
+        """Returns decision counts, agreement rate with the LLM router, and latency saved and added"""
+
+        with self._lock:
+            stats = dict(self._stats)
+            llm_average = self._llm_seconds / self._llm_calls if self._llm_calls else 0.0
+            local_seconds = self._local_seconds
+            fallback_seconds = self._fallback_seconds
+        stats["agreement_rate"] = round(stats["agreed"] / stats["compared"], 3) if stats["compared"] else None
+        stats["llm_latency_ms"] = round(llm_average * 1000)
+        # Each local decision saves one LLM round trip; classifying every message costs time either way
+        stats["fallback_added_ms"] = round(fallback_seconds * 1000)
+        stats["latency_saved_ms"] = round((llm_average * stats["local"] - local_seconds - fallback_seconds) * 1000)
+        return stats
+
+    def _is_follow_up(self, prompt: str, messages: List[Dict]) -> bool:
+        # A short reply only makes sense in the context of the assistant's previous message;
+        # every chat opens with a greeting, so only answers to the user's own messages count
+        first_user = next((i for i, message in enumerate(messages) if message.get("role") == "user"), len(messages))
+        replied = any(message.get("role") == "assistant" for message in messages[first_user + 1:])
+        return replied and len(prompt.split()) <= self.follow_up_words
+
+    def _timed_llm_route(self, messages) -> str:
+        start = time.perf_counter()
+        text = self.llm_route(messages)
+        with self._lock:
+            self._llm_calls += 1
+            self._llm_seconds += time.perf_counter() - start
+        return text
+
+    def _shadow(self, messages, label):
+        try:
+            text = self._timed_llm_route(messages)
+        except Exception as e:
+            logger.warning(f"Shadow LLM routing failed: {e}")
+            return
+        route = RECOMMENDATION if text == RECOMMENDATION else ASSISTANCE
+        with self._lock:
+            self._record_agreement(label, route)
+        if route != label:
+            logger.info(f"Local router chose {label}, LLM router chose {route}")
+
+    def _record_agreement(self, label, route):
+        self._stats["compared"] += 1
+        self._stats["agreed"] += int(label == route)
+
+
+def _normalize(vectors: np.ndarray) -> np.ndarray:
+    norms = np.linalg.norm(vectors, axis=1, keepdims=True)
+    return vectors / np.maximum(norms, 1e-12)
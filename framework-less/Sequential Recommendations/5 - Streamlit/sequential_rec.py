@@ -3,24 +3,32 @@
 import streamlit as st
 
 # Google Cloud
-from google.cloud import storage
-from google.cloud import firestore
 from google.cloud.firestore import SERVER_TIMESTAMP
-from google.cloud.firestore_v1.vector import Vector
-from google.cloud.firestore_v1.base_vector_query import DistanceMeasure
-import vertexai
-from vertexai.generative_models import GenerativeModel, Tool
-from vertexai.preview import reasoning_engines
+from vertexai.generative_models import Tool
 import vertexai.preview.generative_models as generative_models
-from vertexai.language_models import TextEmbeddingInput, TextEmbeddingModel
+from vertexai.language_models import TextEmbeddingInput
 
 
 # Additional
 from typing import List, Optional
-import base64
+from concurrent.futures import ThreadPoolExecutor
+import atexit
+import datetime
+import os
 import uuid
-import re
-from bs4 import BeautifulSoup
+
+# Local modules
+from chat_persister import ChatPersister, plain_text
+from embedding_cache import CachedEmbedder, EmbeddingBatcher, EmbeddingStore
+from image_cache import ImageCache
+from local_firestore import LocalFirestore
+from profile_loader import load_nested_document
+from restaurant_index import RestaurantIndex, create_restaurant_index, profile_preferences, rerank
+from resources import ResourceRegistry
+from review_highlights import restaurant_query, stored_highlights
+from router import ASSISTANCE, ExemplarClassifier, RouteDecision, TieredRouter
+from snapshot_cache import SnapshotCache
+from step_runner import StepRunner, StepTimeout
 
 # Set configuration values
 PROJECT_ID = "andrewcooley-test-project" 
@@ -28,6 +36,9 @@ LOCATION = "us-central1"
 
 FIRESTORE_DB = "test-db"
 
+# Set to a Firestore export folder, e.g. "../3 - Firestore/Firestore collections", to run against an in-process copy of it
+FIRESTORE_EXPORT_DIR = os.environ.get("FIRESTORE_EXPORT_DIR")
+
 MODEL_ID = "gemini-1.5-flash-001"
 GENERATION_CONFIG = {
             "temperature": 0,
@@ -44,15 +55,107 @@ SAFETY_SETTINGS = {
 
 REMOTE_AGENT = "projects/619758184732/locations/us-central1/reasoningEngines/6556783660614287360"
 
-# Instantiate Firestore and Vertex AI SDK clients
-db = firestore.Client(project=PROJECT_ID, database=FIRESTORE_DB)
+# Per-step timeouts in seconds for the recommendation path
+STEP_TIMEOUTS = {
+    "router": 30,
+    "query_writing": 30,
+    "embedding": 10,
+    "vector_search": 10,
+    "reviews": 60,
+    "image": 15,
+}
+STEP_WORKERS = 16
+ROUTER_FALLBACK_REPLY = "Sorry, I'm having trouble right now. Could you tell me a bit more about what you're in the mood for?"
+
+# Resized Imagen art is cached on disk and referenced from chat messages by its imageUri
+IMAGE_CACHE_DIR = ".image_cache"
+IMAGE_CACHE_MAX_BYTES = 256 * 1024 * 1024
+IMAGE_WIDTH = 400
+
+# Restaurant vector search: 'local' keeps an in-process index fed by a Firestore listener, 'firestore' uses find_nearest
+VECTOR_INDEX_BACKEND = "local"
+VECTOR_INDEX_CACHE_PATH = ".restaurant_index.npy"
+VECTOR_SEARCH_CANDIDATES = 10
+
+# Query embeddings are cached on disk and concurrent requests share get_embeddings calls
+EMBEDDING_CACHE_PATH = ".embedding_cache.db"
+EMBEDDING_CACHE_DTYPE = "float16"
+EMBEDDING_BATCH_SIZE = 250
+EMBEDDING_BATCH_WAIT = 0.01
+
+# Routing: confident local decisions skip the LLM router; a sample is re-checked against it to measure agreement
+ROUTER_MIN_SIMILARITY = 0.7
+ROUTER_MARGIN = 0.05
+ROUTER_SHADOW_RATE = 0.1
+
+# Chat messages are appended to their session document in the background, batched by time and size
+PERSIST_FLUSH_INTERVAL = 2.0
+PERSIST_MAX_PENDING = 50
+
+# Review highlights precomputed by precompute_highlights.py are served when newer than this
+HIGHLIGHTS_MAX_AGE = datetime.timedelta(days=7)
+
+TOP_PICK_HEADER = "<h5>My top pick for you...</h5>"
+IMAGEN_CAPTION = """<p><img src="https://pbs.twimg.com/profile_images/1695024885070737408/-M-HSH5P_400x400.jpg" alt="Google Deepmind" width="20" height="20">
+            <small> AI-generated by Google Imagen</small></p>"""
+
+# Build models and GCP clients once per process and share them across sessions and reruns
+@st.cache_resource
+def get_registry() -> ResourceRegistry:
+    """Return the process-wide registry of models and clients"""
+
+    return ResourceRegistry(PROJECT_ID, LOCATION, FIRESTORE_DB, REMOTE_AGENT, MODEL_ID)
+
+registry = get_registry()
+
+# Load the export once per process when running offline
+@st.cache_resource
+def get_local_firestore(export_dir: str) -> LocalFirestore:
+    """Return the in-process Firestore stand-in loaded from an export"""
+
+    return LocalFirestore.from_export(export_dir)
+
+# Shared Firestore client
+db = get_local_firestore(FIRESTORE_EXPORT_DIR) if FIRESTORE_EXPORT_DIR else registry.firestore()
+
+# Keep prompts and the customer list in memory, updated live by Firestore listeners
+@st.cache_resource
+def get_snapshot_cache() -> SnapshotCache:
+    """Return the process-wide snapshot cache of small, rarely changing collections"""
+
+    cache = SnapshotCache()
+    cache.watch(db.collection('system_instructions'))
+    cache.watch(db.collection('customers'))
+    return cache
+
+snapshot_cache = get_snapshot_cache()
+
+# Share the restaurant vector index across sessions
+@st.cache_resource
+def get_restaurant_index() -> RestaurantIndex:
+    """Return the process-wide restaurant vector index"""
+
+    return create_restaurant_index(VECTOR_INDEX_BACKEND, db, VECTOR_INDEX_CACHE_PATH)
+
+restaurant_index = get_restaurant_index()
+
+# Run independent steps of a request concurrently on a pool shared by all sessions
+@st.cache_resource
+def get_step_executor() -> ThreadPoolExecutor:
+    """Return the process-wide thread pool for request steps"""
 
-vertexai.init(project=PROJECT_ID, location=LOCATION)
+    return ThreadPoolExecutor(max_workers=STEP_WORKERS, thread_name_prefix="step")
 
-# Get Reasoning Engine agent
-remote_agent = reasoning_engines.ReasoningEngine(
-    REMOTE_AGENT
-)
+# Persist chat messages from a background thread shared by all sessions, and flush on shutdown
+@st.cache_resource
+def get_chat_persister() -> ChatPersister:
+    """Return the process-wide write-behind chat persister"""
+
+    persister = ChatPersister(db, flush_interval=PERSIST_FLUSH_INTERVAL, max_pending=PERSIST_MAX_PENDING)
+    atexit.register(persister.close)
+    return persister
+
+chat_persister = get_chat_persister()
 
 # Define functions for orchestration and processes
 def generate_uuid() -> str:
@@ -60,37 +163,59 @@ def generate_uuid() -> str:
 
     return str(uuid.uuid4())
 
-def display_image_from_gcs(bucket_name: str, blob_name: str) -> str:
-    """Fetches and displays an image from GCS using a base64 encoded data URL"""
+def download_image_from_gcs(image_uri: str) -> bytes:
+    """Downloads an image from GCS given a bucket/blob URI"""
 
-    storage_client = storage.Client()
+    bucket_name, blob_name = image_uri.split("/", 1)
+    storage_client = registry.storage()
     bucket = storage_client.bucket(bucket_name)
     blob = bucket.blob(blob_name)
-    image_bytes = blob.download_as_bytes()
-    encoded_image = base64.b64encode(image_bytes).decode('utf-8')
+    return blob.download_as_bytes()
 
-    # Return the image in Markdown format for seamless integration with the chat message
-    return f'<img src="{f"data:image/png;base64,{encoded_image}"}" width="400">'
+# Share the on-disk image cache across sessions
+@st.cache_resource
+def get_image_cache() -> ImageCache:
+    """Return the process-wide cache of resized images"""
 
-def get_nested_subcollections(doc_ref):
-    """Recursively fetches all documents from a document and its nested subcollections."""
+    return ImageCache(IMAGE_CACHE_DIR, download_image_from_gcs, width=IMAGE_WIDTH, max_bytes=IMAGE_CACHE_MAX_BYTES)
 
-    doc = doc_ref.get()
-    data = {}
-    if doc.exists:
-        data[doc_ref.id] = doc.to_dict()
+image_cache = get_image_cache()
+
+def display_image(image_uri: str):
+    """Displays a cached, resized image with its Imagen caption"""
+
+    try:
+        st.image(str(image_cache.thumbnail(image_uri)), width=IMAGE_WIDTH)
+    except Exception as e:
+        st.caption(f"Image unavailable: {e}")
+        return
+    st.markdown(IMAGEN_CAPTION, unsafe_allow_html=True)
+
+def add_message(session_ref, role: str, content: str, **fields):
+    """Add a message to the chat and queue its plain-text form for Firestore"""
+
+    messages = st.session_state.setdefault("messages", [])
+    index = len(messages)
+    messages.append({"role": role, "content": content, **fields})
+
+    # Strip HTML once, when the message is created, so saving never re-parses the conversation;
+    # the index keeps repeated messages distinct under ArrayUnion
+    chat_persister.append(session_ref, {"role": role, "content": plain_text(content), "index": index, **fields})
 
-        for subcollection in doc_ref.collections():
-            data[subcollection.id] = {}
-            for doc in subcollection.stream():
-                nested_data = get_nested_subcollections(doc.reference)
-                data[subcollection.id][doc.id] = nested_data
+def render_message(message):
+    """Render a chat message, including its referenced image if it has one"""
 
-    return data
+    if "image_uri" in message:
+        st.markdown(TOP_PICK_HEADER, unsafe_allow_html=True)
+        display_image(message["image_uri"])
+    st.markdown(message["content"], unsafe_allow_html=True)
 
 def get_field_values(collection_ref, field_name):
     """Return a list of field values for all documents in a collection"""
 
+    if snapshot_cache.is_watching(collection_ref):
+        return [doc[field_name] for doc in snapshot_cache.documents(collection_ref).values()]
+
     docs = collection_ref.stream()
     list = [doc.to_dict()[field_name] for doc in docs]
 
@@ -99,6 +224,9 @@ def get_field_values(collection_ref, field_name):
 def get_field_value(doc_ref, field_name):
     """Return a field value for a field name in a document"""
 
+    if snapshot_cache.is_watching(doc_ref.parent):
+        return snapshot_cache.document(doc_ref)[field_name]
+
     doc = doc_ref.get()
     value = doc.to_dict()[field_name]
 
@@ -107,16 +235,7 @@ def get_field_value(doc_ref, field_name):
 def generate_chat(tools=None, system_instruction="""""", text=""""""):
     """Generate a chat response given system instructions, user input, and tool output"""
 
-    if tools:
-
-        model = GenerativeModel(MODEL_ID,
-        tools=tools,
-        system_instruction=[system_instruction])
-
-    else:
-
-        model = GenerativeModel(MODEL_ID,
-        system_instruction=[system_instruction])
+    model = registry.generative_model(system_instruction, tools)
 
     chat = model.start_chat()
 
@@ -127,6 +246,31 @@ def generate_chat(tools=None, system_instruction="""""", text=""""""):
 
     return response
 
+def get_embeddings(
+    texts: List[str],
+    task: str,
+    model_name: str,
+    dimensionality: Optional[int],
+) -> List[List[float]]:
+    """Embeds a batch of texts with the embedding model in one request"""
+
+    model = registry.embedding_model(model_name)
+    inputs = [TextEmbeddingInput(text, task) for text in texts]
+    kwargs = dict(output_dimensionality=dimensionality) if dimensionality else {}
+    embeddings = model.get_embeddings(inputs, **kwargs)
+    return [embedding.values for embedding in embeddings]
+
+# Share the embedding cache and batcher across sessions
+@st.cache_resource
+def get_embedder() -> CachedEmbedder:
+    """Return the process-wide cached, batching embedder"""
+
+    store = EmbeddingStore(EMBEDDING_CACHE_PATH, dtype=EMBEDDING_CACHE_DTYPE)
+    batcher = EmbeddingBatcher(get_embeddings, max_batch=EMBEDDING_BATCH_SIZE, max_wait=EMBEDDING_BATCH_WAIT)
+    return CachedEmbedder(store, batcher)
+
+embedder = get_embedder()
+
 def embed_query(
     texts: List[str],
     task: str = "RETRIEVAL_QUERY",
@@ -135,32 +279,39 @@ def embed_query(
 ) -> List[List[float]]:
     """Embeds texts into vectors with defined parameters"""
 
-    model = TextEmbeddingModel.from_pretrained(model_name)
-    inputs = [TextEmbeddingInput(text, task) for text in texts]
-    kwargs = dict(output_dimensionality=dimensionality) if dimensionality else {}
-    embeddings = model.get_embeddings(inputs, **kwargs)
-    return [embedding.values for embedding in embeddings]
+    return embedder.embed(texts, task, model_name, dimensionality)
+
+def query_index(query_vector, user_profile, customer):
+    """Finds the nearest restaurants to a query vector and returns the best match for the customer's profile"""
+
+    candidates = restaurant_index.search([query_vector], k=VECTOR_SEARCH_CANDIDATES)[0]
+    ranked = rerank(candidates, *profile_preferences(user_profile, customer))
+
+    return ranked[0][1] if ranked else None
 
-def query_index(query_vector):
-    """Queries a vector index deployed over a Firestore collection with documents that contain an embeddings field"""
+def route_with_llm(messages) -> str:
+    """Ask the Gemini router whether the user is ready for a recommendation, or for its follow-up questions"""
 
-    collection = db.collection("restaurants")
+    system_instruction = get_field_value(db.collection('system_instructions').document('router'), 'prompt')
+    return generate_chat(None, system_instruction, messages).text.strip()
 
-    query = collection.find_nearest(
-    vector_field="docVector",
-    query_vector=Vector(query_vector),
-    distance_measure=DistanceMeasure.DOT_PRODUCT,
-    limit=1)
+# Share the router, including its embedded exemplars and statistics, across sessions
+@st.cache_resource
+def get_router() -> TieredRouter:
+    """Return the process-wide tiered router"""
 
-    for d in query.get():
-        result = d.to_dict()
+    classifier = ExemplarClassifier(
+        lambda texts: embed_query(texts, task="SEMANTIC_SIMILARITY"),
+        min_similarity=ROUTER_MIN_SIMILARITY,
+        margin=ROUTER_MARGIN)
+    return TieredRouter(classifier, route_with_llm, executor=get_step_executor(), shadow_rate=ROUTER_SHADOW_RATE)
 
-    return result
+router = get_router()
 
 def query_agent(prompt, session):
     """Query a Reasoning Engine agent with user input prompt and session ID"""
 
-    response = remote_agent.query(
+    response = registry.agent().query(
         input=f"{prompt}",
         config={"configurable": {"session_id": session}},
     )
@@ -185,10 +336,23 @@ with st.sidebar:
 
     # Set user_profile variable to supply downstream context
     doc_ref = db.collection('customers').document(customer)
-    user_profile = get_nested_subcollections(doc_ref)
+    user_profile = load_nested_document(db, doc_ref)
 
     # Additional UI elements
-    st.caption("Connected to a Firestore database")
+    st.caption("Using a local copy of a Firestore export" if FIRESTORE_EXPORT_DIR else "Connected to a Firestore database")
+    with st.expander("Diagnostics"):
+        st.json(registry.stats())
+        st.caption("Image cache")
+        st.json(image_cache.stats())
+        st.caption("Embeddings")
+        st.json(embedder.stats())
+        st.caption("Router")
+        st.json(router.stats())
+        st.caption("Chat persistence")
+        st.json(chat_persister.stats())
+        if "step_timings" in st.session_state:
+            st.caption("Last recommendation latency (ms)")
+            st.json(st.session_state.step_timings)
     st.markdown("---")
     st.markdown("""<p><img src="https://uxwing.com/wp-content/themes/uxwing/download/brands-and-social-media/google-gemini-icon.png" alt="Google" width="18" height="18">
         <small> Intelligence by Gemini Flash</small></p>""", unsafe_allow_html=True)
@@ -196,25 +360,9 @@ with st.sidebar:
 
 st.text_area("**Context:**", user_profile, key="initial-existing-user-profile-ta")
 
-# Save chat history to Firestore, clear active chat dialog, and clear session state
+# Clear active chat dialog and session state; messages are already persisted as they are added
 if st.button("Clear chat"):
 
-    if "session_id" in st.session_state:
-        
-        # Get current session ID
-        session_ref = db.collection('customers').document(customer).collection('sessions').document(st.session_state.session_id)
-
-        messages_to_save = st.session_state.messages.copy()
-
-        # Remove encoded image data from HTML before saving to Firestore
-        for message in messages_to_save:
-            if 'content' in message:
-                soup = BeautifulSoup(message['content'], "html.parser")
-                message['content'] = soup.get_text()
-                message['content'] = re.sub(r'\s+', ' ', message['content']).strip()
-
-        session_ref.set({"messages": messages_to_save}, merge=True)
-
     st.session_state.clear()
 
 # Begin new chat with proactive recommendation
@@ -236,9 +384,7 @@ if "messages" not in st.session_state:
         output = generate_chat(None, system_instruction, text)
 
         # Add new assistant message to session state
-        st.session_state.messages = [
-            {"role": "assistant", "content": output.text}
-        ]
+        add_message(session_ref, "assistant", output.text)
 
     else:
 
@@ -266,71 +412,124 @@ if "messages" not in st.session_state:
         <small> Grounded with Google Search</small><hr style="border: 0; border-top: 1px dotted #ccc;"></p>"""
 
         # Add new assistant message to session state
-        st.session_state.messages = [
-            {"role": "assistant", "content": assistant_content}
-        ]
+        add_message(session_ref, "assistant", assistant_content)
 
 # Display current session chat messages on reload
 for message in st.session_state.messages:
     with st.chat_message(message["role"]):
-        st.markdown(message["content"], unsafe_allow_html=True)
+        render_message(message)
 
 # Chat input box
 if prompt := st.chat_input("I really want..."):
 
+    session_ref = db.collection('customers').document(customer).collection('sessions').document(st.session_state.session_id)
+
     # Add new user message to session state
     st.chat_message("user").markdown(prompt)
-    st.session_state.messages.append({"role": "user", "content": prompt})
+    add_message(session_ref, "user", prompt)
 
     # Start new assistant message that is dependent on a routing decision by the chat model
     with st.chat_message("assistant"):
-        
-        system_instruction = get_field_value(db.collection('system_instructions').document('router'), 'prompt')
-        text = st.session_state.messages
-        response = generate_chat(None, system_instruction, text)
-
-        st.session_state.route = response.text.strip()
-
-        # When the chat model determines that the user is ready for the top pick recommendation
-        if st.session_state.route == "recommendation":
 
-            # This is the query-writing step - contained in the response
-            system_instruction = get_field_value(db.collection('system_instructions').document('top_picks_query'), 'prompt')
-            text = ''
-            text += str(st.session_state.messages)
-            text += str(user_profile)
-            response = generate_chat(None, system_instruction, text)
+        runner = StepRunner(get_step_executor(), STEP_TIMEOUTS)
 
-            # This vectorizes the query, does an (a)NN search, and extracts restaurant's name and address for the reviews-summarization agent to use downstream
-            query_vector = embed_query([response.text])[0]
-            doc_vector = query_index(query_vector)
-            top_result = doc_vector['restaurantName'].replace("'", "") + ' ' + doc_vector['restaurantAddress'].replace("'", "")
+        try:
+            decision = runner.run("router", router.route, prompt, st.session_state.messages)
+        except Exception as e:
+            # Keep the conversation going instead of failing the whole turn
+            st.caption(f"Routing unavailable: {e}")
+            decision = RouteDecision(ASSISTANCE, ROUTER_FALLBACK_REPLY, "error")
 
-            # Query Reasoning Engine agent to summarize Google Maps reviews about the matched restaurant
-            reviews = query_agent(top_result, st.session_state.session_id)
+        st.session_state.route = decision.route
+        message_image_uri = None
 
-            # Retrieve Imagen-generated art for the matched restaurant
-            image_uri = doc_vector['imageUri']
-            image_markdown = display_image_from_gcs(image_uri.split("/", 1)[0], image_uri.split("/", 1)[1])
+        # When the chat model determines that the user is ready for the top pick recommendation
+        if st.session_state.route == "recommendation":
 
-            # Instantiate content placeholder and append
-            assistant_content = ""
-            assistant_content += f"<h5>My top pick for you...</h5>"
-            assistant_content += image_markdown
-            assistant_content += f"""<p><img src="https://pbs.twimg.com/profile_images/1695024885070737408/-M-HSH5P_400x400.jpg" alt="Google Deepmind" width="20" height="20">
-            <small> AI-generated by Google Imagen</small></p>"""
-            assistant_content += f"<h3>{doc_vector['restaurantName']}</h3>"
-            assistant_content += f"<p><b>Why we think you'll love it:</b> {reviews['output']}</p>"
-            assistant_content += f"""<p><img src="https://static.vecteezy.com/system/resources/previews/012/871/377/non_2x/google-maps-icon-google-product-illustration-free-png.png" alt="Google Maps" width="14" height="20">
+            try:
+                # This is the query-writing step - contained in the response
+                system_instruction = get_field_value(db.collection('system_instructions').document('top_picks_query'), 'prompt')
+                text = ''
+                text += str(st.session_state.messages)
+                text += str(user_profile)
+                response = runner.run("query_writing", generate_chat, None, system_instruction, text)
+
+                # This vectorizes the query, does an (a)NN search, and extracts restaurant's name and address for the reviews-summarization agent to use downstream
+                query_vector = runner.run("embedding", embed_query, [response.text])[0]
+                doc_vector = runner.run("vector_search", query_index, query_vector, user_profile, customer)
+            except Exception as e:
+                if not isinstance(e, StepTimeout):
+                    st.caption(f"Recommendation unavailable: {e}")
+                doc_vector = None
+
+            if doc_vector is None:
+                assistant_content = "Sorry, I couldn't find a top pick for you right now. Please try again in a moment."
+                st.markdown(assistant_content, unsafe_allow_html=True)
+
+            else:
+                top_result = restaurant_query(doc_vector)
+                image_uri = doc_vector['imageUri']
+
+                # Fetch the Imagen-generated art, and only summarize Google Maps reviews with the Reasoning Engine agent
+                # when the restaurant has no fresh precomputed highlights
+                highlights = stored_highlights(doc_vector, HIGHLIGHTS_MAX_AGE)
+                futures = {runner.submit("image", image_cache.thumbnail, image_uri): "image"}
+                if highlights is None:
+                    futures[runner.submit("reviews", query_agent, top_result, st.session_state.session_id)] = "reviews"
+
+                # Render the name right away and fill in the image and reviews as they arrive
+                name_content = f"<h3>{doc_vector['restaurantName']}</h3>"
+                reviews_caption = f"""<p><img src="https://static.vecteezy.com/system/resources/previews/012/871/377/non_2x/google-maps-icon-google-product-illustration-free-png.png" alt="Google Maps" width="14" height="20">
             <small> Based on Google Maps reviews</small><hr style="border: 0; border-top: 1px dotted #ccc;"></p>"""
 
+                st.markdown(TOP_PICK_HEADER, unsafe_allow_html=True)
+                image_placeholder = st.empty()
+                st.markdown(name_content, unsafe_allow_html=True)
+                reviews_placeholder = st.empty()
+                image_placeholder.caption("Loading image…")
+
+                image_path = None
+                reviews_content = ""
+                if highlights is None:
+                    reviews_placeholder.caption("Summarizing Google Maps reviews…")
+                else:
+                    reviews_content = f"<p><b>Why we think you'll love it:</b> {highlights}</p>" + reviews_caption
+                    reviews_placeholder.markdown(reviews_content, unsafe_allow_html=True)
+                for step, result in runner.completed(futures):
+                    if step == "image":
+                        image_path = result
+                        with image_placeholder.container():
+                            st.image(str(image_path), width=IMAGE_WIDTH)
+                            st.markdown(IMAGEN_CAPTION, unsafe_allow_html=True)
+                    else:
+                        reviews_content = f"<p><b>Why we think you'll love it:</b> {result['output']}</p>" + reviews_caption
+                        reviews_placeholder.markdown(reviews_content, unsafe_allow_html=True)
+
+                # Fall back gracefully for any step that did not finish in time
+                if image_path is None:
+                    image_placeholder.empty()
+                if not reviews_content:
+                    reviews_content = "<p><small>Google Maps reviews are not available right now.</small></p>"
+                    reviews_placeholder.markdown(reviews_content, unsafe_allow_html=True)
+
+                # Instantiate content placeholder and append; the image is referenced by its URI
+                message_image_uri = image_uri
+                assistant_content = ""
+                assistant_content += name_content
+                assistant_content += reviews_content
+
+            st.session_state.step_timings = runner.report()
+
         # When the chat model determines that the user needs more assistance towards a recommendation
         else:
 
             assistant_content = ""
-            assistant_content += response.text
-        
-        st.markdown(assistant_content, unsafe_allow_html=True)
+            assistant_content += decision.text
+
+            st.markdown(assistant_content, unsafe_allow_html=True)
 
     # Add new assistant message to session state
-    st.session_state.messages.append({"role": "assistant", "content": assistant_content})
\ No newline at end of file
+    if message_image_uri:
+        add_message(session_ref, "assistant", assistant_content, image_uri=message_image_uri)
+    else:
+        add_message(session_ref, "assistant", assistant_content)
\ No newline at end of file
@@ -0,0 +1,73 @@
+# Local, live-updating cache of small Firestore collections
+import logging
+import threading
+from typing import Any, Dict, Optional
+
+logger = logging.getLogger(__name__)
+
+
+class SnapshotCache:
+    """Keeps in-memory copies of top-level Firestore collections current with on_snapshot listeners.
+
+    Intended for small, rarely changing collections such as system instructions and the
+    customer list. Reads are served from memory, and edits made in Firestore reach the
+    cache as soon as the listener delivers them, without restarting the app.
+    """
+
+    def __init__(self, initial_snapshot_timeout: float = 10.0):
+        self.initial_snapshot_timeout = initial_snapshot_timeout
+        self._collections: Dict[str, Dict[str, Dict[str, Any]]] = {}
+        self._watches = {}
+        self._lock = threading.Lock()
+
+    def watch(self, collection_ref):
+        """Starts listening to a top-level collection and waits for its first snapshot"""
+
+        collection_id = collection_ref.id
+        if collection_id in self._watches:
+            return
+
+        first_snapshot = threading.Event()
+
+        def on_snapshot(docs, changes, read_time):
+            with self._lock:
+                # Copy on write so readers never see a partially applied snapshot
+                documents = dict(self._collections.get(collection_id, {}))
+                for change in changes:
+                    if change.type.name == "REMOVED":
+                        documents.pop(change.document.id, None)
+                    else:
+                        documents[change.document.id] = change.document.to_dict()
+                self._collections[collection_id] = documents
+            first_snapshot.set()
+
+        self._watches[collection_id] = collection_ref.on_snapshot(on_snapshot)
+        if not first_snapshot.wait(self.initial_snapshot_timeout):
+            # Fall back to a one-off read so the app can start; the listener keeps it current afterwards
+            logger.warning(f"No initial snapshot for {collection_id}; reading it directly.")
+            documents = {doc.id: doc.to_dict() for doc in collection_ref.stream()}
+            with self._lock:
+                self._collections.setdefault(collection_id, documents)
+
+    def is_watching(self, collection_ref) -> bool:
+        """Returns True if a collection reference is a watched top-level collection"""
+
+        return collection_ref.parent is None and collection_ref.id in self._collections
+
+    def documents(self, collection_ref) -> Dict[str, Dict[str, Any]]:
+        """Returns all cached documents of a watched collection, keyed and ordered by document id"""
+
+        documents = self._collections[collection_ref.id]
+        return {doc_id: documents[doc_id] for doc_id in sorted(documents)}
+
+    def document(self, doc_ref) -> Optional[Dict[str, Any]]:
+        """Returns a cached document of a watched collection, or None if it does not exist"""
+
+        return self._collections[doc_ref.parent.id].get(doc_ref.id)
+
+    def close(self):
+        """Stops all listeners"""
+
+        for watch in self._watches.values():
+            watch.unsubscribe()
+        self._watches.clear()
@@ -0,0 +1,91 @@
+# Timed, concurrent execution of pipeline steps
+import logging
+import time
+from concurrent.futures import FIRST_COMPLETED, Future, ThreadPoolExecutor, wait
+from concurrent.futures import TimeoutError as FutureTimeoutError
+from typing import Any, Callable, Dict, Iterator, Tuple
+
+logger = logging.getLogger(__name__)
+
+
+class StepTimeout(Exception):
+    """Raised when a step does not finish within its timeout"""
+
+
+class StepRunner:
+    """Runs the steps of one request on a shared thread pool with per-step timeouts and latency tracking.
+
+    Independent steps can be submitted together so they overlap, and their results
+    collected in any order. Streamlit calls must stay on the script thread, so steps
+    should only do I/O and computation; rendering happens as results are collected.
+    """
+
+    def __init__(self, executor: ThreadPoolExecutor, timeouts: Dict[str, float], default_timeout: float = 30.0):
+        self.executor = executor
+        self.timeouts = timeouts
+        self.default_timeout = default_timeout
+        self.timings: Dict[str, float] = {}
+        self._started = time.perf_counter()
+
+    def submit(self, name: str, fn: Callable[..., Any], *args, **kwargs) -> Future:
+        """Starts a step in the background"""
+
+        def timed():
+            start = time.perf_counter()
+            try:
+                return fn(*args, **kwargs)
+            finally:
+                self.timings[name] = time.perf_counter() - start
+
+        return self.executor.submit(timed)
+
+    def result(self, name: str, future: Future) -> Any:
+        """Waits for a submitted step within its timeout, raising StepTimeout when it takes too long"""
+
+        try:
+            return future.result(timeout=self.timeouts.get(name, self.default_timeout))
+        except FutureTimeoutError:
+            self._timed_out(name, future)
+            raise StepTimeout(name) from None
+
+    def completed(self, futures: Dict[Future, str]) -> Iterator[Tuple[str, Any]]:
+        """Yields (name, result) for submitted steps as they finish; failed steps and steps past their timeout are skipped"""
+
+        started = time.perf_counter()
+        deadlines = {future: started + self.timeouts.get(name, self.default_timeout) for future, name in futures.items()}
+        pending = set(futures)
+        while pending:
+            remaining = min(deadlines[future] for future in pending) - time.perf_counter()
+            done, pending = wait(pending, timeout=max(remaining, 0), return_when=FIRST_COMPLETED)
+            for future in done:
+                try:
+                    result = future.result()
+                except Exception:
+                    logger.exception(f"Step '{futures[future]}' failed")
+                    continue
+                yield futures[future], result
+
+            now = time.perf_counter()
+            for future in [future for future in pending if deadlines[future] <= now]:
+                pending.discard(future)
+                self._timed_out(futures[future], future)
+
+    def run(self, name: str, fn: Callable[..., Any], *args, **kwargs) -> Any:
+        """Runs a step to completion within its timeout"""
+
+        return self.result(name, self.submit(name, fn, *args, **kwargs))
+
+    def _timed_out(self, name: str, future: Future):
+        # A running step cannot be interrupted; it finishes in the background and its result is dropped
+        future.cancel()
+        timeout = self.timeouts.get(name, self.default_timeout)
+        self.timings.setdefault(name, timeout)
+        logger.warning(f"Step '{name}' timed out after {timeout:g}s")
+
+    def report(self) -> Dict[str, float]:
+        """Returns per-step and total latency in milliseconds"""
+
+        report = {name: round(seconds * 1000) for name, seconds in self.timings.items()}
+        report["total"] = round((time.perf_counter() - self._started) * 1000)
+        logger.info(f"Step latency (ms): {report}")
+        return report